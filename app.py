@@ -3,22 +3,52 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, date, timedelta
 import json
-import csv
 import io
 import os
+import atexit
 from dotenv import load_dotenv
 
+from models.assessment_batch import AssessmentBatch
+from models.symptoms import SYMPTOMS
+from models.fall_risk import (
+    MorseInputs, AmbulatoryAid, Gait, MentalStatus, DowntonInputs, DOWNTON_MEDICATIONS,
+    DOWNTON_SENSORY_DEFICITS
+)
+from backend.shared_store import SharedStore
+from backend.render_cache import RenderCache
+from backend.early_warning import EarlyWarningEngine
+from backend.rolling_stats import RollingStatsRegistry
+from backend.baseline import BaselineAnomalyDetector
+from backend.fall_risk import FallRiskScorer, FallRiskHistory
+from backend.patient_import import PatientImporter
+from backend.repository import Repository
+from backend import event_log as events
+from backend.event_log import EventLog
+from backend.report_writer import ReportWriter
+from backend.persistence import PersistencePipeline, CsvSink, VitalSink
+from backend.vital_store import VitalStore
+from backend.archive import ParquetArchive, pq as parquet
+from backend.backup_restore import BackupRestorer, BackupFormatError, open_backup
+from backend.backup_export import BackupManager
+from backend.report_history import ReportHistory, EVALUATION_COLUMNS
+from backend.report_retention import ReportRetention
+
 # Añadir después de los imports existentes
 try:
     from backend.gpt_service import GPTService
     from backend.knowledge_base import KnowledgeBase  
-    from backend.data_processor import DataProcessor
     print("✅ Módulos backend cargados correctamente")
 except ImportError as e:
     print(f"❌ Error importando backend: {e}")
     GPTService = None
     KnowledgeBase = None
-    DataProcessor = None
+
+# Las gráficas requieren plotly; sin él se omiten
+try:
+    from frontend.components import create_vital_signs_chart
+except ImportError as e:
+    print(f"❌ Error importando componentes gráficos: {e}")
+    create_vital_signs_chart = None
 
 # Cargar variables de entorno
 load_dotenv()
@@ -165,6 +195,8 @@ def main():
     
     # Inicializar estado de la sesión
     initialize_session_state()
+    # Tareas de mantenimiento en segundo plano (se arrancan una vez por proceso)
+    get_report_retention()
     
     # Sidebar con navegación y métricas
     with st.sidebar:
@@ -191,14 +223,273 @@ def main():
     elif page == "⚙️ Configuración":
         show_settings()
 
+@st.cache_resource
+def get_fall_risk_scorer():
+    """Calculadora de riesgo de caídas con historial persistente compartido"""
+    return FallRiskScorer(FallRiskHistory())
+
+@st.cache_resource
+def get_event_log():
+    """Registro de eventos compartido por todas las sesiones (None si no está disponible)"""
+    try:
+        event_log = EventLog()
+    except OSError as e:
+        print(f"❌ Error abriendo el registro de eventos: {e}")
+        return None
+    atexit.register(event_log.close)
+    return event_log
+
+@st.cache_resource
+def get_repository():
+    """Repositorio SQLite compartido por todas las sesiones (None si no está disponible)"""
+    try:
+        repository = Repository()
+    except Exception as e:
+        print(f"❌ Error abriendo la base de datos: {e}")
+        return None
+    # Si la base de datos se ha perdido, se reconstruye desde el registro de eventos
+    event_log = get_event_log()
+    if event_log is not None and repository.is_empty():
+        state = event_log.state()
+        if not state.is_empty():
+            repository.restore(state.patients.values(), state.evaluation_list())
+    return repository
+
+def record_events(new_events):
+    """Añade eventos al registro; un fallo del registro no interrumpe la operación"""
+    event_log = get_event_log()
+    if event_log is None:
+        return
+    try:
+        event_log.append_many(new_events)
+    except OSError as e:
+        print(f"❌ Error escribiendo el registro de eventos: {e}")
+
+@st.cache_resource
+def get_shared_store():
+    """
+    Pacientes y evaluaciones compartidos por todas las sesiones del proceso,
+    cargados del repositorio o, sin base de datos, del registro de eventos
+    """
+    repository = get_repository()
+    store = SharedStore(repository)
+    event_log = get_event_log()
+    if repository is None and event_log is not None:
+        state = event_log.state()
+        store.load(state.patients.values(), state.evaluation_list())
+    # Sin datos guardados (ni borrados a propósito), se recupera lo reciente de los reportes diarios
+    never_cleared = repository.generation() == 0 if repository is not None else (
+        event_log is None or event_log.last_seq == 0)
+    snapshot = store.snapshot()
+    if never_cleared and not snapshot.patients and not snapshot.evaluations:
+        rehydrate_from_reports(store)
+    return store
+
+@st.cache_resource
+def get_render_cache():
+    """Tablas y datos de gráficos ya calculados, compartidos por las sesiones"""
+    return RenderCache()
+
+def cached_view(view, build, *params):
+    """
+    Resultado de ``build`` para la versión de datos de la sesión y los
+    parámetros dados; se recalcula sólo cuando cambian los datos
+    """
+    return get_render_cache().get(view, get_data_version(), params, build)
+
+@st.cache_resource
+def get_report_history():
+    """Índice de los reportes diarios en CSV, leídos bajo demanda"""
+    return ReportHistory(reports_dir="data/reports")
+
+HISTORY_EAGER_DAYS = 14
+HISTORY_PAGE_DAYS = 7
+
+def rehydrate_from_reports(store):
+    """Carga en el almacén los últimos días de los reportes diarios; el resto se lee bajo demanda"""
+    history = get_report_history()
+    frame = history.read_days(history.recent_days(HISTORY_EAGER_DAYS), EVALUATION_COLUMNS)
+    if frame.empty:
+        return 0
+    patients = history.to_patients(frame)
+    evaluations = sorted(history.to_evaluations(frame), key=lambda evaluation: evaluation['timestamp'])
+    evaluations = [{'id': evaluation_id, **evaluation} for evaluation_id, evaluation in enumerate(evaluations, 1)]
+    if store.repository is not None:
+        store.repository.restore(patients.values(), evaluations)
+        store.reload()
+    else:
+        store.load(patients.values(), evaluations)
+    record_events([(events.PATIENT_REGISTERED, patient) for patient in patients.values()] +
+                  [(events.EVALUATION_CREATED, evaluation) for evaluation in evaluations])
+    print(f"✅ Recuperadas {len(evaluations)} evaluaciones de los reportes diarios")
+    return len(evaluations)
+
+def reset_session_data():
+    """Descarta la instantánea de la sesión y sus estructuras derivadas"""
+    st.session_state.data_snapshot = None
+    st.session_state.evaluations_seen = 0
+    st.session_state.pop('early_warning', None)
+    st.session_state.pop('rolling_stats', None)
+    st.session_state.pop('assessment_batch', None)
+
+def sync_session_data(refresh=True, exclude=()):
+    """
+    Toma la última instantánea del almacén compartido (incorporando antes lo
+    guardado por otros procesos) y pasa las evaluaciones nuevas a las
+    estructuras derivadas de la sesión, salvo las de ``exclude`` (IDs que
+    quien llama incorpora por su cuenta).
+    """
+    store = get_shared_store()
+    if refresh:
+        store.refresh()
+    snapshot = store.snapshot()
+    if st.session_state.get('data_generation') != snapshot.generation:
+        reset_session_data()
+        st.session_state.data_generation = snapshot.generation
+    st.session_state.data_snapshot = snapshot
+
+    new_evaluations = [evaluation for evaluation in snapshot.evaluations[st.session_state.evaluations_seen:]
+                       if evaluation.get('id') not in exclude]
+    st.session_state.evaluations_seen = len(snapshot.evaluations)
+    if new_evaluations:
+        if st.session_state.get('early_warning'):
+            st.session_state.early_warning.bulk_update(new_evaluations)
+        if st.session_state.get('rolling_stats'):
+            st.session_state.rolling_stats.bulk_add(new_evaluations)
+
+def get_data_version():
+    """Versión de los datos que ve la sesión; cambia con cada escritura de cualquier sesión"""
+    return st.session_state.data_snapshot.version
+
+def get_patients():
+    """Pacientes por ID de la instantánea de la sesión (sólo lectura; usar save_*/update_* para modificar)"""
+    return st.session_state.data_snapshot.patients
+
+def get_evaluations():
+    """Evaluaciones en orden de alta de la instantánea de la sesión (sólo lectura; usar save_evaluation)"""
+    return st.session_state.data_snapshot.evaluations
+
+def get_evaluation_counters():
+    """Recuentos por día, severidad y evaluador de la instantánea de la sesión"""
+    return st.session_state.data_snapshot.counters
+
+def get_patient_evaluations(patient_id):
+    """Evaluaciones de un residente en orden de alta, desde el índice del almacén"""
+    return st.session_state.data_snapshot.patient_evaluations(patient_id)
+
+def get_last_evaluation(patient_id):
+    """Evaluación más reciente de un residente (None si no tiene)"""
+    return st.session_state.data_snapshot.last_evaluation(patient_id)
+
+def save_patients(patients):
+    """Da de alta varios pacientes, les asigna ID y los devuelve por ID"""
+    saved = get_shared_store().add_patients(patients)
+    sync_session_data(refresh=False)
+    record_events((events.PATIENT_REGISTERED, patient) for patient in saved)
+    return {patient['id']: patient for patient in saved}
+
+def save_patient(patient):
+    """Da de alta un paciente y lo devuelve con su ID"""
+    return next(iter(save_patients([patient]).values()))
+
+def update_patients(patients):
+    """Guarda los cambios de pacientes ya registrados"""
+    patients = list(patients)
+    get_shared_store().update_patients(patients)
+    sync_session_data(refresh=False)
+    record_events((events.PATIENT_UPDATED, patient) for patient in patients)
+
+def update_patient(patient):
+    update_patients([patient])
+
+def save_evaluation(evaluation):
+    """
+    Guarda una evaluación, le asigna ID y la publica para todas las sesiones.
+    La evaluación guardada no se pasa a la alerta temprana ni a las
+    estadísticas deslizantes de la sesión: el formulario la añade para usar
+    su resultado.
+    """
+    evaluation = get_shared_store().add_evaluations([evaluation])[0]
+    sync_session_data(refresh=False, exclude={evaluation['id']})
+    record_events([(events.EVALUATION_CREATED, evaluation)])
+    return evaluation
+
+def attach_analysis(evaluation_id, analysis):
+    """Asocia el análisis automático a una evaluación guardada"""
+    get_shared_store().attach_analysis(evaluation_id, analysis)
+    record_events([(events.ANALYSIS_ATTACHED, {'evaluation_id': evaluation_id, 'analysis': analysis})])
+
+def clear_all_data():
+    """Borra todos los pacientes y evaluaciones"""
+    get_shared_store().clear()
+    record_events([(events.DATA_CLEARED, {})])
+    sync_session_data(refresh=False)
+
+def restore_from_event_log():
+    """Reconstruye la base de datos a partir de la instantánea y la cola de eventos"""
+    state = get_event_log().state()
+    repository = get_repository()
+    if repository is not None:
+        repository.restore(state.patients.values(), state.evaluation_list())
+        get_shared_store().reload()
+    else:
+        get_shared_store().load(state.patients.values(), state.evaluation_list())
+    sync_session_data(refresh=False)
+    return state
+
+def backup_restorer():
+    return BackupRestorer(get_repository(),
+                          on_change=lambda event_type, records: record_events(
+                              (event_type, record) for record in records))
+
+def restore_backup_chain():
+    """Restaura la última copia completa y sus incrementales"""
+    try:
+        return get_backup_manager().restore(backup_restorer())
+    finally:
+        get_shared_store().reload()
+        reset_session_data()
+        sync_session_data(refresh=False)
+
+def restore_backup(backup_file):
+    """Fusiona una copia de seguridad con los datos actuales y recarga la sesión"""
+    restorer = backup_restorer()
+    try:
+        with open_backup(backup_file) as stream:
+            return restorer.restore(stream)
+    finally:
+        # Las evaluaciones actualizadas no llegan por la sincronización incremental
+        get_shared_store().reload()
+        reset_session_data()
+        sync_session_data(refresh=False)
+
 def initialize_session_state():
     """Inicializa el estado de la sesión"""
-    if 'patients' not in st.session_state:
-        st.session_state.patients = {}
-    if 'evaluations' not in st.session_state:
-        st.session_state.evaluations = []
+    if 'evaluations_seen' not in st.session_state:
+        st.session_state.evaluations_seen = 0
     if 'current_page' not in st.session_state:
         st.session_state.current_page = '📊 Dashboard'
+    sync_session_data()
+    if 'early_warning' not in st.session_state:
+        # Reconstruir el estado de alerta temprana a partir del historial existente
+        engine = EarlyWarningEngine()
+        engine.bulk_update(get_evaluations())
+        st.session_state.early_warning = engine
+    if 'rolling_stats' not in st.session_state:
+        rolling_stats = RollingStatsRegistry()
+        rolling_stats.bulk_add(get_evaluations())
+        st.session_state.rolling_stats = rolling_stats
+
+def get_assessment_batch():
+    """Lote columnar de evaluaciones, sincronizado con la lista de la sesión"""
+    batch = st.session_state.get('assessment_batch')
+    evaluations = get_evaluations()
+    if batch is None or len(batch) > len(evaluations):
+        batch = AssessmentBatch.from_evaluations(evaluations)
+        st.session_state.assessment_batch = batch
+    elif len(batch) < len(evaluations):
+        batch.extend(evaluations[len(batch):])
+    return batch
 
 def show_sidebar():
     """Muestra la barra lateral con navegación y métricas"""
@@ -228,12 +519,11 @@ def show_sidebar():
     # Métricas rápidas
     st.markdown("### 📈 Resumen Rápido")
     
-    total_patients = len(st.session_state.patients)
-    total_evaluations = len(st.session_state.evaluations)
-    today_evaluations = sum(1 for e in st.session_state.evaluations 
-                           if e.get('date') == str(date.today()))
+    total_patients = len(get_patients())
+    total_evaluations = len(get_evaluations())
+    today_evaluations = get_evaluation_counters().count_on(date.today())
     
-    high_risk_count = sum(1 for p in st.session_state.patients.values() 
+    high_risk_count = sum(1 for p in get_patients().values() 
                          if p.get('risk_level') == 'Alto')
     
     col1, col2 = st.columns(2)
@@ -254,6 +544,89 @@ def show_sidebar():
         st.session_state.current_page = "🚨 Protocolos"
         st.rerun()
 
+def dashboard_summary():
+    """Número de pacientes, reparto por nivel de riesgo y edad media"""
+    patients = get_patients()
+    risk_counts = {'Alto': 0, 'Medio': 0, 'Bajo': 0}
+    for patient in patients.values():
+        risk_level = patient.get('risk_level', 'Medio')
+        risk_counts[risk_level] += 1
+    avg_age = sum(p['age'] for p in patients.values()) / len(patients) if patients else 0
+    return {'patients': len(patients), 'risk_counts': risk_counts, 'avg_age': avg_age}
+
+def chart_counts(daily_counts):
+    """Evaluaciones por día con el eje de fechas en formato dd/mm"""
+    daily_counts.index = daily_counts.index.strftime('%d/%m').rename('Fecha')
+    return daily_counts
+
+def count_frame(counts, label):
+    """Tabla de recuentos (de mayor a menor) con la columna de etiquetas indicada"""
+    ordered = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+    return pd.DataFrame(ordered, columns=[label, 'Evaluaciones'])
+
+PATIENT_LIST_ORDERS = {
+    "Nombre": lambda patient, last: patient.get('name', '').lower(),
+    "Habitación": lambda patient, last: str(patient.get('room', '')),
+    "Riesgo": lambda patient, last: {'Alto': 0, 'Medio': 1, 'Bajo': 2}.get(patient.get('risk_level'), 1),
+    # Primero los que llevan más tiempo sin evaluar (los no evaluados, antes que nadie)
+    "Última evaluación": lambda patient, last: (last.get('timestamp') or last.get('date') or '') if last else ''
+}
+
+def dashboard_patient_ids(risk_filter, room_filter, order):
+    """IDs de los residentes que cumplen los filtros, en el orden pedido"""
+    room_filter = room_filter.strip().lower()
+    key = PATIENT_LIST_ORDERS[order]
+    selected = [
+        (key(patient, get_last_evaluation(pid)), patient.get('name', ''), pid)
+        for pid, patient in get_patients().items()
+        if (risk_filter == "Todos" or patient.get('risk_level', 'Medio') == risk_filter)
+        and room_filter in str(patient.get('room', '')).lower()
+    ]
+    return [pid for _, _, pid in sorted(selected)]
+
+def patient_card(pid, patient):
+    """Tarjeta HTML de un residente para la lista del dashboard"""
+    risk_class = f"risk-{patient.get('risk_level', 'medio').lower()}"
+    
+    # Calcular días desde ingreso
+    try:
+        admission_date = datetime.strptime(patient.get('admission_date', str(date.today())), '%Y-%m-%d').date()
+        days_since = (date.today() - admission_date).days
+    except:
+        days_since = 0
+    
+    # Última evaluación
+    last_evaluation = get_last_evaluation(pid)
+    last_eval = "Sin evaluaciones" if last_evaluation is None else f"Última: {last_evaluation.get('date')}"
+    
+    return f"""
+    <div class="patient-card {risk_class}">
+        <div style="display: flex; justify-content: space-between; align-items: center;">
+            <div>
+                <h3 style="margin: 0; color: var(--primary-color);">👤 {patient['name']}</h3>
+                <p style="margin: 0.5rem 0; color: #666;">
+                    <strong>Edad:</strong> {patient['age']} años | 
+                    <strong>Habitación:</strong> {patient['room']} |
+                    <strong>Ingreso:</strong> hace {days_since} días
+                </p>
+                <p style="margin: 0; color: #888; font-size: 0.9rem;">{last_eval}</p>
+            </div>
+            <div style="text-align: right;">
+                <span style="
+                    background: {'#dc3545' if patient.get('risk_level') == 'Alto' else '#ffc107' if patient.get('risk_level') == 'Medio' else '#28a745'};
+                    color: white;
+                    padding: 0.25rem 0.75rem;
+                    border-radius: 20px;
+                    font-size: 0.8rem;
+                    font-weight: bold;
+                ">
+                    {patient.get('risk_level', 'Medio')}
+                </span>
+            </div>
+        </div>
+    </div>
+    """
+
 def show_dashboard():
     """Página principal del dashboard"""
     st.markdown("## 📊 Dashboard Principal")
@@ -261,12 +634,11 @@ def show_dashboard():
     # Métricas principales
     col1, col2, col3, col4 = st.columns(4)
     
-    total_patients = len(st.session_state.patients)
-    high_risk_patients = sum(1 for p in st.session_state.patients.values() 
-                           if p.get('risk_level') == 'Alto')
-    total_evaluations = len(st.session_state.evaluations)
-    avg_age = (sum(p['age'] for p in st.session_state.patients.values()) / total_patients 
-              if total_patients > 0 else 0)
+    summary = cached_view('dashboard_summary', dashboard_summary)
+    total_patients = summary['patients']
+    high_risk_patients = summary['risk_counts']['Alto']
+    total_evaluations = len(get_evaluations())
+    avg_age = summary['avg_age']
     
     with col1:
         st.markdown("""
@@ -300,14 +672,11 @@ def show_dashboard():
         </div>
         """.format(f"{avg_age:.0f} años" if avg_age > 0 else "N/A"), unsafe_allow_html=True)
     
-    if st.session_state.patients:
+    if get_patients():
         # Distribución por riesgo
         st.markdown("### 📊 Distribución por Nivel de Riesgo")
         
-        risk_counts = {'Alto': 0, 'Medio': 0, 'Bajo': 0}
-        for patient in st.session_state.patients.values():
-            risk_level = patient.get('risk_level', 'Medio')
-            risk_counts[risk_level] += 1
+        risk_counts = summary['risk_counts']
         
         col1, col2, col3 = st.columns(3)
         
@@ -336,69 +705,46 @@ def show_dashboard():
             """, unsafe_allow_html=True)
         
         # Gráfico de evaluaciones recientes
-        if st.session_state.evaluations:
+        if get_evaluations():
             st.markdown("### 📈 Evaluaciones de los Últimos 7 Días")
             
-            # Preparar datos para el gráfico
-            last_7_days = [(date.today() - timedelta(days=i)).strftime('%Y-%m-%d') 
-                          for i in range(6, -1, -1)]
-            
-            daily_counts = []
-            for day in last_7_days:
-                count = sum(1 for e in st.session_state.evaluations if e.get('date') == day)
-                daily_counts.append(count)
-            
-            chart_data = pd.DataFrame({
-                'Fecha': [datetime.strptime(d, '%Y-%m-%d').strftime('%d/%m') for d in last_7_days],
-                'Evaluaciones': daily_counts
-            })
-            
-            st.line_chart(chart_data.set_index('Fecha'))
+            # Datos del gráfico (la fecha forma parte de la clave: cambian a medianoche)
+            today = date.today()
+            st.line_chart(cached_view('dashboard_week', lambda: chart_counts(
+                get_evaluation_counters().daily_counts(today - timedelta(days=6), today)), today))
         
-        # Lista de pacientes
+        # Lista de pacientes: sólo se dibuja la página visible
         st.markdown("### 👥 Pacientes Registrados")
         
-        for pid, patient in st.session_state.patients.items():
-            risk_class = f"risk-{patient.get('risk_level', 'medio').lower()}"
-            
-            # Calcular días desde ingreso
-            try:
-                admission_date = datetime.strptime(patient.get('admission_date', str(date.today())), '%Y-%m-%d').date()
-                days_since = (date.today() - admission_date).days
-            except:
-                days_since = 0
-            
-            # Última evaluación
-            patient_evaluations = [e for e in st.session_state.evaluations if e.get('patient_id') == pid]
-            last_eval = "Sin evaluaciones" if not patient_evaluations else f"Última: {patient_evaluations[-1].get('date', 'N/A')}"
-            
-            st.markdown(f"""
-            <div class="patient-card {risk_class}">
-                <div style="display: flex; justify-content: space-between; align-items: center;">
-                    <div>
-                        <h3 style="margin: 0; color: var(--primary-color);">👤 {patient['name']}</h3>
-                        <p style="margin: 0.5rem 0; color: #666;">
-                            <strong>Edad:</strong> {patient['age']} años | 
-                            <strong>Habitación:</strong> {patient['room']} |
-                            <strong>Ingreso:</strong> hace {days_since} días
-                        </p>
-                        <p style="margin: 0; color: #888; font-size: 0.9rem;">{last_eval}</p>
-                    </div>
-                    <div style="text-align: right;">
-                        <span style="
-                            background: {'#dc3545' if patient.get('risk_level') == 'Alto' else '#ffc107' if patient.get('risk_level') == 'Medio' else '#28a745'};
-                            color: white;
-                            padding: 0.25rem 0.75rem;
-                            border-radius: 20px;
-                            font-size: 0.8rem;
-                            font-weight: bold;
-                        ">
-                            {patient.get('risk_level', 'Medio')}
-                        </span>
-                    </div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+        col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+        with col1:
+            risk_filter = st.selectbox("Nivel de riesgo", ["Todos", "Alto", "Medio", "Bajo"], key="dashboard_risk")
+        with col2:
+            room_filter = st.text_input("Habitación", placeholder="Buscar habitación", key="dashboard_room")
+        with col3:
+            order = st.selectbox("Ordenar por", list(PATIENT_LIST_ORDERS), key="dashboard_order")
+        with col4:
+            page_size = st.selectbox("Por página", [10, 20, 50], index=1, key="dashboard_page_size")
+        
+        patient_ids = cached_view('dashboard_patients', lambda: dashboard_patient_ids(risk_filter, room_filter, order),
+                                  risk_filter, room_filter.strip().lower(), order)
+        page_count = max(1, -(-len(patient_ids) // page_size))
+        # Al cambiar los filtros se vuelve a la primera página
+        filters = (risk_filter, room_filter, order, page_size)
+        if st.session_state.get('dashboard_filters') != filters or st.session_state.get('dashboard_page', 1) > page_count:
+            st.session_state.dashboard_filters = filters
+            st.session_state.dashboard_page = 1
+        
+        if not patient_ids:
+            st.info("Ningún residente coincide con los filtros")
+        else:
+            page = st.number_input(f"Página (de {page_count})", min_value=1, max_value=page_count,
+                                   step=1, key="dashboard_page")
+            first = (page - 1) * page_size
+            visible = patient_ids[first:first + page_size]
+            st.caption(f"Residentes {first + 1}-{first + len(visible)} de {len(patient_ids)}")
+            st.markdown("".join(patient_card(pid, get_patients()[pid]) for pid in visible),
+                        unsafe_allow_html=True)
     else:
         st.markdown("""
         <div class="alert-success">
@@ -462,9 +808,7 @@ def show_new_patient():
         
         if submitted:
             if name and age:
-                patient_id = len(st.session_state.patients) + 1
                 new_patient = {
-                    'id': patient_id,
                     'name': name,
                     'age': age,
                     'gender': gender,
@@ -488,13 +832,13 @@ def show_new_patient():
                     'registered_time': datetime.now().strftime("%H:%M:%S")
                 }
                 
-                st.session_state.patients[patient_id] = new_patient
+                new_patient = save_patient(new_patient)
                 
                 st.markdown(f"""
                 <div class="alert-success">
                     <h3>✅ ¡Paciente registrado exitosamente!</h3>
                     <p><strong>Nombre:</strong> {name}</p>
-                    <p><strong>ID del paciente:</strong> {patient_id}</p>
+                    <p><strong>ID del paciente:</strong> {new_patient['id']}</p>
                     <p><strong>Habitación:</strong> {room}</p>
                     <p>El paciente ha sido añadido al sistema y está listo para evaluaciones.</p>
                 </div>
@@ -516,12 +860,75 @@ def show_new_patient():
             st.session_state.current_page = '📊 Dashboard'
             st.session_state.patient_just_registered = False  # Reset the flag
             st.rerun()
+    
+    show_patient_import()
+
+def show_patient_import():
+    """Importación masiva de residentes desde un censo CSV o Excel"""
+    st.markdown("---")
+    st.markdown("### 📥 Importación Masiva de Residentes")
+    
+    importer = PatientImporter()
+    st.download_button(
+        label="📄 Descargar Plantilla CSV",
+        data=importer.template_csv(),
+        file_name="plantilla_censo_residentes.csv",
+        mime="text/csv"
+    )
+    
+    uploaded = st.file_uploader("Censo de residentes (CSV o Excel)", type=["csv", "xlsx", "xls"])
+    if uploaded is None:
+        st.session_state.pop('patient_import_report', None)
+        return
+    
+    report_key = (uploaded.name, uploaded.size)
+    pending = st.session_state.get('patient_import_report')
+    if not pending or pending[0] != report_key:
+        try:
+            report = importer.validate(uploaded, uploaded.name)
+        except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+            st.error(f"❌ No se pudo leer el fichero: {e}")
+            return
+        pending = (report_key, report, False)
+        st.session_state.patient_import_report = pending
+    _, report, imported = pending
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("📄 Filas Leídas", report.total_rows)
+    with col2:
+        st.metric("✅ Válidas", len(report.valid))
+    with col3:
+        st.metric("❌ Con Errores", report.invalid_rows)
+    
+    if report.unknown_columns:
+        st.warning(f"⚠️ Columnas ignoradas: {', '.join(map(str, report.unknown_columns))}")
+    
+    if not report.errors.empty:
+        st.markdown("**Errores por fila** (la fila 1 es la cabecera):")
+        st.dataframe(report.errors.rename(columns={'fila': 'Fila', 'campo': 'Campo', 'error': 'Error'}),
+                     use_container_width=True, hide_index=True)
+        st.download_button(
+            label="💾 Descargar Informe de Errores",
+            data=report.errors.to_csv(index=False),
+            file_name=f"errores_importacion_{date.today()}.csv",
+            mime="text/csv"
+        )
+    
+    if imported:
+        st.success(f"✅ {len(report.valid)} residentes importados")
+    elif report.valid:
+        if st.button(f"➕ Importar {len(report.valid)} Residentes Válidos", use_container_width=True):
+            # Alta de todos los residentes válidos en una única operación
+            new_patients = save_patients(report.valid)
+            st.session_state.patient_import_report = (report_key, report, True)
+            st.success(f"✅ {len(new_patients)} residentes importados")
 
 def show_evaluation():
     """Página de evaluación de pacientes"""
     st.markdown("## 📋 Nueva Evaluación de Paciente")
     
-    if not st.session_state.patients:
+    if not get_patients():
         st.markdown("""
         <div class="alert-warning">
             ⚠️ <strong>No hay pacientes registrados</strong><br>
@@ -533,7 +940,7 @@ def show_evaluation():
     # Selector de paciente
     patient_options = {
         f"{p['name']} - Hab. {p['room']} (Riesgo: {p.get('risk_level', 'N/A')})": p['id'] 
-        for p in st.session_state.patients.values()
+        for p in get_patients().values()
     }
     
     selected_patient_key = st.selectbox(
@@ -543,7 +950,7 @@ def show_evaluation():
     
     if selected_patient_key:
         patient_id = patient_options[selected_patient_key]
-        patient = st.session_state.patients[patient_id]
+        patient = get_patients()[patient_id]
         
         # Mostrar información del paciente
         st.markdown(f"### 👤 Evaluando a: {patient['name']}")
@@ -564,6 +971,15 @@ def show_evaluation():
         with col4:
             st.info(f"**Cognitivo:** {patient.get('cognitive_level', 'N/A')}")
         
+        if create_vital_signs_chart:
+            with st.expander("📈 Historial de Signos Vitales"):
+                periods = {"30 días": 30, "90 días": 90, "1 año": 365, "5 años": 5 * 365, "Todo": None}
+                period = st.radio("Periodo", list(periods), horizontal=True, key="vital_history_period")
+                days = periods[period]
+                start = date.today() - timedelta(days=days - 1) if days else None
+                # Corte sin copia del fichero mapeado en memoria del residente
+                create_vital_signs_chart(get_vital_store().range(patient_id, start=start))
+        
         # Mostrar condiciones médicas conocidas
         conditions = patient.get('conditions', {})
         active_conditions = [k.replace('_', ' ').title() for k, v in conditions.items() if v]
@@ -646,11 +1062,30 @@ def show_evaluation():
                     observations, evaluator
                 )
                 
-                # Guardar evaluación
-                st.session_state.evaluations.append(evaluation)
+                # Guardar evaluación (el repositorio le asigna su ID)
+                evaluation = save_evaluation(evaluation)
+                
+                # Actualizar estadísticas deslizantes del paciente
+                trends = None
+                if st.session_state.get('rolling_stats'):
+                    st.session_state.rolling_stats.add(evaluation)
+                    trends = st.session_state.rolling_stats.trend_summary(patient_id)
+                
+                # Historial previo del paciente para su basal personal
+                history = [e for e in get_patient_evaluations(patient_id) if e.get('id') != evaluation.get('id')]
                 
                 # Generar análisis automático
-                analysis = analyze_evaluation_complete(evaluation, patient)
+                analysis = analyze_evaluation_complete(evaluation, patient, trends, history)
+                
+                # Actualizar la escala de alerta temprana del paciente
+                if st.session_state.get('early_warning'):
+                    warning = st.session_state.early_warning.update(evaluation)
+                    analysis['early_warning'] = warning.to_dict()
+                    analysis['alerts'].extend(warning.triggers)
+                    if any(t['level'] == 'critical' for t in warning.triggers):
+                        analysis['requires_immediate_attention'] = True
+                
+                attach_analysis(evaluation['id'], analysis)
                 
                 # Guardar reporte CSV automáticamente
                 save_evaluation_to_csv(evaluation, patient, analysis)
@@ -664,7 +1099,6 @@ def create_evaluation(patient_id, patient, systolic_bp, diastolic_bp, heart_rate
                      observations, evaluator):
     """Crea un objeto de evaluación completo"""
     return {
-        'id': len(st.session_state.evaluations) + 1,
         'patient_id': patient_id,
         'patient_name': patient['name'],
         'date': str(date.today()),
@@ -692,22 +1126,29 @@ def create_evaluation(patient_id, patient, systolic_bp, diastolic_bp, heart_rate
         'timestamp': datetime.now().isoformat()
     }
 
-def analyze_evaluation_complete(evaluation, patient):
+def analyze_evaluation_complete(evaluation, patient, trends=None, history=None):
     """Análisis completo de la evaluación con alertas y recomendaciones"""
+    # Desviaciones respecto a la basal personal del residente
+    baseline_detector = BaselineAnomalyDetector()
+    baseline_deviations = {}
+    if history:
+        baseline_deviations = baseline_detector.score_evaluation(evaluation, history)
+    
     if GPTService:
         try:
             gpt_service = GPTService()
-            ai_analysis = gpt_service.analyze_patient_condition(patient, evaluation)
+            ai_analysis = gpt_service.analyze_patient_condition(patient, evaluation, trends)
             # Si hay análisis de IA, devolverlo formateado
             if ai_analysis and not ai_analysis.startswith("Error"):
                 return {
-                    'alerts': [],
+                    'alerts': baseline_detector.baseline_alerts(baseline_deviations),
                     'recommendations': [],
                     'severity_score': 5,
                     'severity_level': "IA",
                     'requires_immediate_attention': False,
                     'analysis_timestamp': datetime.now().isoformat(),
-                    'ai_analysis_text': ai_analysis
+                    'ai_analysis_text': ai_analysis,
+                    'baseline_deviations': baseline_deviations
                 }
         except Exception as e:
             print(f"Error con IA: {e}")
@@ -723,6 +1164,7 @@ def analyze_evaluation_complete(evaluation, patient):
     if vitals['systolic_bp'] > 180 or vitals['diastolic_bp'] > 110:
         alerts.append({
             'level': 'critical',
+            'vital': 'blood_pressure',
             'message': f"CRISIS HIPERTENSIVA: PA {vitals['blood_pressure']} mmHg"
         })
         recommendations.append("🚨 CONTACTAR MÉDICO INMEDIATAMENTE - Crisis hipertensiva")
@@ -730,6 +1172,7 @@ def analyze_evaluation_complete(evaluation, patient):
     elif vitals['systolic_bp'] > 160 or vitals['diastolic_bp'] > 100:
         alerts.append({
             'level': 'warning',
+            'vital': 'blood_pressure',
             'message': f"Hipertensión severa: PA {vitals['blood_pressure']} mmHg"
         })
         recommendations.append("Contactar médico para ajuste de medicación antihipertensiva")
@@ -737,6 +1180,7 @@ def analyze_evaluation_complete(evaluation, patient):
     elif vitals['systolic_bp'] > 140 or vitals['diastolic_bp'] > 90:
         alerts.append({
             'level': 'warning',
+            'vital': 'blood_pressure',
             'message': f"Hipertensión: PA {vitals['blood_pressure']} mmHg"
         })
         recommendations.append("Monitorizar presión arterial más frecuentemente")
@@ -745,6 +1189,7 @@ def analyze_evaluation_complete(evaluation, patient):
     if vitals['systolic_bp'] < 90 or vitals['diastolic_bp'] < 60:
         alerts.append({
             'level': 'warning',
+            'vital': 'blood_pressure',
             'message': f"Hipotensión: PA {vitals['blood_pressure']} mmHg"
         })
         recommendations.append("Monitorizar signos de mareo y caídas")
@@ -754,6 +1199,7 @@ def analyze_evaluation_complete(evaluation, patient):
     if vitals['heart_rate'] > 120:
         alerts.append({
             'level': 'critical' if vitals['heart_rate'] > 150 else 'warning',
+            'vital': 'heart_rate',
             'message': f"Taquicardia: {vitals['heart_rate']} lpm"
         })
         recommendations.append("Evaluar causas de taquicardia (dolor, ansiedad, medicación)")
@@ -761,6 +1207,7 @@ def analyze_evaluation_complete(evaluation, patient):
     elif vitals['heart_rate'] < 50:
         alerts.append({
             'level': 'warning',
+            'vital': 'heart_rate',
             'message': f"Bradicardia: {vitals['heart_rate']} lpm"
         })
         recommendations.append("Evaluar medicación que pueda causar bradicardia")
@@ -770,6 +1217,7 @@ def analyze_evaluation_complete(evaluation, patient):
     if vitals['temperature'] > 38.5:
         alerts.append({
             'level': 'critical',
+            'vital': 'temperature',
             'message': f"Fiebre alta: {vitals['temperature']}°C"
         })
         recommendations.append("🚨 Evaluar foco infeccioso - Contactar médico")
@@ -777,6 +1225,7 @@ def analyze_evaluation_complete(evaluation, patient):
     elif vitals['temperature'] > 37.8:
         alerts.append({
             'level': 'warning',
+            'vital': 'temperature',
             'message': f"Febrícula: {vitals['temperature']}°C"
         })
         recommendations.append("Monitorizar evolución y buscar signos de infección")
@@ -784,6 +1233,7 @@ def analyze_evaluation_complete(evaluation, patient):
     elif vitals['temperature'] < 36.0:
         alerts.append({
             'level': 'warning',
+            'vital': 'temperature',
             'message': f"Hipotermia: {vitals['temperature']}°C"
         })
         recommendations.append("Medidas de calentamiento y evaluar causas")
@@ -793,6 +1243,7 @@ def analyze_evaluation_complete(evaluation, patient):
     if vitals['oxygen_saturation'] < 90:
         alerts.append({
             'level': 'critical',
+            'vital': 'oxygen_saturation',
             'message': f"Hipoxemia severa: {vitals['oxygen_saturation']}%"
         })
         recommendations.append("🚨 OXÍGENO INMEDIATO - Contactar médico urgente")
@@ -800,6 +1251,7 @@ def analyze_evaluation_complete(evaluation, patient):
     elif vitals['oxygen_saturation'] < 95:
         alerts.append({
             'level': 'warning',
+            'vital': 'oxygen_saturation',
             'message': f"Hipoxemia: {vitals['oxygen_saturation']}%"
         })
         recommendations.append("Evaluar necesidad de oxigenoterapia")
@@ -809,6 +1261,7 @@ def analyze_evaluation_complete(evaluation, patient):
     if vitals['pain_level'] >= 8:
         alerts.append({
             'level': 'critical',
+            'vital': 'pain_level',
             'message': f"Dolor severo: {vitals['pain_level']}/10"
         })
         recommendations.append("🚨 Analgesia urgente - Evaluar causa del dolor")
@@ -816,6 +1269,7 @@ def analyze_evaluation_complete(evaluation, patient):
     elif vitals['pain_level'] >= 6:
         alerts.append({
             'level': 'warning',
+            'vital': 'pain_level',
             'message': f"Dolor moderado-severo: {vitals['pain_level']}/10"
         })
         recommendations.append("Optimizar analgesia según protocolo")
@@ -885,6 +1339,15 @@ def analyze_evaluation_complete(evaluation, patient):
             })
             severity_score += 1
     
+    # Contrastar con la basal personal del residente
+    if baseline_deviations:
+        baseline_detector.annotate_alerts(alerts, baseline_deviations)
+        personal_alerts = baseline_detector.baseline_alerts(baseline_deviations)
+        if personal_alerts:
+            alerts.extend(personal_alerts)
+            recommendations.append("Cambio respecto a la basal habitual del residente - Reevaluar en 2-4 horas")
+            severity_score += 1
+    
     # Determinar nivel de severidad general
     if severity_score >= 10:
         severity_level = "CRÍTICO"
@@ -913,67 +1376,73 @@ def analyze_evaluation_complete(evaluation, patient):
         'severity_score': severity_score,
         'severity_level': severity_level,
         'requires_immediate_attention': severity_score >= 6 or any(a['level'] == 'critical' for a in alerts),
-        'analysis_timestamp': datetime.now().isoformat()
+        'analysis_timestamp': datetime.now().isoformat(),
+        'baseline_deviations': baseline_deviations
     }
 
+@st.cache_resource
+def get_persistence_pipeline():
+    """
+    Canal de persistencia compartido: cada evaluación se serializa una vez y
+    se reparte al CSV diario y a las series de signos vitales
+    """
+    sinks = [CsvSink(ReportWriter(directory="data/reports", prefix="evaluaciones_diarias"))]
+    sinks.append(VitalSink(get_vital_store()))
+    pipeline = PersistencePipeline(sinks)
+    atexit.register(pipeline.close)
+    return pipeline
+
+@st.cache_resource
+def get_vital_store():
+    """Series de signos vitales por residente; se generan desde el historial la primera vez"""
+    store = VitalStore("data/vitals")
+    repository = get_repository()
+    if not store.patient_ids() and repository is not None:
+        store.rebuild(repository.evaluations())
+    return store
+
+@st.cache_resource
+def get_parquet_archive():
+    """Archivo Parquet de los días cerrados, compactado en segundo plano (requiere pyarrow)"""
+    if parquet is None:
+        return None
+    archive = ParquetArchive(reports_dir="data/reports", archive_dir="data/archive/parquet")
+    archive.start(interval=3600)
+    return archive
+
+@st.cache_resource
+def get_report_retention():
+    """
+    Retención de data/reports en segundo plano: los días cerrados se agrupan
+    en archivos mensuales (REPORTS_KEEP_DAILY_DAYS, por defecto 31) y los
+    meses más antiguos que REPORTS_KEEP_MONTHS se borran (sin valor, nunca)
+    """
+    archive = get_parquet_archive()
+    keep_months = os.getenv('REPORTS_KEEP_MONTHS')
+    retention = ReportRetention(
+        reports_dir="data/reports",
+        keep_daily_days=int(os.getenv('REPORTS_KEEP_DAILY_DAYS', 31)),
+        keep_months=int(keep_months) if keep_months else None,
+        # El archivo Parquet debe tener los días antes de que desaparezcan sus CSV
+        prepare=archive.compact if archive is not None else None
+    )
+    retention.start(interval=86400)
+    return retention
+
+@st.cache_resource
+def get_backup_manager():
+    """Copias de seguridad comprimidas del repositorio en data/backups"""
+    repository = get_repository()
+    if repository is None:
+        return None
+    return BackupManager(repository, directory="data/backups")
+
 def save_evaluation_to_csv(evaluation, patient, analysis):
-    """Guarda la evaluación en un archivo CSV diario"""
+    """Guarda la evaluación en el CSV diario y en el resto de destinos de persistencia"""
     try:
-        # Crear directorio si no existe
-        reports_dir = "data/reports"
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        # Nombre del archivo CSV diario
-        today = date.today().strftime("%Y-%m-%d")
-        csv_filename = os.path.join(reports_dir, f"evaluaciones_diarias_{today}.csv")
-        
-        # Preparar datos para CSV
-        csv_data = {
-            'fecha_evaluacion': evaluation['date'],
-            'hora_evaluacion': evaluation['time'],
-            'id_paciente': evaluation['patient_id'],
-            'nombre_paciente': evaluation['patient_name'],
-            'edad': patient['age'],
-            'habitacion': patient['room'],
-            'presion_sistolica': evaluation['vital_signs']['systolic_bp'],
-            'presion_diastolica': evaluation['vital_signs']['diastolic_bp'],
-            'frecuencia_cardiaca': evaluation['vital_signs']['heart_rate'],
-            'temperatura': evaluation['vital_signs']['temperature'],
-            'saturacion_oxigeno': evaluation['vital_signs']['oxygen_saturation'],
-            'nivel_dolor': evaluation['vital_signs']['pain_level'],
-            'estado_movilidad': evaluation['general_status']['mobility'],
-            'apetito': evaluation['general_status']['appetite'],
-            'calidad_sueno': evaluation['general_status']['sleep_quality'],
-            'estado_animo': evaluation['general_status']['mood'],
-            'estado_cognitivo': evaluation['general_status']['cognitive_status'],
-            'continencia': evaluation['general_status']['continence'],
-            'sintomas_observados': ', '.join(evaluation['symptoms']) if evaluation['symptoms'] else 'Ninguno',
-            'observaciones_adicionales': evaluation['observations'],
-            'evaluador': evaluation['evaluator'],
-            'puntuacion_severidad': analysis['severity_score'],
-            'nivel_severidad': analysis['severity_level'],
-            'requiere_atencion_medica': 'Sí' if analysis['requires_immediate_attention'] else 'No',
-            'alertas_criticas': len([a for a in analysis['alerts'] if a['level'] == 'critical']),
-            'alertas_advertencia': len([a for a in analysis['alerts'] if a['level'] == 'warning']),
-            'numero_recomendaciones': len(analysis['recommendations'])
-        }
-        
-        # Verificar si el archivo existe
-        file_exists = os.path.exists(csv_filename)
-        
-        # Escribir al CSV
-        with open(csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-            fieldnames = list(csv_data.keys())
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            
-            # Escribir encabezados solo si es un archivo nuevo
-            if not file_exists:
-                writer.writeheader()
-            
-            # Escribir datos de la evaluación
-            writer.writerow(csv_data)
-        
-        return csv_filename
+        pipeline = get_persistence_pipeline()
+        pipeline.publish_evaluation(evaluation, patient, analysis)
+        return pipeline.sink("CSV diario").writer.path
     
     except Exception as e:
         st.error(f"Error al guardar reporte CSV: {str(e)}")
@@ -1024,6 +1493,18 @@ def show_evaluation_results(evaluation, analysis, patient):
         </div>
         """, unsafe_allow_html=True)
     
+    # Escala de alerta temprana
+    early_warning = analysis.get('early_warning')
+    if early_warning:
+        st.markdown("### 🩺 Escala de Alerta Temprana (NEWS2)")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Puntuación agregada", early_warning['score'])
+        with col2:
+            st.metric("Riesgo clínico", early_warning['risk_band'])
+        with col3:
+            st.metric("Variación 24 h", f"+{early_warning['rise_24h']}")
+    
     # Mostrar alertas si las hay
     if analysis['alerts']:
         st.markdown("### 🚨 Alertas Detectadas")
@@ -1092,6 +1573,25 @@ def show_evaluation_results(evaluation, analysis, patient):
         st.write(f"• **Cognitivo:** {evaluation['general_status']['cognitive_status']}")
         st.write(f"• **Continencia:** {evaluation['general_status']['continence']}")
     
+    # Tendencias del paciente (estadísticas deslizantes)
+    rolling_stats = st.session_state.get('rolling_stats')
+    if rolling_stats:
+        summary = rolling_stats.patient_summary(evaluation['patient_id'], '7d')
+        trend_rows = [
+            {
+                'Parámetro': vital,
+                'N': stats['count'],
+                'Media': round(stats['mean'], 1),
+                'Mín': stats['min'],
+                'Máx': stats['max'],
+                'Pendiente/día': round(stats['slope'], 2) if stats['slope'] is not None else None
+            }
+            for vital, stats in summary.items() if stats['count'] > 1
+        ]
+        if trend_rows:
+            st.markdown("### 📉 Tendencias de los Últimos 7 Días")
+            st.dataframe(pd.DataFrame(trend_rows), hide_index=True, use_container_width=True)
+    
     # Síntomas si los hay
     if evaluation['symptoms']:
         st.markdown("### 🔍 Síntomas Observados")
@@ -1205,7 +1705,7 @@ def show_reports():
     """Página de reportes y estadísticas"""
     st.markdown("## 📊 Reportes y Estadísticas")
     
-    if not st.session_state.evaluations:
+    if not get_evaluations():
         st.markdown("""
         <div class="alert-warning">
             📊 <strong>No hay evaluaciones para generar reportes</strong><br>
@@ -1219,9 +1719,11 @@ def show_reports():
     
     col1, col2, col3, col4 = st.columns(4)
     
-    total_evaluations = len(st.session_state.evaluations)
-    unique_patients = len(set(e['patient_id'] for e in st.session_state.evaluations))
-    today_evaluations = sum(1 for e in st.session_state.evaluations if e['date'] == str(date.today()))
+    batch = get_assessment_batch()
+    counters = get_evaluation_counters()
+    total_evaluations = len(counters)
+    unique_patients = counters.unique_patients()
+    today_evaluations = counters.count_on(date.today())
     
     with col1:
         st.metric("📋 Total Evaluaciones", total_evaluations)
@@ -1230,47 +1732,28 @@ def show_reports():
     with col3:
         st.metric("📅 Evaluaciones Hoy", today_evaluations)
     with col4:
-        avg_per_day = total_evaluations / max(1, len(set(e['date'] for e in st.session_state.evaluations)))
+        avg_per_day = total_evaluations / max(1, counters.active_days())
         st.metric("📊 Promedio/Día", f"{avg_per_day:.1f}")
     
+    col1, col2 = st.columns(2)
+    with col1:
+        severities = cached_view('reports_severities', lambda: count_frame(counters.severity_counts(), 'Severidad'))
+        if not severities.empty:
+            st.markdown("**Evaluaciones por severidad**")
+            st.dataframe(severities, use_container_width=True, hide_index=True)
+    with col2:
+        evaluators = cached_view('reports_evaluators', lambda: count_frame(counters.evaluator_counts(), 'Evaluador'))
+        if not evaluators.empty:
+            st.markdown("**Evaluaciones por evaluador**")
+            st.dataframe(evaluators, use_container_width=True, hide_index=True)
+    
     # Tabla de evaluaciones recientes
     st.markdown("### 📋 Evaluaciones Recientes")
     
-    # Preparar datos para la tabla
-    recent_evaluations = st.session_state.evaluations[-20:]  # Últimas 20
-    
-    table_data = []
-    for eval_data in reversed(recent_evaluations):
-        patient_name = eval_data.get('patient_name', 'N/A')
-        date_str = eval_data.get('date', 'N/A')
-        time_str = eval_data.get('time', 'N/A')
-        
-        # Obtener algunos valores clave
-        vitals = eval_data.get('vital_signs', {})
-        bp = vitals.get('blood_pressure', 'N/A')
-        hr = vitals.get('heart_rate', 'N/A')
-        temp = vitals.get('temperature', 'N/A')
-        pain = vitals.get('pain_level', 'N/A')
-        
-        # Estado general
-        status = eval_data.get('general_status', {})
-        mobility = status.get('mobility', 'N/A')
-        mood = status.get('mood', 'N/A')
-        
-        table_data.append({
-            'Fecha': date_str,
-            'Hora': time_str,
-            'Paciente': patient_name,
-            'PA': bp,
-            'FC': f"{hr} lpm" if hr != 'N/A' else 'N/A',
-            'Temp': f"{temp}°C" if temp != 'N/A' else 'N/A',
-            'Dolor': f"{pain}/10" if pain != 'N/A' else 'N/A',
-            'Movilidad': mobility,
-            'Ánimo': mood
-        })
+    # Últimas 20, la más reciente primero
+    df = cached_view('reports_recent', lambda: batch.recent_frame(20), 20)
     
-    if table_data:
-        df = pd.DataFrame(table_data)
+    if not df.empty:
         st.dataframe(df, use_container_width=True, hide_index=True)
         
         # Botones de exportación
@@ -1291,49 +1774,7 @@ def show_reports():
         
         with col2:
             if st.button("📋 Reporte Completo", use_container_width=True):
-                complete_data = []
-                for eval_data in st.session_state.evaluations:
-                    # Crear registro completo
-                    record = {
-                        'ID_Evaluacion': eval_data.get('id', ''),
-                        'ID_Paciente': eval_data.get('patient_id', ''),
-                        'Nombre_Paciente': eval_data.get('patient_name', ''),
-                        'Fecha': eval_data.get('date', ''),
-                        'Hora': eval_data.get('time', ''),
-                        'Evaluador': eval_data.get('evaluator', ''),
-                    }
-                    
-                    # Signos vitales
-                    vitals = eval_data.get('vital_signs', {})
-                    record.update({
-                        'PA_Sistolica': vitals.get('systolic_bp', ''),
-                        'PA_Diastolica': vitals.get('diastolic_bp', ''),
-                        'Frecuencia_Cardiaca': vitals.get('heart_rate', ''),
-                        'Temperatura': vitals.get('temperature', ''),
-                        'Saturacion_O2': vitals.get('oxygen_saturation', ''),
-                        'Nivel_Dolor': vitals.get('pain_level', '')
-                    })
-                    
-                    # Estado general
-                    status = eval_data.get('general_status', {})
-                    record.update({
-                        'Movilidad': status.get('mobility', ''),
-                        'Apetito': status.get('appetite', ''),
-                        'Calidad_Sueno': status.get('sleep_quality', ''),
-                        'Estado_Animo': status.get('mood', ''),
-                        'Estado_Cognitivo': status.get('cognitive_status', ''),
-                        'Continencia': status.get('continence', '')
-                    })
-                    
-                    # Otros datos
-                    record.update({
-                        'Sintomas': ', '.join(eval_data.get('symptoms', [])),
-                        'Observaciones': eval_data.get('observations', '')
-                    })
-                    
-                    complete_data.append(record)
-                
-                complete_df = pd.DataFrame(complete_data)
+                complete_df = batch.export_frame()
                 csv_complete = complete_df.to_csv(index=False)
                 
                 st.download_button(
@@ -1349,25 +1790,103 @@ def show_reports():
                 st.markdown("🚧 Estadísticas avanzadas próximamente disponibles")
     
     # Gráficos simples si hay datos suficientes
-    if len(st.session_state.evaluations) > 1:
+    if len(get_evaluations()) > 1:
         st.markdown("### 📈 Tendencias")
         
         # Gráfico de evaluaciones por día
-        daily_counts = {}
-        for eval_data in st.session_state.evaluations:
-            date_key = eval_data.get('date', str(date.today()))
-            daily_counts[date_key] = daily_counts.get(date_key, 0) + 1
+        daily_counts = cached_view('reports_trend', lambda: chart_counts(counters.daily_counts()))
         
-        if daily_counts:
-            dates = list(daily_counts.keys())
-            counts = list(daily_counts.values())
-            
-            chart_data = pd.DataFrame({
-                'Fecha': [datetime.strptime(d, '%Y-%m-%d').strftime('%d/%m') for d in sorted(dates)],
-                'Evaluaciones': [daily_counts[d] for d in sorted(dates)]
+        if not daily_counts.empty:
+            st.line_chart(daily_counts, height=300)
+    
+    # Consulta de síntomas sobre todo el historial
+    st.markdown("### 🔍 Consulta de Síntomas")
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        queried_symptoms = st.multiselect("Síntomas", SYMPTOMS, default=["Confusión", "Caídas recientes"])
+    with col2:
+        period_days = st.number_input("Últimos días", min_value=1, max_value=3650, value=7)
+    with col3:
+        match = st.radio("Coincidencia", ["Alguno", "Todos"], horizontal=True)
+    
+    if queried_symptoms:
+        today = date.today()
+        matches = cached_view('reports_symptoms', lambda: batch.patients_with_symptoms(
+            queried_symptoms, match='all' if match == "Todos" else 'any',
+            start=today - timedelta(days=int(period_days) - 1), end=today
+        ), tuple(queried_symptoms), match, int(period_days), today)
+        if matches.empty:
+            st.info("Ningún residente presenta esos síntomas en el periodo seleccionado")
+        else:
+            matches = matches.rename(columns={
+                'patient_id': 'ID', 'patient_name': 'Paciente',
+                'evaluations': 'Evaluaciones', 'last_seen': 'Última'
             })
-            
-            st.line_chart(chart_data.set_index('Fecha'), height=300)
+            st.dataframe(matches, use_container_width=True, hide_index=True)
+    
+    # Informe trimestral a partir del archivo Parquet
+    archive = get_parquet_archive()
+    if archive is not None:
+        st.markdown("### 📦 Informe Trimestral del Archivo")
+        years = archive.years()
+        if not years:
+            st.info("Todavía no hay días cerrados archivados")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                year = st.selectbox("Año", years[::-1])
+            with col2:
+                quarter = st.selectbox("Trimestre", [1, 2, 3, 4], index=(date.today().month - 1) // 3)
+            # Sólo se leen los meses del trimestre y las columnas del resumen
+            quarter_df = archive.read_quarter(year, quarter, columns=[
+                'fecha_evaluacion', 'id_paciente', 'nivel_severidad', 'requiere_atencion_medica'
+            ])
+            if quarter_df.empty:
+                st.info("No hay evaluaciones archivadas en ese trimestre")
+            else:
+                month = quarter_df['fecha_evaluacion'].dt.to_period('M').astype(str).rename('Mes')
+                summary = quarter_df.groupby(month).agg(
+                    Evaluaciones=('id_paciente', 'size'),
+                    Residentes=('id_paciente', 'nunique'),
+                    Atención_Médica=('requiere_atencion_medica', lambda values: int((values == 'Sí').sum()))
+                )
+                severity = pd.crosstab(month, quarter_df['nivel_severidad'].astype(str))
+                st.dataframe(summary.join(severity), use_container_width=True)
+    
+    # Historial de reportes diarios: los días recientes primero, los anteriores por páginas
+    history = get_report_history()
+    if history.index(refresh=True):
+        st.markdown("### 🗂️ Historial de Reportes Diarios")
+        available = history.days()
+        loaded = st.session_state.setdefault('history_pages', 1) * HISTORY_PAGE_DAYS
+        days = available[-loaded:]
+        st.caption(f"{len(available)} días con reporte ({available[0]:%d/%m/%Y} - {available[-1]:%d/%m/%Y}); "
+                   f"mostrando {len(days)}")
+        history_df = history.read_days(days[::-1], [
+            'fecha_evaluacion', 'hora_evaluacion', 'nombre_paciente', 'habitacion',
+            'nivel_severidad', 'sintomas_observados', 'evaluador'
+        ])
+        st.dataframe(history_df.rename(columns={
+            'fecha_evaluacion': 'Fecha', 'hora_evaluacion': 'Hora', 'nombre_paciente': 'Paciente',
+            'habitacion': 'Habitación', 'nivel_severidad': 'Severidad', 'sintomas_observados': 'Síntomas',
+            'evaluador': 'Evaluador'
+        }), use_container_width=True, hide_index=True)
+        if len(days) < len(available) and st.button(f"⏪ Cargar {HISTORY_PAGE_DAYS} días anteriores",
+                                                     use_container_width=True):
+            st.session_state.history_pages += 1
+            st.rerun()
+    
+    # Revisión de basales personales de todo el censo
+    st.markdown("### 🎯 Desviaciones Respecto a la Basal Personal")
+    if st.button("🔎 Revisar Censo Completo", use_container_width=True):
+        sweep = BaselineAnomalyDetector().census_sweep(get_evaluations())
+        anomalies = sweep[sweep['anomalous']]
+        if anomalies.empty:
+            st.success("✅ Ningún residente se desvía de su basal en su última evaluación")
+        else:
+            names = {pid: p['name'] for pid, p in get_patients().items()}
+            anomalies = anomalies.assign(paciente=anomalies['patient_id'].map(names))
+            st.dataframe(anomalies, use_container_width=True, hide_index=True)
 
 def show_emergency_protocols():
     """Página de protocolos de emergencia"""
@@ -1485,44 +2004,80 @@ def show_emergency_protocols():
     
     # Calculadora de riesgo de caídas
     st.markdown("---")
-    st.markdown("### ⚖️ Calculadora de Riesgo de Caídas (Escala Morse)")
+    st.markdown("### ⚖️ Calculadora de Riesgo de Caídas (Escalas Morse y Downton)")
     
-    if st.session_state.patients:
-        patient_options = {p['name']: p['id'] for p in st.session_state.patients.values()}
+    if get_patients():
+        scorer = get_fall_risk_scorer()
+        patient_options = {p['name']: p['id'] for p in get_patients().values()}
         selected_patient = st.selectbox("Seleccionar paciente para evaluar:", list(patient_options.keys()))
         
         if selected_patient:
+            patient_id = patient_options[selected_patient]
+            previous = scorer.history.latest(patient_id)
+            if previous:
+                downton_note = (f", Downton {previous.downton_score}"
+                                if previous.downton_score is not None else "")
+                st.caption(f"Última valoración: {previous.morse_score} puntos "
+                           f"({previous.morse_level}){downton_note} el "
+                           f"{previous.scored_at.strftime('%d/%m/%Y')}")
+            previous_downton = previous.downton_inputs if previous else None
+            
+            def yes_no(points):
+                return lambda value: f"Sí ({points})" if value else "No (0)"
+            
+            def with_points(option):
+                return f"{option.label} ({option.points})"
+            
             with st.form("morse_scale_form"):
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    history_falls = st.selectbox("Historial de caídas:", ["No (0)", "Sí (25)"])
-                    secondary_diagnosis = st.selectbox("Diagnóstico secundario:", ["No (0)", "Sí (15)"])
-                    ambulatory_aid = st.selectbox(
-                        "Ayuda para caminar:",
-                        ["Ninguna/Reposo/Enfermera (0)", "Muletas/Bastón/Andador (15)", "Mobiliario (30)"]
-                    )
+                    history_falls = st.selectbox("Historial de caídas:", [False, True], format_func=yes_no(25))
+                    secondary_diagnosis = st.selectbox("Diagnóstico secundario:", [False, True],
+                                                       format_func=yes_no(15))
+                    ambulatory_aid = st.selectbox("Ayuda para caminar:", list(AmbulatoryAid),
+                                                  format_func=with_points)
+                
+                with col2:
+                    iv_therapy = st.selectbox("Terapia IV/Heparina:", [False, True], format_func=yes_no(20))
+                    gait = st.selectbox("Marcha:", list(Gait), format_func=with_points)
+                    mental_status = st.selectbox("Estado mental:", list(MentalStatus), format_func=with_points)
                 
+                # Downton: caídas, confusión y marcha se toman de los ítems de Morse
+                st.markdown("**Escala Downton**")
+                col1, col2 = st.columns(2)
+                with col1:
+                    medications = st.multiselect(
+                        "Medicamentos:", DOWNTON_MEDICATIONS,
+                        default=[m for m in previous_downton.medications if m in DOWNTON_MEDICATIONS]
+                        if previous_downton else [],
+                        help="Un punto por cada grupo; otros fármacos no puntúan"
+                    )
                 with col2:
-                    iv_therapy = st.selectbox("Terapia IV/Heparina:", ["No (0)", "Sí (20)"])
-                    gait = st.selectbox(
-                        "Marcha:",
-                        ["Normal/Reposo/Inmóvil (0)", "Débil (10)", "Alterada (20)"]
+                    sensory_deficits = st.multiselect(
+                        "Déficits sensoriales:", DOWNTON_SENSORY_DEFICITS,
+                        default=[d for d in previous_downton.sensory_deficits if d in DOWNTON_SENSORY_DEFICITS]
+                        if previous_downton else []
                     )
-                    mental_status = st.selectbox("Estado mental:", ["Orientado (0)", "Desorientado (15)"])
                 
                 if st.form_submit_button("🔍 Calcular Riesgo de Caídas"):
-                    # Extraer puntuaciones
-                    score = 0
-                    score += 25 if "25" in history_falls else 0
-                    score += 15 if "15" in secondary_diagnosis else 0
-                    score += 30 if "30" in ambulatory_aid else (15 if "15" in ambulatory_aid else 0)
-                    score += 20 if "20" in iv_therapy else 0
-                    score += 20 if "20" in gait else (10 if "10" in gait else 0)
-                    score += 15 if "15" in mental_status else 0
+                    morse_inputs = MorseInputs(
+                        history_of_falls=history_falls,
+                        secondary_diagnosis=secondary_diagnosis,
+                        ambulatory_aid=ambulatory_aid,
+                        iv_therapy=iv_therapy,
+                        gait=gait,
+                        mental_status=mental_status
+                    )
+                    downton_inputs = DowntonInputs.from_morse(morse_inputs, medications, sensory_deficits)
+                    result = scorer.score(patient_id, morse_inputs, downton_inputs)
+                    patient = dict(get_patients()[patient_id])
+                    scorer.apply_to_patient(patient, result)
+                    update_patient(patient)
+                    score = result.morse_score
                     
                     # Determinar nivel de riesgo
-                    if score >= 51:
+                    if result.morse_level == "ALTO":
                         risk_level = "ALTO"
                         risk_color = "#dc3545"
                         recommendations = [
@@ -1534,7 +2089,7 @@ def show_emergency_protocols():
                             "💡 Iluminación nocturna adecuada",
                             "📋 Reevaluación médica urgente"
                         ]
-                    elif score >= 25:
+                    elif result.morse_level == "MODERADO":
                         risk_level = "MODERADO"
                         risk_color = "#ffc107"
                         recommendations = [
@@ -1572,13 +2127,38 @@ def show_emergency_protocols():
                             <h2 style="margin: 0; color: {risk_color};">RIESGO {risk_level}</h2>
                             <h1 style="margin: 0.5rem 0; color: {risk_color};">{score}</h1>
                             <p style="margin: 0; color: #666;">Puntuación Morse</p>
+                            <p style="margin: 0.5rem 0 0 0; color: #666;">Downton: {result.downton_score}</p>
                         </div>
                         """, unsafe_allow_html=True)
                     
                     with col2:
+                        if result.downton_score >= 3 and result.morse_level != "ALTO":
+                            st.warning("⚠️ Downton ≥ 3: riesgo de caídas alto aunque Morse sea menor")
                         st.markdown("**🎯 Medidas Preventivas Recomendadas:**")
                         for rec in recommendations:
                             st.markdown(f"• {rec}")
+        
+        # Re-evaluación periódica de todo el censo
+        st.markdown("#### 🔄 Re-evaluación Semanal del Censo")
+        st.caption("Recalcula las escalas Morse y Downton de todos los residentes a partir de sus "
+                   "últimas evaluaciones y de su valoración previa.")
+        if st.button("🔄 Re-evaluar Riesgo de Caídas de Todos", use_container_width=True):
+            patients = {pid: dict(patient) for pid, patient in get_patients().items()}
+            results = scorer.rescore_census(patients, get_evaluations())
+            update_patients(patients[pid] for pid in results)
+            rescore_df = pd.DataFrame([
+                {
+                    'Paciente': get_patients()[pid]['name'],
+                    'Habitación': get_patients()[pid]['room'],
+                    'Morse': result.morse_score,
+                    'Nivel': result.morse_level,
+                    'Downton': result.downton_score,
+                    'Riesgo de caídas': result.fall_risk
+                }
+                for pid, result in results.items()
+            ]).sort_values('Morse', ascending=False)
+            st.success(f"✅ {len(results)} residentes re-evaluados")
+            st.dataframe(rescore_df, use_container_width=True, hide_index=True)
 
 def show_settings():
     """Página de configuración"""
@@ -1608,28 +2188,58 @@ def show_settings():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("👥 Total Pacientes", len(st.session_state.patients))
+        st.metric("👥 Total Pacientes", len(get_patients()))
     with col2:
-        st.metric("📋 Total Evaluaciones", len(st.session_state.evaluations))
+        st.metric("📋 Total Evaluaciones", len(get_evaluations()))
     with col3:
-        days_active = len(set(e.get('date', str(date.today())) for e in st.session_state.evaluations))
+        days_active = get_evaluation_counters().active_days()
         st.metric("📅 Días Activos", days_active)
+    st.caption(f"Datos compartidos por todas las sesiones · versión {get_data_version()}")
+    
+    render_stats = get_render_cache().stats()
+    with st.expander(f"⚡ Caché de vistas · {render_stats['hit_rate']:.0%} de aciertos"):
+        st.caption(f"{render_stats['entries']} vistas guardadas para la versión {render_stats['version']} · "
+                   f"{render_stats['evictions']} descartadas")
+        if render_stats['views']:
+            st.dataframe(pd.DataFrame([
+                {'Vista': view, 'Aciertos': counts['hits'], 'Cálculos': counts['misses'],
+                 'Aciertos (%)': round(100 * counts['hits'] / (counts['hits'] + counts['misses']))}
+                for view, counts in render_stats['views'].items()
+            ]), use_container_width=True, hide_index=True)
     
     st.markdown("### 🗑️ Gestión de Datos")
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if st.button("📥 Exportar Todos los Datos", use_container_width=True):
-            # Crear backup completo
+        backup_manager = get_backup_manager()
+        if backup_manager is not None:
+            incremental = st.checkbox("Sólo cambios desde la última copia", key="backup_incremental")
+            if st.button("📥 Exportar Todos los Datos", use_container_width=True):
+                # La copia se escribe comprimida en disco una sola vez; las recargas sólo la descargan
+                st.session_state.last_backup = backup_manager.create(incremental=incremental)
+            backup = st.session_state.get('last_backup')
+            if backup and os.path.exists(backup_manager.path(backup)):
+                st.caption(f"{'Incremental' if backup['type'] == 'incremental' else 'Completa'}: "
+                           f"{backup['patients']} pacientes, {backup['evaluations']} evaluaciones, "
+                           f"{backup['bytes'] / 1024:,.0f} KB en {backup['seconds']:.1f} s")
+                with open(backup_manager.path(backup), 'rb') as backup_file:
+                    st.download_button(
+                        label="💾 Descargar Backup",
+                        data=backup_file,
+                        file_name=backup['file'],
+                        mime="application/octet-stream"
+                    )
+        elif st.button("📥 Exportar Todos los Datos", use_container_width=True):
+            # Sin base de datos: copia completa de los datos de la sesión
             backup_data = {
-                'patients': st.session_state.patients,
-                'evaluations': st.session_state.evaluations,
+                'patients': dict(get_patients()),
+                'evaluations': list(get_evaluations()),
                 'export_date': str(date.today()),
                 'export_time': datetime.now().strftime("%H:%M:%S")
             }
             
-            backup_json = json.dumps(backup_data, indent=2, ensure_ascii=False)
+            backup_json = json.dumps(backup_data, ensure_ascii=False, separators=(',', ':'))
             
             st.download_button(
                 label="💾 Descargar Backup",
@@ -1641,8 +2251,7 @@ def show_settings():
     with col2:
         if st.button("🔄 Reiniciar Datos de Prueba", use_container_width=True):
             if st.checkbox("Confirmar reinicio"):
-                st.session_state.patients = {}
-                st.session_state.evaluations = []
+                clear_all_data()
                 st.success("✅ Datos reiniciados")
                 st.rerun()
     
@@ -1658,6 +2267,90 @@ def show_settings():
                 <p><strong>Última actualización:</strong> {}</p>
             </div>
             """.format(date.today().strftime("%d/%m/%Y")), unsafe_allow_html=True)
+    
+    retention = get_report_retention()
+    st.markdown("### 🧹 Retención de Reportes Diarios")
+    months = (f"los archivos de más de {retention.keep_months} meses se borran"
+              if retention.keep_months is not None else "los archivos mensuales se conservan")
+    st.caption(f"Los CSV diarios de más de {retention.keep_daily_days} días se agrupan en archivos "
+               f"mensuales comprimidos; {months}.")
+    if st.button("🧹 Aplicar Retención Ahora", use_container_width=True):
+        retention.run()
+    last_run = retention.last_run
+    if last_run:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("🗓️ Días Archivados", last_run['days_archived'])
+        with col2:
+            st.metric("💾 Espacio Liberado", f"{last_run['bytes_reclaimed'] / 1024 ** 2:.1f} MB")
+        with col3:
+            st.metric("⏱️ Duración", f"{last_run['seconds']:.2f} s")
+        for error in last_run['errors']:
+            st.warning(error)
+    
+    st.markdown("### 💽 Destinos de Persistencia")
+    st.dataframe(get_persistence_pipeline().stats(), use_container_width=True, hide_index=True)
+    
+    event_log = get_event_log()
+    if event_log is not None:
+        st.markdown("### 🗄️ Registro de Eventos")
+        st.caption("Cada alta, evaluación y análisis queda registrado en disco; "
+                   "las instantáneas periódicas permiten restaurar los datos leyendo sólo los últimos eventos.")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("🔢 Eventos Registrados", event_log.last_seq)
+        with col2:
+            st.metric("🧾 Eventos desde la Última Instantánea", event_log.tail_length())
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("📸 Crear Instantánea", use_container_width=True):
+                event_log.snapshot()
+                st.success("✅ Instantánea creada")
+        with col2:
+            if st.button("♻️ Restaurar desde el Registro", use_container_width=True):
+                state = restore_from_event_log()
+                st.success(f"✅ Restaurados {len(state.patients)} pacientes y "
+                           f"{len(state.evaluations)} evaluaciones")
+    
+    st.markdown("### ♻️ Restaurar o Fusionar Copia de Seguridad")
+    st.caption("Incorpora una copia exportada desde otro equipo (por ejemplo, la tableta del turno de noche): "
+               "los registros ya presentes se omiten y los pacientes con otro ID se reasignan.")
+    
+    if get_repository() is None:
+        st.info("La restauración requiere la base de datos local.")
+    else:
+        backup_file = st.file_uploader("Copia de seguridad (.json, .json.gz, .json.zst)",
+                                       type=['json', 'gz', 'zst'], key="backup_restore_file")
+        if backup_file is not None and st.button("♻️ Fusionar Copia", use_container_width=True):
+            try:
+                report = restore_backup(backup_file)
+            except (BackupFormatError, OSError, EOFError) as e:
+                st.error(f"❌ La copia no es válida: {e}")
+            else:
+                st.success(f"✅ Copia fusionada en {report.seconds:.1f} s")
+                st.dataframe(pd.DataFrame(report.summary()), use_container_width=True, hide_index=True)
+                if report.remapped_patients:
+                    st.info(f"🔀 {report.remapped_patients} pacientes recibieron un ID nuevo")
+                for error in report.errors:
+                    st.warning(error)
+        
+        backup_manager = get_backup_manager()
+        chain = backup_manager.chain() if backup_manager is not None else []
+        if chain:
+            st.caption("Copias locales necesarias para restaurar el último estado (completa e incrementales):")
+            st.dataframe(pd.DataFrame([{
+                'Copia': backup['file'], 'Tipo': backup['type'], 'Creada': backup['created'],
+                'Pacientes': backup['patients'], 'Evaluaciones': backup['evaluations'],
+                'KB': round(backup['bytes'] / 1024, 1)
+            } for backup in chain]), use_container_width=True, hide_index=True)
+            if st.button("♻️ Restaurar Cadena de Copias Locales", use_container_width=True):
+                reports = restore_backup_chain()
+                added = sum(sum(report.added.values()) for report in reports)
+                updated = sum(sum(report.updated.values()) for report in reports)
+                st.success(f"✅ {len(reports)} copias aplicadas: {added} registros añadidos, "
+                           f"{updated} actualizados")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+Archivo Parquet de los reportes diarios.
+
+Un proceso en segundo plano convierte cada día cerrado de
+``data/reports/evaluaciones_diarias_AAAA-MM-DD.csv`` en un fichero Parquet
+dentro de ``year=AAAA/month=MM/``, con columnas tipadas y las categorías
+codificadas como diccionario. El lector sólo abre los meses y días del
+intervalo pedido y sólo lee las columnas solicitadas.
+
+Es el único archivo columnar de las evaluaciones. Los días que la
+retención (``backend.report_retention``) ya movió a los archivos mensuales
+se leen de su miembro comprimido, junto con el CSV suelto de filas tardías
+si lo hay. Cada fichero Parquet guarda en sus metadatos la huella
+(sha256) de su origen, así que un día se rehace cuando le llegan filas
+tardías, estén todavía en el CSV o ya fusionadas en el archivo mensual.
+"""
+import glob
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from backend.persistence import CSV_FIELDS
+from backend.report_retention import MONTHLY_DIR, archived_days, read_archived_day
+
+# Columnas enteras (admiten nulos) y decimales del reporte diario
+INTEGER_FIELDS = ('id_paciente', 'edad', 'presion_sistolica', 'presion_diastolica', 'frecuencia_cardiaca',
+                  'saturacion_oxigeno', 'nivel_dolor', 'puntuacion_severidad', 'alertas_criticas',
+                  'alertas_advertencia', 'numero_recomendaciones')
+FLOAT_FIELDS = ('temperatura',)
+
+# Columnas con pocos valores distintos: se guardan como diccionario
+CATEGORY_FIELDS = ('nombre_paciente', 'habitacion', 'estado_movilidad', 'apetito', 'calidad_sueno',
+                   'estado_animo', 'estado_cognitivo', 'continencia', 'evaluador', 'nivel_severidad',
+                   'requiere_atencion_medica')
+
+_DAILY_CSV = re.compile(r"evaluaciones_diarias_(\d{4}-\d{2}-\d{2})\.csv$")
+
+# Clave de los metadatos Parquet con la huella del origen de cada día
+SOURCE_KEY = b'origen'
+
+
+def _integer_type(field: str):
+    return pa.int64() if field == 'id_paciente' else pa.int16()
+
+
+def archive_schema():
+    """Esquema Parquet del archivo (requiere pyarrow)"""
+    fields = []
+    for name in CSV_FIELDS:
+        if name == 'fecha_evaluacion':
+            fields.append(pa.field(name, pa.date32()))
+        elif name in INTEGER_FIELDS:
+            fields.append(pa.field(name, _integer_type(name)))
+        elif name in FLOAT_FIELDS:
+            fields.append(pa.field(name, pa.float64()))
+        elif name in CATEGORY_FIELDS:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+class ParquetArchive:
+    """
+    Archivo Parquet particionado por año y mes de los CSV diarios.
+
+    Cada día se guarda en su propio fichero, de modo que la compactación es
+    idempotente (un día ya archivado sólo se rehace si su CSV ha cambiado)
+    y el lector puede descartar días completos sin abrirlos.
+    """
+
+    def __init__(self, reports_dir: str = "data/reports", archive_dir: str = "data/archive/parquet"):
+        if pq is None:
+            raise ImportError("pyarrow no está instalado")
+        self.reports_dir = reports_dir
+        self.archive_dir = archive_dir
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_compaction: Optional[Dict[str, Any]] = None
+
+    # Rutas
+
+    def day_path(self, day: date) -> str:
+        return os.path.join(self.archive_dir, f"year={day.year:04d}", f"month={day.month:02d}",
+                            f"evaluaciones_{day.isoformat()}.parquet")
+
+    def daily_reports(self) -> List[Tuple[date, str]]:
+        """CSV diarios disponibles como (día, ruta), en orden"""
+        reports = []
+        for path in glob.glob(os.path.join(self.reports_dir, "evaluaciones_diarias_*.csv")):
+            match = _DAILY_CSV.search(os.path.basename(path))
+            if match:
+                reports.append((date.fromisoformat(match.group(1)), path))
+        return sorted(reports)
+
+    def day_sources(self) -> Dict[date, Dict[str, Any]]:
+        """
+        Origen de cada día: el miembro del archivo mensual (``archive``, como
+        (ruta, entrada del manifiesto)) y el CSV suelto (``csv``), si existen
+        """
+        sources: Dict[date, Dict[str, Any]] = {}
+        monthly = archived_days(os.path.join(self.reports_dir, MONTHLY_DIR), "evaluaciones_diarias")
+        for day, member in monthly.items():
+            sources[day] = {'archive': member, 'csv': None}
+        for day, path in self.daily_reports():
+            sources.setdefault(day, {'archive': None})['csv'] = path
+        return dict(sorted(sources.items()))
+
+    @staticmethod
+    def fingerprint(source: Dict[str, Any]) -> str:
+        """
+        Huella del origen de un día: sha256 del miembro mensual y del CSV.
+        El manifiesto guarda el sha256 del CSV original, así que un día
+        movido sin cambios al archivo mensual conserva su huella.
+        """
+        parts = []
+        if source['archive']:
+            parts.append(source['archive'][1]['sha256'])
+        if source['csv']:
+            with open(source['csv'], 'rb') as daily:
+                parts.append(hashlib.sha256(daily.read()).hexdigest())
+        return '|'.join(parts)
+
+    def archived_fingerprint(self, day: date) -> Optional[str]:
+        """Huella guardada en el Parquet de un día (None si no está archivado)"""
+        try:
+            metadata = pq.read_schema(self.day_path(day)).metadata or {}
+        except FileNotFoundError:
+            return None
+        value = metadata.get(SOURCE_KEY)
+        return value.decode() if value is not None else ''
+
+    def pending_days(self, today: Optional[date] = None) -> List[Tuple[date, Dict[str, Any]]]:
+        """Días cerrados (anteriores a hoy) sin archivar o cuyo origen ha cambiado desde entonces"""
+        today = today or date.today()
+        pending = []
+        for day, source in self.day_sources().items():
+            if day >= today:
+                continue
+            try:
+                if self.archived_fingerprint(day) != self.fingerprint(source):
+                    pending.append((day, source))
+            except FileNotFoundError:
+                # La retención acaba de mover el CSV: se archivará en la próxima pasada
+                continue
+        return pending
+
+    # Compactación
+
+    @staticmethod
+    def _to_table(frame: pd.DataFrame):
+        columns = {}
+        for field in archive_schema():
+            values = frame[field.name] if field.name in frame else pd.Series([None] * len(frame), dtype=object)
+            if field.name == 'fecha_evaluacion':
+                array = pa.array(pd.to_datetime(values, errors='coerce').dt.date, type=pa.date32())
+            elif field.name in INTEGER_FIELDS:
+                numbers = pd.to_numeric(values, errors='coerce').round().astype('Int64')
+                array = pa.array(numbers, type=field.type)
+            elif field.name in FLOAT_FIELDS:
+                array = pa.array(pd.to_numeric(values, errors='coerce'), type=pa.float64())
+            else:
+                strings = values.astype(object).where(values.notna(), None)
+                array = pa.array(strings, type=pa.string())
+                if field.name in CATEGORY_FIELDS:
+                    array = array.dictionary_encode()
+            columns[field.name] = array
+        return pa.table(columns, schema=archive_schema())
+
+    def compact_day(self, day: date, source: Dict[str, Any]) -> int:
+        """Archiva un día (miembro mensual y filas tardías del CSV) y devuelve el número de filas escritas"""
+        fingerprint = self.fingerprint(source)
+        readers = []
+        if source['archive']:
+            readers.append(io.BytesIO(read_archived_day(*source['archive'])))
+        if source['csv']:
+            readers.append(source['csv'])
+        frame = pd.concat([pd.read_csv(reader, dtype=str, keep_default_na=False, na_values=[''])
+                           for reader in readers], ignore_index=True)
+        table = self._to_table(frame).replace_schema_metadata({SOURCE_KEY: fingerprint.encode()})
+        path = self.day_path(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = path + ".tmp"
+        pq.write_table(table, temporary, compression='zstd', use_dictionary=list(CATEGORY_FIELDS))
+        os.replace(temporary, path)
+        return table.num_rows
+
+    def compact(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Archiva todos los días cerrados pendientes"""
+        with self._lock:
+            start = time.perf_counter()
+            days = rows = 0
+            for day, source in self.pending_days(today):
+                try:
+                    rows += self.compact_day(day, source)
+                    days += 1
+                except (OSError, ValueError, pa.ArrowException) as e:
+                    print(f"❌ Error archivando el día {day}: {e}")
+            self.last_compaction = {'days': days, 'rows': rows,
+                                    'seconds': time.perf_counter() - start, 'at': time.time()}
+            return self.last_compaction
+
+    def start(self, interval: float = 3600.0):
+        """Arranca la compactación periódica en segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,),
+                                            name="parquet-archive", daemon=True)
+            self._thread.start()
+
+    def _run(self, interval: float):
+        while True:
+            self.compact()
+            if self._stop.wait(interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+
+    # Lectura
+
+    def archived_days(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[date, str]]:
+        """
+        Ficheros diarios del intervalo. La poda es por partición: sólo se
+        listan los directorios de los años y meses que solapan el intervalo.
+        """
+        start_month = (start.year, start.month) if start else (0, 0)
+        end_month = (end.year, end.month) if end else (9999, 12)
+        files = []
+        for year_dir in glob.glob(os.path.join(self.archive_dir, "year=*")):
+            year = int(os.path.basename(year_dir)[len("year="):])
+            if not start_month[0] <= year <= end_month[0]:
+                continue
+            for month_dir in glob.glob(os.path.join(year_dir, "month=*")):
+                month = int(os.path.basename(month_dir)[len("month="):])
+                if not start_month <= (year, month) <= end_month:
+                    continue
+                for path in glob.glob(os.path.join(month_dir, "evaluaciones_*.parquet")):
+                    day = date.fromisoformat(os.path.basename(path)[len("evaluaciones_"):-len(".parquet")])
+                    if (start is None or day >= start) and (end is None or day <= end):
+                        files.append((day, path))
+        return sorted(files)
+
+    def read(self, start: Optional[date] = None, end: Optional[date] = None,
+             columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Evaluaciones archivadas entre dos fechas (ambas inclusive), leyendo
+        sólo las columnas indicadas; las categorías llegan como ``category``
+        """
+        columns = list(columns) if columns else None
+        tables = [pq.read_table(path, columns=columns) for _, path in self.archived_days(start, end)]
+        if not tables:
+            schema = archive_schema()
+            return pd.DataFrame(columns=columns or schema.names)
+        return pa.concat_tables(tables, promote_options='permissive').to_pandas(date_as_object=False)
+
+    def read_quarter(self, year: int, quarter: int, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Evaluaciones archivadas de un trimestre (1-4)"""
+        first_month = 3 * (quarter - 1) + 1
+        start = date(year, first_month, 1)
+        end = date(year + (first_month + 3 > 12), (first_month + 3 - 1) % 12 + 1, 1)
+        return self.read(start, date.fromordinal(end.toordinal() - 1), columns)
+
+    def years(self) -> List[int]:
+        """Años con datos archivados"""
+        return sorted({day.year for day, _ in self.archived_days()})
@@ -0,0 +1,161 @@
+"""
+Copias de seguridad comprimidas, completas e incrementales.
+
+La copia se escribe registro a registro a través del compresor (zstd si
+está instalado, si no gzip), sin montar el documento en memoria. Cada
+copia guarda el cursor del repositorio (generación y revisión) en el
+que se tomó; una copia incremental sólo contiene los pacientes y
+evaluaciones creados o modificados desde el cursor de la anterior. El
+manifiesto ``manifest.json`` enlaza cada incremental con su copia
+completa, de modo que restaurar es aplicar la cadena en orden.
+"""
+import gzip
+import io
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+from backend.backup_restore import BackupRestorer, MergeReport, open_backup, zstandard
+
+FULL = 'full'
+INCREMENTAL = 'incremental'
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class BackupManager:
+    """Crea copias completas o incrementales del repositorio y restaura sus cadenas"""
+
+    def __init__(self, repository, directory: str = "data/backups", compression: Optional[str] = None,
+                 level: Optional[int] = None):
+        self.repository = repository
+        self.directory = directory
+        self.compression = compression or ('zstd' if zstandard is not None else 'gzip')
+        if self.compression == 'zstd' and zstandard is None:
+            raise ImportError("zstandard no está instalado")
+        self.level = level if level is not None else (9 if self.compression == 'zstd' else 6)
+        os.makedirs(directory, exist_ok=True)
+
+    # Manifiesto
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    def backups(self) -> List[Dict[str, Any]]:
+        """Copias registradas, de la más antigua a la más reciente"""
+        try:
+            with open(self.manifest_path, encoding='utf-8') as manifest:
+                return json.load(manifest)
+        except FileNotFoundError:
+            return []
+
+    def _save_manifest(self, backups: List[Dict[str, Any]]):
+        temporary = self.manifest_path + ".tmp"
+        with open(temporary, 'w', encoding='utf-8') as manifest:
+            json.dump(backups, manifest, ensure_ascii=False, indent=1)
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        os.replace(temporary, self.manifest_path)
+
+    def path(self, backup: Dict[str, Any]) -> str:
+        return os.path.join(self.directory, backup['file'])
+
+    # Escritura
+
+    def _open(self, path: str):
+        if self.compression == 'zstd':
+            raw = open(path, 'wb')
+            compressed = zstandard.ZstdCompressor(level=self.level).stream_writer(raw, closefd=True)
+            return io.TextIOWrapper(compressed, encoding='utf-8', write_through=False)
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=self.level)
+
+    def create(self, incremental: bool = False) -> Dict[str, Any]:
+        """
+        Escribe una copia y la añade al manifiesto.
+
+        Una copia incremental sin copia completa previa, o después de un
+        borrado completo (otra generación), se hace completa.
+        """
+        start = time.perf_counter()
+        backups = self.backups()
+        generation = self.repository.generation()
+        # El cursor se fija antes de leer: lo que cambie durante la copia irá en la siguiente
+        revision = self.repository.revision()
+        previous = backups[-1] if backups else None
+        if incremental and (previous is None or previous['generation'] != generation):
+            incremental = False
+        since = previous['revision'] if incremental else 0
+        base = (previous['base'] or previous['file']) if incremental else None
+
+        created = datetime.now()
+        kind = INCREMENTAL if incremental else FULL
+        extension = 'zst' if self.compression == 'zstd' else 'gz'
+        name = f"backup_{created.strftime('%Y%m%d_%H%M%S_%f')}_{kind}.json.{extension}"
+        path = os.path.join(self.directory, name)
+        temporary = path + ".tmp"
+
+        patients, _ = self.repository.patients_since(since)
+        evaluations = 0
+        with self._open(temporary) as output:
+            output.write('{"patients":{')
+            for position, (patient_id, patient) in enumerate(patients.items()):
+                output.write(f"{',' if position else ''}{_dumps(str(patient_id))}:{_dumps(patient)}")
+            output.write('},"evaluations":[')
+            for evaluation in self.repository.iter_changed_evaluations(since, revision):
+                if evaluations:
+                    output.write(',')
+                output.write(_dumps(evaluation))
+                evaluations += 1
+            output.write(f'],"export_date":{_dumps(created.date().isoformat())},'
+                         f'"export_time":{_dumps(created.strftime("%H:%M:%S"))},'
+                         f'"backup_type":{_dumps(kind)},'
+                         f'"cursor":{_dumps({"generation": generation, "revision": revision})}}}')
+        with open(temporary, 'rb') as written:
+            os.fsync(written.fileno())
+        os.replace(temporary, path)
+
+        backup = {
+            'file': name, 'type': kind, 'base': base, 'generation': generation,
+            'since': since, 'revision': revision, 'created': created.isoformat(timespec='seconds'),
+            'patients': len(patients), 'evaluations': evaluations,
+            'bytes': os.path.getsize(path), 'seconds': round(time.perf_counter() - start, 3)
+        }
+        backups.append(backup)
+        self._save_manifest(backups)
+        return backup
+
+    # Restauración
+
+    def chain(self, file: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Copias necesarias para restaurar hasta la indicada (por defecto la
+        última): su copia completa seguida de las incrementales posteriores
+        """
+        backups = self.backups()
+        if file is not None:
+            names = [backup['file'] for backup in backups]
+            if file not in names:
+                raise FileNotFoundError(file)
+            backups = backups[:names.index(file) + 1]
+        if not backups:
+            return []
+        target = backups[-1]
+        base = target['base'] or target['file']
+        return [backup for backup in backups if backup['file'] == base or backup['base'] == base]
+
+    def restore(self, restorer: BackupRestorer, file: Optional[str] = None) -> List[MergeReport]:
+        """
+        Fusiona en orden la cadena de copias hasta la indicada, con una sola
+        correspondencia de IDs de residentes para toda la cadena
+        """
+        reports = []
+        id_map: Dict[Any, int] = {}
+        for backup in self.chain(file):
+            with open_backup(self.path(backup)) as stream:
+                reports.append(restorer.restore(stream, id_map=id_map))
+        return reports
@@ -0,0 +1,418 @@
+"""
+Restauración y fusión de copias de seguridad en streaming.
+
+El fichero de copia (``{"patients": {...}, "evaluations": [...], ...}``) se
+lee por bloques y cada paciente o evaluación se decodifica por separado
+con ``JSONDecoder.raw_decode``, de modo que la memoria depende del tamaño
+de un registro y no del de la copia. Los registros se fusionan con los
+existentes por lotes:
+
+- Un registro cuyo contenido (sin IDs) ya existe se omite.
+- Un paciente con el mismo ID, nombre y fecha de ingreso que uno local se
+  actualiza; una evaluación con el mismo ID, residente e instante, también.
+- El resto se añade con un ID nuevo; las evaluaciones se reasignan al ID
+  local de su residente.
+- Una evaluación cuyo residente no viene en la copia (ni en las anteriores
+  de la misma cadena) sólo se asigna a un residente local con su mismo
+  nombre; si no, se omite y se informa.
+
+Cada lote se confirma en su propia transacción; si el proceso se
+interrumpe, volver a restaurar la misma copia omite lo ya fusionado y
+continúa con el resto.
+"""
+import gzip
+import hashlib
+import io
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Any, Iterator, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from backend import event_log as events
+
+_WHITESPACE = ' \t\n\r'
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class BackupFormatError(ValueError):
+    """La copia de seguridad no tiene el formato esperado"""
+
+
+class _JsonStream:
+    """Lector incremental de un documento JSON por bloques"""
+
+    def __init__(self, stream, chunk_size: int = 1 << 20):
+        if isinstance(stream, (bytes, bytearray)):
+            stream = io.BytesIO(stream)
+        if isinstance(stream, io.TextIOBase):
+            self._text = stream
+        else:
+            self._text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+        self.chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+        self.bytes_read = 0
+
+    def _fill(self) -> bool:
+        """Añade un bloque al búfer descartando lo ya consumido; False al final del fichero"""
+        if self._eof:
+            return False
+        chunk = self._text.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self.bytes_read += len(chunk)
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        """Siguiente carácter que no es espacio ('' al final)"""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                return ''
+
+    def expect(self, character: str):
+        if self.peek() != character:
+            found = self.peek() or 'fin del fichero'
+            raise BackupFormatError(f"Se esperaba '{character}' y se encontró '{found}'")
+        self._position += 1
+
+    def value(self) -> Any:
+        """Decodifica el siguiente valor JSON completo"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError as e:
+                if self._fill():
+                    continue
+                raise BackupFormatError(f"JSON inválido: {e.msg}") from e
+            # Un número al final del búfer puede continuar en el bloque siguiente
+            if end == len(self._buffer) and not isinstance(value, (dict, list, str)) and self._fill():
+                continue
+            self._position = end
+            return value
+
+
+def open_backup(source):
+    """
+    Flujo binario descomprimido de una copia (ruta o fichero abierto),
+    reconociendo gzip y zstd por su cabecera; sin comprimir se devuelve tal cual
+    """
+    stream = open(source, 'rb') if isinstance(source, str) else source
+    magic = stream.read(4)
+    stream.seek(0)
+    if magic.startswith(GZIP_MAGIC):
+        if isinstance(source, str):
+            # gzip.open abre su propio fichero y lo cierra con el flujo descomprimido
+            stream.close()
+            return gzip.open(source, 'rb')
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise BackupFormatError("La copia está comprimida con zstd y zstandard no está instalado")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(stream, closefd=True))
+    return stream
+
+
+def iter_backup(stream, chunk_size: int = 1 << 20) -> Iterator[Tuple[str, Any]]:
+    """
+    Recorre una copia de seguridad y produce ``('patient', registro)``,
+    ``('evaluation', registro)`` o ``('meta', (clave, valor))`` sin cargarla entera
+    """
+    reader = _JsonStream(stream, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'patients' and reader.peek() == '{':
+            reader.expect('{')
+            if reader.peek() != '}':
+                while True:
+                    patient_key = reader.value()
+                    reader.expect(':')
+                    patient = reader.value()
+                    if isinstance(patient, dict):
+                        patient.setdefault('id', patient_key)
+                    yield 'patient', patient
+                    if reader.peek() != ',':
+                        break
+                    reader.expect(',')
+            reader.expect('}')
+        elif key in ('patients', 'evaluations') and reader.peek() == '[':
+            reader.expect('[')
+            if reader.peek() != ']':
+                while True:
+                    yield key[:-1], reader.value()
+                    if reader.peek() != ',':
+                        break
+                    reader.expect(',')
+            reader.expect(']')
+        else:
+            yield 'meta', (key, reader.value())
+        if reader.peek() != ',':
+            break
+        reader.expect(',')
+    reader.expect('}')
+
+
+def _numeric_id(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def content_hash(record: Dict[str, Any], exclude: Tuple[str, ...] = ('id',)) -> bytes:
+    """Huella del contenido de un registro, sin los campos indicados"""
+    content = {key: value for key, value in record.items() if key not in exclude}
+    payload = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+
+def _patient_identity(patient: Dict[str, Any]) -> Tuple:
+    return (str(patient.get('name', '')).strip().lower(), str(patient.get('admission_date', '')))
+
+
+def _name_key(name) -> str:
+    return str(name or '').strip().lower()
+
+
+def _evaluation_instant(evaluation: Dict[str, Any]) -> str:
+    return evaluation.get('timestamp') or f"{evaluation.get('date', '')}T{evaluation.get('time', '')}"
+
+
+@dataclass
+class MergeReport:
+    """Resultado de fusionar una copia de seguridad"""
+    added: Dict[str, int] = field(default_factory=lambda: {'patient': 0, 'evaluation': 0})
+    updated: Dict[str, int] = field(default_factory=lambda: {'patient': 0, 'evaluation': 0})
+    skipped: Dict[str, int] = field(default_factory=lambda: {'patient': 0, 'evaluation': 0})
+    errors: List[str] = field(default_factory=list)
+    remapped_patients: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Tabla resumen por tipo de registro"""
+        return [{
+            'Registro': 'Pacientes' if kind == 'patient' else 'Evaluaciones',
+            'Añadidos': self.added[kind],
+            'Actualizados': self.updated[kind],
+            'Omitidos': self.skipped[kind]
+        } for kind in ('patient', 'evaluation')]
+
+
+class BackupRestorer:
+    """
+    Fusiona copias de seguridad con los datos del repositorio.
+
+    ``on_change(tipo_evento, registros)`` se llama tras guardar cada lote,
+    para que la aplicación lo anote en el registro de eventos.
+    """
+
+    # Campos que no forman parte del contenido de una evaluación al compararlas
+    EVALUATION_KEYS = ('id', 'patient_id', 'analysis')
+
+    def __init__(self, repository, batch_size: int = 500,
+                 on_change: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.on_change = on_change
+
+    def _load_indexes(self):
+        """Huellas e identidades de los datos locales (sólo claves, no registros)"""
+        self._patients = self.repository.patients()
+        self._patient_hashes = {content_hash(p): pid for pid, p in self._patients.items()}
+        self._patient_identities = {_patient_identity(p): pid for pid, p in self._patients.items()}
+        self._patient_names: Dict[str, List[int]] = {}
+        for pid, patient in self._patients.items():
+            self._patient_names.setdefault(_name_key(patient.get('name')), []).append(pid)
+        self._evaluation_hashes: Dict[bytes, Optional[int]] = {}
+        self._evaluation_keys = {}
+        self._analysed = set()
+        for evaluation in self.repository.iter_changed_evaluations():
+            self._evaluation_hashes[content_hash(evaluation, self.EVALUATION_KEYS)] = evaluation['id']
+            self._evaluation_keys[evaluation['id']] = (evaluation['patient_id'], _evaluation_instant(evaluation))
+            if evaluation['analysis']:
+                self._analysed.add(evaluation['id'])
+
+    def restore(self, stream, chunk_size: int = 1 << 20, id_map: Optional[Dict[Any, int]] = None) -> MergeReport:
+        """
+        Lee la copia en streaming y la fusiona por lotes con los datos actuales.
+
+        ``id_map`` (ID del residente en la copia -> ID local) se comparte entre
+        las copias de una cadena: una incremental no repite los residentes que
+        no cambiaron y sus evaluaciones se asignan con lo visto en las anteriores.
+        """
+        start = time.perf_counter()
+        report = MergeReport()
+        self._load_indexes()
+        id_map = {} if id_map is None else id_map
+        pending = {'patient_add': [], 'patient_update': [], 'evaluation_add': [], 'evaluation_update': [],
+                   'analysis': []}
+
+        def flush(kinds):
+            for kind in kinds:
+                records = pending[kind]
+                if not records:
+                    continue
+                if kind == 'patient_add':
+                    source_ids = [record.pop('_source_id') for record in records]
+                    saved = self.repository.add_patients(records)
+                    for source_id, patient in zip(source_ids, saved):
+                        id_map[source_id] = patient['id']
+                        self._patient_hashes[content_hash(patient)] = patient['id']
+                        self._patient_identities[_patient_identity(patient)] = patient['id']
+                    self._notify(events.PATIENT_REGISTERED, saved)
+                elif kind == 'patient_update':
+                    self.repository.update_patients(records)
+                    self._notify(events.PATIENT_UPDATED, records)
+                elif kind == 'evaluation_add':
+                    saved = self.repository.add_evaluations(records)
+                    for record, evaluation in zip(records, saved):
+                        self._evaluation_hashes[content_hash(evaluation, self.EVALUATION_KEYS)] = evaluation['id']
+                        if record.get('analysis'):
+                            self._analysed.add(evaluation['id'])
+                    self._notify(events.EVALUATION_CREATED, saved)
+                    self._notify(events.ANALYSIS_ATTACHED, [
+                        {'evaluation_id': evaluation['id'], 'analysis': record['analysis']}
+                        for record, evaluation in zip(records, saved) if record.get('analysis')
+                    ])
+                elif kind == 'evaluation_update':
+                    self.repository.update_evaluations(records)
+                    self._notify(events.EVALUATION_UPDATED, records)
+                else:
+                    self.repository.attach_analyses(records)
+                    self._notify(events.ANALYSIS_ATTACHED, [
+                        {'evaluation_id': evaluation_id, 'analysis': analysis} for evaluation_id, analysis in records
+                    ])
+                pending[kind] = []
+
+        records = iter_backup(stream, chunk_size)
+        for kind, record in records:
+            if kind == 'meta':
+                continue
+            if not isinstance(record, dict):
+                report.errors.append(f"Registro de {kind} ignorado: no es un objeto")
+                continue
+            if kind == 'patient':
+                if self._patient_hashes.get(content_hash(record), 0) is None:
+                    # Duplicado de un paciente de esta misma copia aún sin ID local
+                    flush(('patient_add',))
+                self._merge_patient(record, id_map, pending, report)
+                if len(pending['patient_add']) + len(pending['patient_update']) >= self.batch_size:
+                    flush(('patient_add', 'patient_update'))
+            else:
+                # Los pacientes pendientes deben tener ya su ID local
+                flush(('patient_add', 'patient_update'))
+                self._merge_evaluation(record, id_map, pending, report)
+                if len(pending['evaluation_add']) + len(pending['evaluation_update']) >= self.batch_size:
+                    flush(('evaluation_add', 'evaluation_update', 'analysis'))
+        flush(('patient_add', 'patient_update', 'evaluation_add', 'evaluation_update', 'analysis'))
+
+        report.remapped_patients = sum(1 for source, local in id_map.items() if _numeric_id(source) != local)
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def _notify(self, event_type: str, records: List[Dict[str, Any]]):
+        if self.on_change and records:
+            self.on_change(event_type, records)
+
+    def _merge_patient(self, patient, id_map, pending, report):
+        source_id = patient.get('id')
+        digest = content_hash(patient)
+        if digest in self._patient_hashes:
+            id_map[source_id] = self._patient_hashes[digest]
+            report.skipped['patient'] += 1
+            return
+        local_id = _numeric_id(source_id)
+        local = self._patients.get(local_id)
+        if local is not None and _patient_identity(local) == _patient_identity(patient):
+            updated = {**patient, 'id': local_id}
+            pending['patient_update'].append(updated)
+            self._patient_hashes[digest] = local_id
+            id_map[source_id] = local_id
+            report.updated['patient'] += 1
+            return
+        same_person = self._patient_identities.get(_patient_identity(patient))
+        if same_person is not None:
+            # Mismo residente con otro ID en este dispositivo
+            pending['patient_update'].append({**patient, 'id': same_person})
+            self._patient_hashes[digest] = same_person
+            id_map[source_id] = same_person
+            report.updated['patient'] += 1
+            return
+        pending['patient_add'].append({**{k: v for k, v in patient.items() if k != 'id'},
+                                       '_source_id': source_id})
+        self._patient_identities[_patient_identity(patient)] = None
+        self._patient_hashes[digest] = None
+        report.added['patient'] += 1
+
+    def _local_patient(self, evaluation) -> Optional[int]:
+        """
+        Residente local de una evaluación cuyo residente no aparece en la
+        copia: el del mismo ID sólo si coincide el nombre y, si no, el único
+        residente con ese nombre. Un ID por sí solo no identifica al residente
+        (otra instalación u otra restauración pudo asignarlo a otra persona).
+        """
+        name = _name_key(evaluation.get('patient_name'))
+        if not name:
+            return None
+        local_id = _numeric_id(evaluation.get('patient_id'))
+        local = self._patients.get(local_id)
+        if local is not None and _name_key(local.get('name')) == name:
+            return local_id
+        matches = self._patient_names.get(name, [])
+        return matches[0] if len(matches) == 1 else None
+
+    def _merge_evaluation(self, evaluation, id_map, pending, report):
+        source_patient = evaluation.get('patient_id')
+        patient_id = id_map.get(source_patient, id_map.get(str(source_patient)))
+        if patient_id is None:
+            patient_id = self._local_patient(evaluation)
+        if patient_id is None:
+            report.skipped['evaluation'] += 1
+            report.errors.append(f"Evaluación {evaluation.get('id')} omitida: residente {source_patient} "
+                                 f"sin correspondencia local")
+            return
+        analysis = evaluation.get('analysis')
+        digest = content_hash(evaluation, self.EVALUATION_KEYS)
+        if digest in self._evaluation_hashes:
+            # Evaluación ya presente; sólo se completa si la copia trae un análisis que falta aquí
+            existing = self._evaluation_hashes[digest]
+            if analysis and existing is not None and existing not in self._analysed:
+                pending['analysis'].append((existing, analysis))
+                self._analysed.add(existing)
+                report.updated['evaluation'] += 1
+            else:
+                report.skipped['evaluation'] += 1
+            return
+        self._evaluation_hashes[digest] = None
+        record = {**{k: v for k, v in evaluation.items() if k not in ('id', 'analysis')}, 'patient_id': patient_id}
+        local_id = _numeric_id(evaluation.get('id'))
+        if self._evaluation_keys.get(local_id) == (patient_id, _evaluation_instant(evaluation)):
+            pending['evaluation_update'].append({'id': local_id, **record})
+            self._evaluation_hashes[digest] = local_id
+            if analysis and local_id not in self._analysed:
+                pending['analysis'].append((local_id, analysis))
+                self._analysed.add(local_id)
+            report.updated['evaluation'] += 1
+        else:
+            pending['evaluation_add'].append({**record, 'analysis': analysis} if analysis else record)
+            report.added['evaluation'] += 1
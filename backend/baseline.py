@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Iterable
+
+from backend.vitals import VITAL_FIELDS, extract_vitals
+
+# Escala mínima por signo vital para no disparar alertas con historiales muy estables
+MIN_SCALE = {
+    'systolic_bp': 6.0,
+    'diastolic_bp': 4.0,
+    'heart_rate': 4.0,
+    'temperature': 0.25,
+    'oxygen_saturation': 1.0,
+    'pain_level': 1.0
+}
+
+VITAL_LABELS = {
+    'systolic_bp': ('PA sistólica', 'mmHg'),
+    'diastolic_bp': ('PA diastólica', 'mmHg'),
+    'heart_rate': ('FC', 'lpm'),
+    'temperature': ('Temperatura', '°C'),
+    'oxygen_saturation': ('SpO₂', '%'),
+    'pain_level': ('Dolor', '/10')
+}
+
+# Signos vitales asociados a cada tipo de alerta poblacional
+ALERT_VITALS = {
+    'blood_pressure': ('systolic_bp', 'diastolic_bp'),
+    'heart_rate': ('heart_rate',),
+    'temperature': ('temperature',),
+    'oxygen_saturation': ('oxygen_saturation',),
+    'pain_level': ('pain_level',)
+}
+
+# Factor que convierte la MAD en una estimación consistente de la desviación típica
+_MAD_TO_STD = 1.4826
+
+
+@dataclass
+class PersonalBaseline:
+    """
+    Basal personal de un residente aprendida de su historial
+    """
+    patient_id: Any
+    observations: int
+    median: Dict[str, float] = field(default_factory=dict)
+    scale: Dict[str, float] = field(default_factory=dict)
+
+    def deviation(self, vital: str, value: Optional[float]) -> Optional[float]:
+        """Desviación robusta (z) de un valor respecto a la basal"""
+        if value is None or vital not in self.median:
+            return None
+        return (value - self.median[vital]) / self.scale[vital]
+
+
+class BaselineAnomalyDetector:
+    """
+    Detección de anomalías respecto a la basal personal de cada residente.
+
+    Usa la mediana y la MAD del historial del paciente, de modo que valores
+    habituales para él (p. ej. PA 150/90 o SpO₂ 93% en EPOC) no generen
+    falsas alarmas y sí se detecten cambios relevantes dentro del rango
+    poblacional normal.
+    """
+
+    def __init__(self, threshold: float = 3.0, min_history: int = 5):
+        self.threshold = threshold
+        self.min_history = min_history
+
+    @staticmethod
+    def _vitals_matrix(evaluations: List[Dict[str, Any]]) -> np.ndarray:
+        rows = []
+        for evaluation in evaluations:
+            vitals = extract_vitals(evaluation)
+            rows.append([np.nan if vitals[v] is None else vitals[v] for v in VITAL_FIELDS])
+        return np.array(rows, dtype=float).reshape(len(rows), len(VITAL_FIELDS))
+
+    def build_baseline(self, patient_id, history: List[Dict[str, Any]]) -> Optional[PersonalBaseline]:
+        """Calcula la basal de un paciente; None si el historial es insuficiente"""
+        if len(history) < self.min_history:
+            return None
+        matrix = self._vitals_matrix(history)
+        counts = np.sum(~np.isnan(matrix), axis=0)
+        with np.errstate(all='ignore'):
+            medians = np.nanmedian(matrix, axis=0)
+            mads = np.nanmedian(np.abs(matrix - medians), axis=0)
+
+        baseline = PersonalBaseline(patient_id=patient_id, observations=len(history))
+        for i, vital in enumerate(VITAL_FIELDS):
+            if counts[i] < self.min_history:
+                continue
+            baseline.median[vital] = float(medians[i])
+            baseline.scale[vital] = max(float(mads[i]) * _MAD_TO_STD, MIN_SCALE[vital])
+        return baseline
+
+    def score_evaluation(self, evaluation: Dict[str, Any],
+                         history: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Compara una evaluación con la basal del paciente.
+
+        Devuelve, por signo vital con basal disponible, el valor, la mediana
+        personal, la desviación z y si se considera anómalo.
+        """
+        baseline = self.build_baseline(evaluation.get('patient_id'), history)
+        if baseline is None:
+            return {}
+
+        vitals = extract_vitals(evaluation)
+        result = {}
+        for vital in baseline.median:
+            z = baseline.deviation(vital, vitals[vital])
+            if z is None:
+                continue
+            result[vital] = {
+                'value': vitals[vital],
+                'baseline': baseline.median[vital],
+                'z': round(z, 2),
+                'anomalous': abs(z) >= self.threshold
+            }
+        return result
+
+    def baseline_alerts(self, deviations: Dict[str, Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Convierte las desviaciones anómalas en alertas con el formato de la aplicación"""
+        alerts = []
+        for vital, info in deviations.items():
+            if not info['anomalous']:
+                continue
+            label, unit = VITAL_LABELS[vital]
+            direction = "por encima" if info['z'] > 0 else "por debajo"
+            alerts.append({
+                'level': 'warning',
+                'vital': vital,
+                'message': (f"{label} {info['value']:g} {unit} {direction} de su basal "
+                            f"({info['baseline']:g} {unit}, z={info['z']:+.1f})")
+            })
+        return alerts
+
+    def annotate_alerts(self, alerts: List[Dict[str, Any]],
+                        deviations: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Marca las alertas poblacionales de atención cuyo valor es habitual para el residente.
+
+        Las alertas críticas no se modifican; las de atención se conservan pero
+        se indica que el valor está dentro de la basal personal.
+        """
+        for alert in alerts:
+            fields = ALERT_VITALS.get(alert.get('vital'))
+            if alert.get('level') != 'warning' or not fields:
+                continue
+            if all(f in deviations and not deviations[f]['anomalous'] for f in fields):
+                alert['baseline_normal'] = True
+                alert['message'] += " (habitual en su basal)"
+        return alerts
+
+    def census_sweep(self, evaluations: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Puntúa de una vez la última evaluación de cada residente frente a su basal.
+
+        La basal se calcula con las evaluaciones anteriores de cada paciente
+        mediante operaciones agrupadas sobre todo el censo.
+        """
+        evaluations = list(evaluations)
+        columns = ['patient_id', 'evaluation_id', 'vital', 'value', 'baseline', 'z', 'anomalous']
+        if not evaluations:
+            return pd.DataFrame(columns=columns)
+
+        frame = pd.DataFrame(self._vitals_matrix(evaluations), columns=list(VITAL_FIELDS))
+        frame['patient_id'] = [e.get('patient_id') for e in evaluations]
+        frame['evaluation_id'] = [e.get('id') for e in evaluations]
+        frame['_order'] = [e.get('timestamp') or f"{e.get('date', '')}T{e.get('time', '')}"
+                           for e in evaluations]
+        frame = frame.sort_values(['patient_id', '_order'], kind='stable')
+
+        is_latest = frame.groupby('patient_id').cumcount(ascending=False) == 0
+        latest = frame[is_latest].set_index('patient_id')
+        history = frame[~is_latest]
+
+        long_history = history.melt(id_vars='patient_id', value_vars=list(VITAL_FIELDS),
+                                    var_name='vital', value_name='value').dropna()
+        grouped = long_history.groupby(['patient_id', 'vital'])['value']
+        counts = grouped.count()
+        medians = grouped.median()
+        long_history['abs_dev'] = (long_history['value'] -
+                                   medians.reindex(pd.MultiIndex.from_frame(
+                                       long_history[['patient_id', 'vital']])).to_numpy()).abs()
+        mads = long_history.groupby(['patient_id', 'vital'])['abs_dev'].median()
+
+        stats = pd.DataFrame({'count': counts, 'baseline': medians, 'mad': mads})
+        stats = stats[stats['count'] >= self.min_history].reset_index()
+        if stats.empty:
+            return pd.DataFrame(columns=columns)
+
+        current = latest[list(VITAL_FIELDS) + ['evaluation_id']].reset_index().melt(
+            id_vars=['patient_id', 'evaluation_id'], var_name='vital', value_name='value').dropna(subset=['value'])
+        scored = current.merge(stats, on=['patient_id', 'vital'], how='inner')
+        floors = scored['vital'].map(MIN_SCALE)
+        scale = np.maximum(scored['mad'] * _MAD_TO_STD, floors)
+        scored['z'] = ((scored['value'] - scored['baseline']) / scale).round(2)
+        scored['anomalous'] = scored['z'].abs() >= self.threshold
+        scored['_abs_z'] = scored['z'].abs()
+        scored = scored.sort_values(['anomalous', '_abs_z'], ascending=False)
+        return scored[columns].reset_index(drop=True)
@@ -0,0 +1,222 @@
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Iterable
+
+from backend.vitals import extract_vitals, evaluation_timestamp
+
+
+@dataclass
+class WarningResult:
+    """
+    Resultado de la escala de alerta temprana para una observación
+    """
+    patient_id: Any
+    timestamp: datetime
+    score: int
+    components: Dict[str, int] = field(default_factory=dict)
+    risk_band: str = "Bajo"
+    rise_24h: int = 0
+    triggers: List[Dict[str, str]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convierte el resultado a diccionario para serialización"""
+        return {
+            'patient_id': self.patient_id,
+            'timestamp': self.timestamp.isoformat(),
+            'score': self.score,
+            'components': dict(self.components),
+            'risk_band': self.risk_band,
+            'rise_24h': self.rise_24h,
+            'triggers': list(self.triggers)
+        }
+
+
+class _PatientWarningState:
+    """Estado acumulado de un paciente para actualizar la escala en O(1)"""
+
+    __slots__ = ('last_timestamp', 'last_score', 'window_min', 'observations')
+
+    def __init__(self):
+        self.last_timestamp: Optional[datetime] = None
+        self.last_score: Optional[int] = None
+        # Cola monótona (timestamp, puntuación) para el mínimo de la ventana
+        self.window_min = deque()
+        self.observations = 0
+
+
+class EarlyWarningEngine:
+    """
+    Escala de alerta temprana tipo NEWS2 sobre series de signos vitales.
+
+    Mantiene un estado por paciente y actualiza la puntuación agregada y los
+    disparadores de escalada en O(1) amortizado por observación, sin volver a
+    recorrer el historial. La frecuencia respiratoria no se registra en las
+    evaluaciones, por lo que se omite de la puntuación.
+    """
+
+    # Estados cognitivos que equivalen a confusión nueva o nivel de consciencia alterado
+    ALTERED_CONSCIOUSNESS = {'Confuso': 3, 'Somnoliento': 3}
+
+    def __init__(self, rise_threshold: int = 3, rise_window: timedelta = timedelta(hours=24),
+                 medium_threshold: int = 5, high_threshold: int = 7):
+        self.rise_threshold = rise_threshold
+        self.rise_window = rise_window
+        self.medium_threshold = medium_threshold
+        self.high_threshold = high_threshold
+        self._states: Dict[Any, _PatientWarningState] = {}
+
+    @staticmethod
+    def _score_oxygen(spo2) -> int:
+        if spo2 is None:
+            return 0
+        if spo2 <= 91:
+            return 3
+        if spo2 <= 93:
+            return 2
+        if spo2 <= 95:
+            return 1
+        return 0
+
+    @staticmethod
+    def _score_systolic(systolic) -> int:
+        if systolic is None:
+            return 0
+        if systolic <= 90 or systolic >= 220:
+            return 3
+        if systolic <= 100:
+            return 2
+        if systolic <= 110:
+            return 1
+        return 0
+
+    @staticmethod
+    def _score_pulse(heart_rate) -> int:
+        if heart_rate is None:
+            return 0
+        if heart_rate <= 40 or heart_rate >= 131:
+            return 3
+        if heart_rate >= 111:
+            return 2
+        if heart_rate <= 50 or heart_rate >= 91:
+            return 1
+        return 0
+
+    @staticmethod
+    def _score_temperature(temperature) -> int:
+        if temperature is None:
+            return 0
+        if temperature <= 35.0:
+            return 3
+        if temperature >= 39.1:
+            return 2
+        if temperature <= 36.0 or temperature >= 38.1:
+            return 1
+        return 0
+
+    def score_components(self, evaluation: Dict[str, Any]) -> Dict[str, int]:
+        """Calcula la puntuación de cada parámetro de la escala"""
+        vitals = extract_vitals(evaluation)
+        general_status = evaluation.get('general_status') or evaluation.get('data', {}).get('general_status', {})
+        cognitive_status = (general_status or {}).get('cognitive_status', 'Alerta')
+
+        return {
+            'saturacion_oxigeno': self._score_oxygen(vitals['oxygen_saturation']),
+            'presion_sistolica': self._score_systolic(vitals['systolic_bp']),
+            'frecuencia_cardiaca': self._score_pulse(vitals['heart_rate']),
+            'temperatura': self._score_temperature(vitals['temperature']),
+            'consciencia': self.ALTERED_CONSCIOUSNESS.get(cognitive_status, 0)
+        }
+
+    def _risk_band(self, score: int, components: Dict[str, int]) -> str:
+        if score >= self.high_threshold:
+            return "Alto"
+        if score >= self.medium_threshold:
+            return "Medio"
+        if any(value == 3 for value in components.values()):
+            return "Bajo-Medio"
+        return "Bajo"
+
+    def update(self, evaluation: Dict[str, Any]) -> WarningResult:
+        """
+        Incorpora una nueva observación y devuelve la puntuación y los disparadores
+        """
+        patient_id = evaluation.get('patient_id')
+        timestamp = evaluation_timestamp(evaluation)
+        components = self.score_components(evaluation)
+        score = sum(components.values())
+
+        state = self._states.get(patient_id)
+        if state is None:
+            state = _PatientWarningState()
+            self._states[patient_id] = state
+
+        # Mínimo de la ventana previa (excluyendo la observación actual)
+        rise = 0
+        in_order = state.last_timestamp is None or timestamp >= state.last_timestamp
+        if in_order:
+            window = state.window_min
+            cutoff = timestamp - self.rise_window
+            while window and window[0][0] < cutoff:
+                window.popleft()
+            if window:
+                rise = max(0, score - window[0][1])
+            while window and window[-1][1] >= score:
+                window.pop()
+            window.append((timestamp, score))
+            state.last_timestamp = timestamp
+            state.last_score = score
+        state.observations += 1
+
+        triggers = []
+        if score >= self.high_threshold:
+            triggers.append({
+                'level': 'critical',
+                'message': f"Alerta temprana ALTA: puntuación {score} - Respuesta clínica de emergencia"
+            })
+        elif score >= self.medium_threshold:
+            triggers.append({
+                'level': 'warning',
+                'message': f"Alerta temprana MEDIA: puntuación {score} - Valoración médica urgente"
+            })
+        red_parameters = [name.replace('_', ' ') for name, value in components.items() if value == 3]
+        if red_parameters:
+            triggers.append({
+                'level': 'warning',
+                'message': f"Parámetro en rango extremo: {', '.join(red_parameters)}"
+            })
+        if rise >= self.rise_threshold:
+            hours = int(self.rise_window.total_seconds() // 3600)
+            triggers.append({
+                'level': 'critical',
+                'message': f"Puntuación de alerta temprana +{rise} en {hours} h - Escalar a médico"
+            })
+
+        return WarningResult(
+            patient_id=patient_id,
+            timestamp=timestamp,
+            score=score,
+            components=components,
+            risk_band=self._risk_band(score, components),
+            rise_24h=rise,
+            triggers=triggers
+        )
+
+    def bulk_update(self, evaluations: Iterable[Dict[str, Any]]) -> List[WarningResult]:
+        """
+        Procesa un historial completo (p. ej. importado) en orden cronológico
+        """
+        ordered = sorted(evaluations, key=evaluation_timestamp)
+        return [self.update(evaluation) for evaluation in ordered]
+
+    def last_score(self, patient_id) -> Optional[int]:
+        """Devuelve la última puntuación conocida del paciente"""
+        state = self._states.get(patient_id)
+        return state.last_score if state else None
+
+    def reset(self, patient_id=None):
+        """Elimina el estado de un paciente o de todos"""
+        if patient_id is None:
+            self._states.clear()
+        else:
+            self._states.pop(patient_id, None)
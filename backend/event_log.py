@@ -0,0 +1,400 @@
+import gc
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Iterable, Iterator, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+# Tipos de evento registrados; cada uno lleva el registro completo ya con su ID
+PATIENT_REGISTERED = 'patient_registered'
+PATIENT_UPDATED = 'patient_updated'
+EVALUATION_CREATED = 'evaluation_created'
+EVALUATION_UPDATED = 'evaluation_updated'
+ANALYSIS_ATTACHED = 'analysis_attached'
+DATA_CLEARED = 'data_cleared'
+
+EVENT_TYPES = (PATIENT_REGISTERED, PATIENT_UPDATED, EVALUATION_CREATED, EVALUATION_UPDATED, ANALYSIS_ATTACHED,
+               DATA_CLEARED)
+
+_SEGMENT_PATTERN = "events-*.jsonl"
+_SNAPSHOT_NAME = "snapshot.json"
+_APPEND_LOCK = "events.lock"
+_COMPACTION_LOCK = "compaction.lock"
+
+
+def _dumps(record: Any) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Pausa el recolector cíclico mientras se cargan muchos objetos nuevos:
+    los diccionarios de la instantánea no forman ciclos y, con el recolector
+    activo, la carga tarda cerca de un 50 % más.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+@dataclass
+class LogState:
+    """Estado reconstruido a partir de la instantánea y de los eventos posteriores"""
+    seq: int = 0
+    patients: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    evaluations: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    def apply(self, event_type: str, data: Any):
+        """Aplica un evento al estado"""
+        if event_type == PATIENT_REGISTERED or event_type == PATIENT_UPDATED:
+            self.patients[data['id']] = data
+        elif event_type == EVALUATION_CREATED:
+            self.evaluations[data['id']] = data
+        elif event_type == EVALUATION_UPDATED:
+            # Sustituye los datos de la evaluación pero conserva su análisis si no trae otro
+            previous = self.evaluations.get(data['id'])
+            if previous is not None and previous.get('analysis') and not data.get('analysis'):
+                data = {**data, 'analysis': previous['analysis']}
+            self.evaluations[data['id']] = data
+        elif event_type == ANALYSIS_ATTACHED:
+            evaluation = self.evaluations.get(data['evaluation_id'])
+            if evaluation is not None:
+                evaluation['analysis'] = data['analysis']
+        elif event_type == DATA_CLEARED:
+            self.patients.clear()
+            self.evaluations.clear()
+
+    def is_empty(self) -> bool:
+        return not self.patients and not self.evaluations
+
+    def evaluation_list(self) -> List[Dict[str, Any]]:
+        """Evaluaciones en orden de alta"""
+        return [self.evaluations[evaluation_id] for evaluation_id in sorted(self.evaluations)]
+
+
+class EventLog:
+    """
+    Registro de eventos de sólo añadido con instantáneas periódicas.
+
+    Cada cambio (alta de paciente, evaluación, análisis...) se añade como una
+    línea JSON con un número de secuencia al segmento activo. Las escrituras
+    llegan al sistema operativo de inmediato, pero el ``fsync`` se agrupa:
+    se hace cada ``sync_every`` eventos o, como mucho, ``sync_interval``
+    segundos después del primer evento pendiente.
+
+    Cuando el segmento activo acumula ``snapshot_every`` eventos se cierra y
+    un hilo en segundo plano lo funde con la instantánea anterior, de modo
+    que al arrancar sólo hay que leer la instantánea y la cola de eventos.
+
+    Varios procesos pueden compartir el registro: cada escritura se hace
+    bajo un bloqueo consultivo (``flock``) en el que antes se incorporan
+    los eventos y rotaciones de los demás, así que las secuencias no se
+    repiten. La compactación usa su propio bloqueo para no pisar la
+    instantánea de otro proceso ni leer segmentos a medio borrar.
+    """
+
+    def __init__(self, directory: str = "data/events", sync_every: int = 64,
+                 sync_interval: float = 1.0, snapshot_every: int = 5000):
+        self.directory = directory
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._compaction_lock = threading.Lock()
+        self._pending = 0
+        self._first_pending_at = None
+        self._closed = threading.Event()
+        self._syncer = None
+        self._lock_files = {}
+        os.makedirs(directory, exist_ok=True)
+
+        with self._file_lock(_APPEND_LOCK):
+            segments = self._segments()
+            if segments:
+                self._segment_start, path = segments[-1]
+                self._seq = self._recover_tail(path) or self._segment_start - 1
+            else:
+                self._seq = self._read_snapshot().seq
+                self._segment_start, path = self._seq + 1, self._segment_path(self._seq + 1)
+            self._segment_events = self._seq - self._segment_start + 1
+            self._file = open(path, 'a', encoding='utf-8')
+            self._end = os.fstat(self._file.fileno()).st_size
+            self._directory_mtime = os.stat(directory).st_mtime_ns
+
+    @contextmanager
+    def _file_lock(self, name: str, exclusive: bool = True):
+        """Bloqueo consultivo entre procesos sobre un fichero auxiliar del directorio"""
+        if not fcntl:
+            yield
+            return
+        lock_file = self._lock_files.get(name)
+        if lock_file is None:
+            lock_file = self._lock_files[name] = open(os.path.join(self.directory, name), 'a')
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    # Segmentos e instantánea
+
+    def _segment_path(self, start: int) -> str:
+        return os.path.join(self.directory, f"events-{start:012d}.jsonl")
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        """Segmentos en disco como (primera secuencia, ruta), en orden"""
+        segments = []
+        for path in glob.glob(os.path.join(self.directory, _SEGMENT_PATTERN)):
+            name = os.path.basename(path)
+            try:
+                segments.append((int(name[len("events-"):-len(".jsonl")]), path))
+            except ValueError:
+                continue
+        return sorted(segments)
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, _SNAPSHOT_NAME)
+
+    def _read_snapshot(self) -> LogState:
+        if not os.path.exists(self.snapshot_path):
+            return LogState()
+        with open(self.snapshot_path, 'r', encoding='utf-8') as snapshot_file, _gc_paused():
+            data = json.load(snapshot_file)
+        return LogState(
+            seq=data['seq'],
+            patients={patient['id']: patient for patient in data['patients']},
+            evaluations={evaluation['id']: evaluation for evaluation in data['evaluations']}
+        )
+
+    def _write_snapshot(self, state: LogState):
+        """Escribe la instantánea de forma atómica (fichero temporal + rename)"""
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, 'w', encoding='utf-8') as snapshot_file:
+            snapshot_file.write(_dumps({
+                'seq': state.seq,
+                'patients': list(state.patients.values()),
+                'evaluations': state.evaluation_list()
+            }))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temporary, self.snapshot_path)
+
+    @staticmethod
+    def _recover_tail(path: str) -> int:
+        """
+        Última secuencia de un segmento; descarta una línea final incompleta
+        (escritura interrumpida) truncando el fichero.
+        """
+        last_seq, valid_size = 0, 0
+        with open(path, 'rb') as segment:
+            for line in segment:
+                try:
+                    last_seq = json.loads(line)['seq']
+                except (ValueError, KeyError):
+                    break
+                valid_size += len(line)
+        if valid_size != os.path.getsize(path):
+            with open(path, 'r+b') as segment:
+                segment.truncate(valid_size)
+        return last_seq
+
+    def _catch_up_locked(self):
+        """
+        Incorpora lo que otros procesos hayan escrito desde la última
+        escritura de este: un segmento nuevo (rotación) y los eventos
+        añadidos al final del activo. Requiere el bloqueo de escritura.
+        """
+        directory_mtime = os.stat(self.directory).st_mtime_ns
+        if directory_mtime != self._directory_mtime:
+            self._directory_mtime = directory_mtime
+            segments = self._segments()
+            if segments and segments[-1][0] > self._segment_start:
+                self._sync_locked()
+                self._file.close()
+                self._segment_start, path = segments[-1]
+                self._file = open(path, 'a', encoding='utf-8')
+                self._seq = max(self._seq, self._segment_start - 1)
+                self._end = 0
+        size = os.fstat(self._file.fileno()).st_size
+        if size != self._end:
+            valid_size = self._end
+            with open(self._file.name, 'rb') as segment:
+                segment.seek(self._end)
+                for line in segment:
+                    try:
+                        self._seq = json.loads(line)['seq']
+                    except (ValueError, KeyError):
+                        break
+                    valid_size += len(line)
+            if valid_size != size:
+                # Línea incompleta de un proceso interrumpido
+                self._file.truncate(valid_size)
+            self._end = valid_size
+        self._segment_events = self._seq - self._segment_start + 1
+
+    @staticmethod
+    def _read_segment(path: str) -> Iterator[Tuple[int, str, Any]]:
+        with open(path, 'r', encoding='utf-8') as segment:
+            for line in segment:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break
+                yield event['seq'], event['type'], event['data']
+
+    # Escritura
+
+    def append(self, event_type: str, data: Any) -> int:
+        """Añade un evento y devuelve su número de secuencia"""
+        return self.append_many([(event_type, data)])
+
+    def append_many(self, events: Iterable[Tuple[str, Any]]) -> int:
+        """Añade varios eventos con una sola escritura; devuelve la última secuencia"""
+        with self._lock:
+            events = list(events)
+            for event_type, _ in events:
+                if event_type not in EVENT_TYPES:
+                    raise ValueError(f"Tipo de evento desconocido: {event_type}")
+            if not events:
+                return self._seq
+            with self._file_lock(_APPEND_LOCK):
+                self._catch_up_locked()
+                lines = []
+                for event_type, data in events:
+                    self._seq += 1
+                    lines.append(_dumps({'seq': self._seq, 'type': event_type, 'data': data}) + '\n')
+                self._file.write(''.join(lines))
+                self._file.flush()
+                self._end = os.fstat(self._file.fileno()).st_size
+                self._segment_events += len(lines)
+                self._pending += len(lines)
+                if self._first_pending_at is None:
+                    self._first_pending_at = time.monotonic()
+                rotate = self._segment_events >= self.snapshot_every
+                if rotate:
+                    self._rotate_locked()
+            if self._pending >= self.sync_every:
+                self._sync_locked()
+            else:
+                self._ensure_syncer()
+            seq = self._seq
+        if rotate:
+            threading.Thread(target=self.compact, name="event-log-compaction", daemon=True).start()
+        return seq
+
+    def _sync_locked(self):
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+            self._first_pending_at = None
+
+    def sync(self):
+        """Fuerza el volcado a disco de los eventos pendientes"""
+        with self._lock:
+            self._sync_locked()
+
+    def _ensure_syncer(self):
+        """Arranca el hilo que limita el tiempo que un evento puede quedar sin fsync"""
+        if self._syncer is None:
+            self._syncer = threading.Thread(target=self._sync_loop, name="event-log-sync", daemon=True)
+            self._syncer.start()
+
+    def _sync_loop(self):
+        while not self._closed.wait(self.sync_interval / 4):
+            with self._lock:
+                if (self._first_pending_at is not None and
+                        time.monotonic() - self._first_pending_at >= self.sync_interval):
+                    self._sync_locked()
+
+    def _rotate_locked(self):
+        """
+        Cierra el segmento activo y abre uno nuevo a partir de la siguiente
+        secuencia (con el bloqueo de escritura entre procesos ya tomado)
+        """
+        self._sync_locked()
+        self._file.close()
+        self._segment_start = self._seq + 1
+        self._segment_events = 0
+        self._file = open(self._segment_path(self._segment_start), 'a', encoding='utf-8')
+        self._end = 0
+        self._directory_mtime = os.stat(self.directory).st_mtime_ns
+
+    def close(self):
+        """Vuelca los eventos pendientes y cierra el segmento activo"""
+        self._closed.set()
+        with self._lock:
+            if not self._file.closed:
+                self._sync_locked()
+                self._file.close()
+            for lock_file in self._lock_files.values():
+                lock_file.close()
+            self._lock_files = {}
+
+    # Lectura y compactación
+
+    def compact(self):
+        """
+        Funde los segmentos cerrados con la instantánea y los elimina.
+
+        Sólo toca segmentos que ya no reciben escrituras (todos menos el
+        último: quien escribe se pasa antes al segmento más reciente), así
+        que puede ejecutarse en segundo plano mientras se sigue registrando.
+        """
+        with self._compaction_lock, self._file_lock(_COMPACTION_LOCK):
+            closed = self._segments()[:-1]
+            if not closed:
+                return
+            state = self._read_snapshot()
+            for _, path in closed:
+                for seq, event_type, data in self._read_segment(path):
+                    if seq > state.seq:
+                        state.apply(event_type, data)
+                        state.seq = seq
+            self._write_snapshot(state)
+            for _, path in closed:
+                os.remove(path)
+
+    def snapshot(self):
+        """Cierra el segmento activo y compacta todo el registro en una instantánea"""
+        with self._lock, self._file_lock(_APPEND_LOCK):
+            self._catch_up_locked()
+            if self._segment_events:
+                self._rotate_locked()
+        self.compact()
+
+    def state(self) -> LogState:
+        """Estado actual: instantánea más la cola de eventos posterior"""
+        with self._compaction_lock, self._file_lock(_COMPACTION_LOCK, exclusive=False):
+            with self._lock:
+                self._file.flush()
+            state = self._read_snapshot()
+            with _gc_paused():
+                for _, path in self._segments():
+                    for seq, event_type, data in self._read_segment(path):
+                        if seq > state.seq:
+                            state.apply(event_type, data)
+                            state.seq = seq
+        return state
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def tail_length(self) -> int:
+        """Eventos registrados después de la última instantánea"""
+        segments = self._segments()
+        return self._seq - (segments[0][0] - 1) if segments else 0
@@ -0,0 +1,252 @@
+import json
+import os
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Mapping, Iterable
+
+from models.fall_risk import (
+    AmbulatoryAid, Gait, MentalStatus, MorseInputs, DowntonInputs, FallRiskScore
+)
+from backend.vitals import evaluation_timestamp
+
+# Equivalencias entre el estado de movilidad de las evaluaciones y la marcha de Morse
+MOBILITY_TO_GAIT = {
+    'Independiente': Gait.NORMAL,
+    'Asistencia Mínima': Gait.WEAK,
+    'Asistencia Total': Gait.IMPAIRED,
+    'Inmóvil': Gait.NORMAL
+}
+
+MOBILITY_TO_AID = {
+    'Independiente': AmbulatoryAid.NONE,
+    'Asistencia Mínima': AmbulatoryAid.CRUTCHES,
+    'Asistencia Total': AmbulatoryAid.NONE,
+    'Inmóvil': AmbulatoryAid.NONE
+}
+
+
+class FallRiskHistory:
+    """
+    Historial persistente de valoraciones de riesgo de caídas por residente.
+
+    Cada valoración se añade como una línea JSON al fichero de historial, de
+    modo que el registro sobrevive a los reinicios de la aplicación.
+    """
+
+    def __init__(self, path: str = "data/fall_risk/historial_riesgo_caidas.jsonl"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_patient: Dict[Any, List[FallRiskScore]] = {}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Carga el historial existente desde disco"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as history_file:
+            for line in history_file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    score = FallRiskScore.from_dict(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    print(f"Registro de riesgo de caídas ignorado: {e}")
+                    continue
+                self._by_patient.setdefault(score.patient_id, []).append(score)
+
+    def append_many(self, scores: Iterable[FallRiskScore]):
+        """Persiste varias valoraciones con una única escritura"""
+        scores = list(scores)
+        if not scores:
+            return
+        payload = ''.join(json.dumps(s.to_dict(), ensure_ascii=False) + '\n' for s in scores)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as history_file:
+                history_file.write(payload)
+            for score in scores:
+                self._by_patient.setdefault(score.patient_id, []).append(score)
+
+    def append(self, score: FallRiskScore):
+        """Persiste una valoración"""
+        self.append_many([score])
+
+    def for_patient(self, patient_id) -> List[FallRiskScore]:
+        """Valoraciones de un residente en orden cronológico"""
+        return list(self._by_patient.get(patient_id, []))
+
+    def latest(self, patient_id) -> Optional[FallRiskScore]:
+        """Última valoración de un residente"""
+        scores = self._by_patient.get(patient_id)
+        return scores[-1] if scores else None
+
+
+class FallRiskScorer:
+    """
+    Cálculo de las escalas Morse y Downton, individual o por lotes sobre el censo
+    """
+
+    def __init__(self, history: FallRiskHistory = None):
+        self.history = history
+
+    @staticmethod
+    def score_morse(inputs: MorseInputs) -> int:
+        """Puntuación de Morse de un residente"""
+        return sum(inputs.item_points)
+
+    def score(self, patient_id, morse: MorseInputs, downton: DowntonInputs = None,
+              source: str = "manual") -> FallRiskScore:
+        """Valora a un residente y persiste el resultado si hay historial"""
+        result = FallRiskScore(
+            patient_id=patient_id,
+            morse_score=self.score_morse(morse),
+            morse_inputs=morse,
+            downton_score=downton.score if downton else None,
+            downton_inputs=downton,
+            source=source
+        )
+        if self.history:
+            self.history.append(result)
+        return result
+
+    def score_batch(self, inputs: Mapping[Any, MorseInputs],
+                    downton: Mapping[Any, DowntonInputs] = None,
+                    source: str = "batch") -> Dict[Any, FallRiskScore]:
+        """
+        Valora de una vez a todos los residentes indicados.
+
+        Las puntuaciones se calculan como una suma matricial de los puntos de
+        cada ítem y se persisten con una única escritura.
+        """
+        patient_ids = list(inputs.keys())
+        if not patient_ids:
+            return {}
+        downton = downton or {}
+        points = np.array([inputs[pid].item_points for pid in patient_ids], dtype=np.int16)
+        totals = points.sum(axis=1)
+        scored_at = datetime.now()
+
+        results = {}
+        for pid, total in zip(patient_ids, totals):
+            downton_inputs = downton.get(pid)
+            results[pid] = FallRiskScore(
+                patient_id=pid,
+                morse_score=int(total),
+                morse_inputs=inputs[pid],
+                downton_score=downton_inputs.score if downton_inputs else None,
+                downton_inputs=downton_inputs,
+                scored_at=scored_at,
+                source=source
+            )
+        if self.history:
+            self.history.append_many(results.values())
+        return results
+
+    def derive_inputs(self, patient: Dict[str, Any], evaluations: List[Dict[str, Any]],
+                      previous: MorseInputs = None,
+                      falls_lookback: timedelta = timedelta(days=90),
+                      fall_reported_at: datetime = None) -> MorseInputs:
+        """
+        Deduce los ítems de Morse a partir del paciente y de sus evaluaciones recientes.
+
+        Los ítems que no se registran en las evaluaciones (ayuda técnica y
+        terapia IV) se conservan de la valoración previa cuando existe. El
+        antecedente de caídas no se hereda: sólo cuenta si hay una evaluación
+        con caídas, o una caída anotada a mano (``fall_reported_at``), dentro
+        de ``falls_lookback``.
+        """
+        latest = max(evaluations, key=evaluation_timestamp) if evaluations else None
+        status = (latest or {}).get('general_status', {})
+
+        cutoff = (evaluation_timestamp(latest) if latest else datetime.now()) - falls_lookback
+        falls = fall_reported_at is not None and fall_reported_at >= cutoff
+        falls = falls or any(
+            'Caídas recientes' in e.get('symptoms', []) and evaluation_timestamp(e) >= cutoff
+            for e in evaluations
+        )
+
+        active_conditions = sum(1 for active in patient.get('conditions', {}).values() if active)
+
+        mobility = status.get('mobility')
+        if previous:
+            ambulatory_aid = previous.ambulatory_aid
+        else:
+            ambulatory_aid = MOBILITY_TO_AID.get(mobility, AmbulatoryAid.NONE)
+
+        gait = MOBILITY_TO_GAIT.get(mobility, previous.gait if previous else Gait.NORMAL)
+
+        disoriented = (status.get('cognitive_status') in ('Confuso', 'Agitado') or
+                       patient.get('cognitive_level', 'Normal') != 'Normal')
+
+        return MorseInputs(
+            history_of_falls=falls,
+            secondary_diagnosis=active_conditions >= 2,
+            ambulatory_aid=ambulatory_aid,
+            iv_therapy=previous.iv_therapy if previous else False,
+            gait=gait,
+            mental_status=MentalStatus.FORGETS_LIMITATIONS if disoriented else MentalStatus.ORIENTED
+        )
+
+    @staticmethod
+    def derive_downton(morse: MorseInputs, previous: DowntonInputs = None) -> DowntonInputs:
+        """
+        Deduce los ítems de Downton a partir de los ítems de Morse del residente.
+
+        Caídas previas, confusión y marcha insegura se comparten con Morse; la
+        medicación y los déficits sensoriales no se registran en las
+        evaluaciones y se conservan de la valoración previa cuando existe.
+        """
+        if previous is None:
+            return DowntonInputs.from_morse(morse)
+        return DowntonInputs.from_morse(morse, previous.medications, previous.sensory_deficits)
+
+    def rescore_census(self, patients: Mapping[Any, Dict[str, Any]],
+                       evaluations: Iterable[Dict[str, Any]]) -> Dict[Any, FallRiskScore]:
+        """
+        Re-evaluación periódica de todo el censo en una sola llamada.
+
+        Deduce los ítems de Morse y Downton de cada residente, los puntúa por
+        lotes, persiste el historial y actualiza el riesgo de caídas de cada
+        paciente.
+        """
+        by_patient: Dict[Any, List[Dict[str, Any]]] = {pid: [] for pid in patients}
+        for evaluation in evaluations:
+            pid = evaluation.get('patient_id')
+            if pid in by_patient:
+                by_patient[pid].append(evaluation)
+
+        inputs = {}
+        downton = {}
+        for pid, patient in patients.items():
+            previous = self.history.latest(pid) if self.history else None
+            inputs[pid] = self.derive_inputs(
+                patient, by_patient[pid], previous.morse_inputs if previous else None,
+                fall_reported_at=self.fall_reported_at(pid)
+            )
+            downton[pid] = self.derive_downton(inputs[pid], previous.downton_inputs if previous else None)
+
+        results = self.score_batch(inputs, downton)
+        for pid, result in results.items():
+            self.apply_to_patient(patients[pid], result)
+        return results
+
+    def fall_reported_at(self, patient_id) -> Optional[datetime]:
+        """Fecha de la última valoración manual que anotó caídas previas (None si no hay)"""
+        if not self.history:
+            return None
+        for score in reversed(self.history.for_patient(patient_id)):
+            if score.source == "manual" and score.morse_inputs.history_of_falls:
+                return score.scored_at
+        return None
+
+    @staticmethod
+    def apply_to_patient(patient, result: FallRiskScore):
+        """Actualiza el riesgo de caídas de un ``Patient`` o de su diccionario"""
+        if isinstance(patient, dict):
+            patient['fall_risk'] = result.fall_risk
+            patient['fall_risk_score'] = result.morse_score
+            patient['fall_risk_date'] = result.scored_at.date().isoformat()
+        else:
+            patient.fall_risk = result.fall_risk
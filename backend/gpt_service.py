@@ -29,7 +29,8 @@ class GPTService:
             self.client = None
             self.model = None
         
-    def analyze_patient_condition(self, patient, assessment_data: Dict) -> str:
+    def analyze_patient_condition(self, patient, assessment_data: Dict,
+                                  trends: List[str] = None) -> str:
         """
         Analiza la condición del paciente usando IA y las guías clínicas españolas
         """
@@ -40,7 +41,7 @@ class GPTService:
         try:
             print("🤖 Iniciando análisis con IA...")
             system_prompt = self._build_system_prompt()
-            user_prompt = self._build_user_prompt(patient, assessment_data)
+            user_prompt = self._build_user_prompt(patient, assessment_data, trends)
             
             response = self.client.chat.completions.create(
                 model=self.model,
@@ -329,7 +330,7 @@ RESPONDE SIEMPRE en este formato estructurado:
 
 Sé específico, práctico y siempre prioriza la seguridad del paciente anciano."""
 
-    def _build_user_prompt(self, patient, assessment_data: Dict) -> str:
+    def _build_user_prompt(self, patient, assessment_data: Dict, trends: List[str] = None) -> str:
         """Construye el prompt del usuario con datos del paciente"""
         
         patient_info = f"""
@@ -400,6 +401,11 @@ ESTADO GENERAL OBSERVADO:
         if observations:
             evaluation_info += f"\nOBSERVACIONES ADICIONALES DEL CUIDADOR:\n{observations}\n"
         
+        if trends:
+            evaluation_info += "\nTENDENCIAS RECIENTES DE SIGNOS VITALES:\n"
+            for line in trends:
+                evaluation_info += f"- {line}\n"
+        
         evaluator = assessment_data.get('evaluator', 'No especificado')
         evaluation_info += f"\nEvaluación realizada por: {evaluator}"
         
@@ -0,0 +1,271 @@
+import io
+import os
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Any, Iterable, Iterator
+
+# Cabeceras admitidas para cada campo del paciente (sin distinguir mayúsculas ni tildes)
+COLUMN_ALIASES = {
+    'name': ('name', 'nombre', 'nombre completo', 'nombre_completo'),
+    'age': ('age', 'edad'),
+    'gender': ('gender', 'genero', 'sexo'),
+    'room': ('room', 'habitacion', 'hab'),
+    'admission_date': ('admission_date', 'fecha ingreso', 'fecha_ingreso', 'fecha de ingreso'),
+    'emergency_contact': ('emergency_contact', 'contacto emergencia', 'contacto_emergencia',
+                          'contacto de emergencia'),
+    'risk_level': ('risk_level', 'nivel riesgo', 'nivel_riesgo', 'riesgo'),
+    'fall_risk': ('fall_risk', 'riesgo caidas', 'riesgo_caidas'),
+    'cognitive_level': ('cognitive_level', 'nivel cognitivo', 'nivel_cognitivo'),
+    'allergies': ('allergies', 'alergias'),
+    'medical_history': ('medical_history', 'historial medico', 'historial_medico'),
+    'medications': ('medications', 'medicacion', 'medicamentos'),
+    'diabetes': ('diabetes',),
+    'hypertension': ('hypertension', 'hipertension'),
+    'heart_disease': ('heart_disease', 'enfermedad cardiaca', 'enfermedad_cardiaca', 'cardiopatia'),
+    'dementia': ('dementia', 'demencia'),
+    'depression': ('depression', 'depresion'),
+    'mobility_issues': ('mobility_issues', 'problemas movilidad', 'problemas_movilidad')
+}
+
+CONDITION_FIELDS = ('diabetes', 'hypertension', 'heart_disease', 'dementia', 'depression', 'mobility_issues')
+TEXT_FIELDS = ('room', 'emergency_contact', 'allergies', 'medical_history', 'medications')
+
+GENDERS = ("Masculino", "Femenino", "Otro")
+RISK_LEVELS = ("Bajo", "Medio", "Alto")
+COGNITIVE_LEVELS = ("Normal", "Deterioro Leve", "Deterioro Moderado", "Deterioro Severo")
+
+_TRUE_VALUES = {'si', 'sí', 's', 'x', '1', 'true', 'verdadero', 'yes', 'y'}
+
+_ACCENTS = str.maketrans('áéíóúüÁÉÍÓÚÜ', 'aeiouuAEIOUU')
+
+
+def _normalize_header(header: str) -> str:
+    return str(header).strip().lower().translate(_ACCENTS).replace('-', ' ')
+
+
+@dataclass
+class ImportReport:
+    """
+    Resultado de la validación de un fichero de censo
+    """
+    total_rows: int = 0
+    valid: List[Dict[str, Any]] = field(default_factory=list)
+    errors: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=['fila', 'campo', 'error']))
+    unknown_columns: List[str] = field(default_factory=list)
+
+    @property
+    def invalid_rows(self) -> int:
+        return int(self.errors['fila'].nunique()) if not self.errors.empty else 0
+
+
+class PatientImporter:
+    """
+    Importación masiva de residentes desde CSV o Excel.
+
+    El fichero se lee por bloques y cada bloque se valida con operaciones
+    vectorizadas sobre columnas que aplican las mismas reglas que
+    ``Patient.validate_data``.
+    """
+
+    def __init__(self, chunk_size: int = 5000):
+        self.chunk_size = chunk_size
+
+    # Lectura
+
+    def read_chunks(self, source, filename: str) -> Iterator[pd.DataFrame]:
+        """Bloques de filas del fichero como texto (sin inferencia de tipos)"""
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in ('.xlsx', '.xls'):
+            try:
+                # Sin dtype=str: las celdas de fecha llegan como fechas y no como "AAAA-MM-DD 00:00:00"
+                frame = pd.read_excel(source, dtype=object).map(self._excel_text)
+            except ImportError as e:
+                raise ValueError(f"Para importar Excel instale openpyxl ({e})") from e
+            for start in range(0, len(frame), self.chunk_size):
+                yield frame.iloc[start:start + self.chunk_size]
+        else:
+            if isinstance(source, (bytes, bytearray)):
+                source = io.BytesIO(source)
+            yield from pd.read_csv(source, dtype=str, sep=self._delimiter(source),
+                                   encoding='utf-8-sig', chunksize=self.chunk_size)
+
+    @staticmethod
+    def _excel_text(value):
+        """Celda de Excel como texto, con las fechas en formato AAAA-MM-DD"""
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y-%m-%d')
+        return value if pd.isna(value) else str(value)
+
+    @staticmethod
+    def _delimiter(source) -> str:
+        """Separador del CSV (',' o ';' de Excel en español) deducido de la cabecera"""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as csv_file:
+                header = csv_file.readline()
+        else:
+            position = source.tell()
+            header = source.readline()
+            source.seek(position)
+        if isinstance(header, str):
+            header = header.encode('utf-8')
+        return ';' if header.count(b';') > header.count(b',') else ','
+
+    @staticmethod
+    def map_columns(columns: Iterable[str]):
+        """Relaciona las cabeceras del fichero con los campos del paciente"""
+        lookup = {alias: name for name, aliases in COLUMN_ALIASES.items() for alias in aliases}
+        mapping, unknown = {}, []
+        for column in columns:
+            name = lookup.get(_normalize_header(column))
+            if name and name not in mapping.values():
+                mapping[column] = name
+            else:
+                unknown.append(column)
+        return mapping, unknown
+
+    # Validación
+
+    def validate(self, source, filename: str, today: date = None) -> ImportReport:
+        """Lee y valida todo el fichero"""
+        today = today or date.today()
+        report = ImportReport()
+        error_frames = []
+        seen_keys = set()
+        offset = 0
+        for chunk in self.read_chunks(source, filename):
+            mapping, unknown = self.map_columns(chunk.columns)
+            if offset == 0:
+                report.unknown_columns = unknown
+            chunk = chunk.rename(columns=mapping)[list(mapping.values())]
+            rows = pd.RangeIndex(offset + 2, offset + 2 + len(chunk))  # fila 1 = cabecera
+            chunk.index = rows
+            offset += len(chunk)
+
+            normalized, errors = self._validate_chunk(chunk, today)
+
+            # Duplicados (mismo nombre y habitación) dentro del fichero
+            keys = normalized['name'].str.lower() + '|' + normalized['room'].str.lower()
+            duplicated = keys.duplicated() | keys.isin(seen_keys)
+            seen_keys.update(keys[~duplicated])
+            errors.append(self._errors(duplicated, 'name', "Paciente duplicado en el fichero (nombre y habitación)"))
+
+            chunk_errors = pd.concat(errors, ignore_index=True)
+            error_frames.append(chunk_errors)
+            invalid = set(chunk_errors['fila'])
+            report.valid.extend(self._records(normalized[~normalized.index.isin(invalid)]))
+
+        report.total_rows = offset
+        if error_frames:
+            report.errors = (pd.concat(error_frames, ignore_index=True)
+                             .sort_values('fila', kind='stable').reset_index(drop=True))
+        return report
+
+    @staticmethod
+    def _errors(mask: pd.Series, column: str, message: str) -> pd.DataFrame:
+        rows = mask.index[mask.to_numpy(dtype=bool)]
+        return pd.DataFrame({'fila': rows, 'campo': column, 'error': message})
+
+    def _validate_chunk(self, chunk: pd.DataFrame, today: date):
+        errors = []
+        frame = pd.DataFrame(index=chunk.index)
+
+        def text(column: str) -> pd.Series:
+            if column not in chunk:
+                return pd.Series('', index=chunk.index, dtype=object)
+            return chunk[column].fillna('').astype(str).str.strip()
+
+        frame['name'] = text('name')
+        errors.append(self._errors(frame['name'].str.len() < 2, 'name',
+                                   "El nombre debe tener al menos 2 caracteres"))
+
+        age = pd.to_numeric(text('age').str.replace(',', '.'), errors='coerce')
+        bad_age = age.isna() | (age != np.floor(age)) | (age < 0) | (age > 120)
+        errors.append(self._errors(bad_age, 'age', "La edad debe ser un número entre 0 y 120"))
+        frame['age'] = age.where(~bad_age, 0).astype(int)
+
+        frame['gender'] = self._choice(text('gender'), GENDERS, {'m': "Masculino", 'h': "Masculino",
+                                                                 'f': "Femenino", 'v': "Masculino"})
+        errors.append(self._errors(frame['gender'].isna(), 'gender',
+                                   "El género debe ser Masculino, Femenino u Otro"))
+
+        for column in ('risk_level', 'fall_risk'):
+            if column == 'fall_risk' and column not in chunk:
+                continue
+            values = text(column)
+            chosen = self._choice(values.where(values != '', "Medio"), RISK_LEVELS)
+            label = "El nivel de riesgo" if column == 'risk_level' else "El riesgo de caídas"
+            errors.append(self._errors(chosen.isna(), column, f"{label} debe ser Bajo, Medio o Alto"))
+            frame[column] = chosen
+
+        cognitive = text('cognitive_level')
+        frame['cognitive_level'] = self._choice(cognitive.where(cognitive != '', "Normal"), COGNITIVE_LEVELS)
+        errors.append(self._errors(frame['cognitive_level'].isna(), 'cognitive_level',
+                                   f"El nivel cognitivo debe ser uno de: {', '.join(COGNITIVE_LEVELS)}"))
+
+        raw_dates = text('admission_date')
+        iso = pd.to_datetime(raw_dates, format='%Y-%m-%d', errors='coerce')
+        european = pd.to_datetime(raw_dates, format='%d/%m/%Y', errors='coerce')
+        admission = iso.fillna(european)
+        admission = admission.where(raw_dates != '', pd.Timestamp(today))
+        errors.append(self._errors(admission.isna(), 'admission_date',
+                                   "Fecha de ingreso no válida (use AAAA-MM-DD o DD/MM/AAAA)"))
+        errors.append(self._errors(admission > pd.Timestamp(today), 'admission_date',
+                                   "La fecha de admission no puede ser futura"))
+        frame['admission_date'] = admission.dt.strftime('%Y-%m-%d')
+
+        for column in TEXT_FIELDS:
+            frame[column] = text(column)
+        for column in CONDITION_FIELDS:
+            frame[column] = text(column).str.lower().isin(_TRUE_VALUES)
+
+        return frame, errors
+
+    @staticmethod
+    def _choice(values: pd.Series, options, aliases: Dict[str, str] = None) -> pd.Series:
+        """Normaliza una columna categórica; NaN si el valor no es una opción válida"""
+        lookup = {option.lower().translate(_ACCENTS): option for option in options}
+        lookup.update(aliases or {})
+        return values.str.lower().str.translate(_ACCENTS).map(lookup)
+
+    @staticmethod
+    def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Filas válidas con el formato de paciente de la aplicación (sin ID)"""
+        now = datetime.now()
+        records = []
+        for row in frame.to_dict('records'):
+            record = {
+                'name': row['name'],
+                'age': int(row['age']),
+                'gender': row['gender'],
+                'room': row['room'],
+                'admission_date': row['admission_date'],
+                'emergency_contact': row['emergency_contact'],
+                'risk_level': row['risk_level'],
+                'cognitive_level': row['cognitive_level'],
+                'allergies': row['allergies'],
+                'medical_history': row['medical_history'],
+                'conditions': {condition: bool(row[condition]) for condition in CONDITION_FIELDS},
+                'medications': row['medications'],
+                'registered_date': str(now.date()),
+                'registered_time': now.strftime("%H:%M:%S")
+            }
+            if 'fall_risk' in row:
+                record['fall_risk'] = row['fall_risk']
+            records.append(record)
+        return records
+
+    # Plantilla
+
+    @staticmethod
+    def template_csv() -> str:
+        """Plantilla CSV con las cabeceras admitidas y una fila de ejemplo"""
+        example = pd.DataFrame([{
+            'nombre': "María García López", 'edad': 82, 'genero': "Femenino", 'habitacion': "101-A",
+            'fecha_ingreso': str(date.today()), 'contacto_emergencia': "Hija - 600 000 000",
+            'nivel_riesgo': "Medio", 'nivel_cognitivo': "Normal", 'alergias': "",
+            'historial_medico': "", 'medicacion': "", 'diabetes': "no", 'hipertension': "sí",
+            'enfermedad_cardiaca': "no", 'demencia': "no", 'depresion': "no", 'problemas_movilidad': "no"
+        }])
+        return example.to_csv(index=False)
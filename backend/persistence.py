@@ -0,0 +1,313 @@
+"""
+Canal único de persistencia de evaluaciones.
+
+Cada evaluación se serializa una sola vez en un registro canónico plano
+(``canonical_record``) y ese mismo registro se reparte a todos los
+destinos configurados: CSV diario y series de signos vitales. SQLite ya
+guarda la evaluación en el repositorio (de donde salen las copias de
+``backend.backup_export``) y el archivo columnar (``backend.archive``) se
+genera a partir de los CSV diarios. Cada destino tiene su propia cola
+acotada y su hilo de escritura, que agrupa los registros en lotes; si un
+destino se queda atrás, su cola se llena y ``publish`` espera
+(contrapresión) en lugar de acumular memoria sin límite.
+"""
+import queue
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional, Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+from backend.report_writer import ReportWriter
+
+# Columnas del CSV diario de evaluaciones (mismo orden que los ficheros existentes)
+CSV_FIELDS = [
+    'fecha_evaluacion', 'hora_evaluacion', 'id_paciente', 'nombre_paciente',
+    'edad', 'habitacion', 'presion_sistolica', 'presion_diastolica',
+    'frecuencia_cardiaca', 'temperatura', 'saturacion_oxigeno', 'nivel_dolor',
+    'estado_movilidad', 'apetito', 'calidad_sueno', 'estado_animo',
+    'estado_cognitivo', 'continencia', 'sintomas_observados',
+    'observaciones_adicionales', 'evaluador', 'puntuacion_severidad',
+    'nivel_severidad', 'requiere_atencion_medica', 'alertas_criticas',
+    'alertas_advertencia', 'numero_recomendaciones'
+]
+
+RECORD_FIELDS = ['id_evaluacion'] + CSV_FIELDS
+
+NUMERIC_FIELDS = (
+    'id_evaluacion', 'id_paciente', 'edad', 'presion_sistolica', 'presion_diastolica',
+    'frecuencia_cardiaca', 'temperatura', 'saturacion_oxigeno', 'nivel_dolor',
+    'puntuacion_severidad', 'alertas_criticas', 'alertas_advertencia', 'numero_recomendaciones'
+)
+
+
+def canonical_record(evaluation, patient: Optional[Dict[str, Any]] = None,
+                     analysis: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Registro canónico de una evaluación (diccionario de la aplicación o ``Assessment``).
+
+    Resuelve las dos variantes de los datos: el dolor puede venir en los
+    signos vitales (aplicación) o en el estado general (``Assessment``), y la
+    calidad del sueño como ``sleep_quality`` o ``sleep``.
+    """
+    if isinstance(evaluation, dict):
+        data = evaluation
+        evaluation_date = data.get('date', str(date.today()))
+        evaluation_time = data.get('time', datetime.now().strftime("%H:%M:%S"))
+        evaluator = data.get('evaluator') or "Sistema IA Geriátrico"
+    else:
+        data = {**evaluation.data, 'patient_id': evaluation.patient_id}
+        evaluation_date = str(evaluation.date)
+        evaluation_time = evaluation.time.strftime("%H:%M:%S")
+        evaluator = evaluation.evaluator_name
+
+    vitals = data.get('vital_signs') or {}
+    status = data.get('general_status') or {}
+    systolic, diastolic = vitals.get('systolic_bp'), vitals.get('diastolic_bp')
+    if systolic is None and '/' in str(vitals.get('blood_pressure', '')):
+        systolic, _, diastolic = vitals['blood_pressure'].partition('/')
+    pain_level = vitals.get('pain_level')
+    if pain_level is None:
+        pain_level = status.get('pain_level')
+    symptoms = data.get('symptoms') or []
+    alerts = (analysis or {}).get('alerts') or []
+
+    return {
+        'id_evaluacion': data.get('id'),
+        'fecha_evaluacion': evaluation_date,
+        'hora_evaluacion': evaluation_time,
+        'id_paciente': data.get('patient_id'),
+        'nombre_paciente': data.get('patient_name') or (patient or {}).get('name', ''),
+        'edad': (patient or {}).get('age'),
+        'habitacion': (patient or {}).get('room', ''),
+        'presion_sistolica': systolic,
+        'presion_diastolica': diastolic,
+        'frecuencia_cardiaca': vitals.get('heart_rate'),
+        'temperatura': vitals.get('temperature'),
+        'saturacion_oxigeno': vitals.get('oxygen_saturation'),
+        'nivel_dolor': pain_level,
+        'estado_movilidad': status.get('mobility', ''),
+        'apetito': status.get('appetite', ''),
+        'calidad_sueno': status.get('sleep_quality', status.get('sleep', '')),
+        'estado_animo': status.get('mood', ''),
+        'estado_cognitivo': status.get('cognitive_status', ''),
+        'continencia': status.get('continence', ''),
+        'sintomas_observados': ', '.join(symptoms) if symptoms else 'Ninguno',
+        'observaciones_adicionales': data.get('observations', ''),
+        'evaluador': evaluator,
+        'puntuacion_severidad': (analysis or {}).get('severity_score'),
+        'nivel_severidad': (analysis or {}).get('severity_level', ''),
+        'requiere_atencion_medica': 'Sí' if (analysis or {}).get('requires_immediate_attention') else 'No',
+        'alertas_criticas': sum(1 for alert in alerts if alert.get('level') == 'critical'),
+        'alertas_advertencia': sum(1 for alert in alerts if alert.get('level') == 'warning'),
+        'numero_recomendaciones': len((analysis or {}).get('recommendations') or [])
+    }
+
+
+class Sink:
+    """
+    Destino del canal de persistencia.
+
+    Las subclases implementan ``write_batch``; ``batch_size`` y
+    ``batch_interval`` controlan cuántos registros se agrupan y cuánto se
+    espera como máximo a completar un lote, y ``max_pending`` acota la cola.
+    """
+    name = "destino"
+
+    def __init__(self, batch_size: int = 100, batch_interval: float = 1.0, max_pending: int = 10_000):
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_pending = max_pending
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvSink(Sink):
+    """CSV diario ``evaluaciones_diarias_AAAA-MM-DD.csv`` a través de ``ReportWriter``"""
+    name = "CSV diario"
+
+    def __init__(self, writer: ReportWriter, **options):
+        super().__init__(**options)
+        self.writer = writer
+        if self.writer.fieldnames is None:
+            self.writer.fieldnames = list(CSV_FIELDS)
+
+    def write_batch(self, records):
+        self.writer.write_many(records)
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class VitalSink(Sink):
+    """Series de signos vitales por residente (``backend.vital_store.VitalStore``)"""
+    name = "Signos vitales"
+
+    def __init__(self, store, **options):
+        super().__init__(**options)
+        self.store = store
+
+    def write_batch(self, records):
+        by_patient: Dict[Any, List[np.ndarray]] = {}
+        for record in records:
+            if record.get('id_paciente') is not None:
+                by_patient.setdefault(record['id_paciente'], []).append(self.store.record_from_canonical(record))
+        for patient_id, rows in by_patient.items():
+            self.store.append_records(patient_id, np.concatenate(rows))
+
+
+class _SinkWorker:
+    """
+    Cola acotada e hilo de escritura por lotes de un destino.
+
+    Si un lote falla, sus registros se guardan y se reintentan junto con el
+    lote siguiente, o solos tras una espera que se duplica en cada fallo
+    (hasta ``MAX_RETRY_DELAY``). Sólo se descartan si los pendientes
+    superan ``max_pending`` o si el canal se cierra sin poder escribirlos.
+    """
+
+    RETRY_DELAY = 1.0
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(self, sink: Sink):
+        self.sink = sink
+        self.queue: queue.Queue = queue.Queue(maxsize=sink.max_pending)
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+        self.last_error = None
+        self.blocked_seconds = 0.0
+        self.failed: List[Dict[str, Any]] = []
+        self._retry_delay = self.RETRY_DELAY
+        self._thread = threading.Thread(target=self._run, name=f"sink-{sink.name}", daemon=True)
+        self._thread.start()
+
+    def put(self, record: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Contrapresión: el productor espera a que el destino libere espacio
+            start = time.monotonic()
+            self.queue.put(record)
+            self.blocked_seconds += time.monotonic() - start
+
+    def _run(self):
+        while True:
+            try:
+                # Con registros fallidos no se espera indefinidamente: se reintentan tras la pausa
+                record = self.queue.get(timeout=self._retry_delay if self.failed else None)
+            except queue.Empty:
+                self._write([])
+                continue
+            if record is None:
+                if self.failed:
+                    self._write([])
+                    if self.failed:
+                        print(f"❌ {len(self.failed)} registros sin escribir en {self.sink.name} al cerrar")
+                self.queue.task_done()
+                return
+            batch, stop = [record], False
+            deadline = time.monotonic() + self.sink.batch_interval
+            while len(batch) < self.sink.batch_size:
+                try:
+                    record = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+            self._write(batch)
+            for _ in range(len(batch) + stop):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        retrying = bool(self.failed)
+        batch = self.failed + batch
+        try:
+            self.sink.write_batch(batch)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            print(f"❌ Error escribiendo en {self.sink.name}: {e} (se reintentará)")
+            excess = len(batch) - self.sink.max_pending
+            if excess > 0:
+                self.dropped += excess
+                batch = batch[excess:]
+            self.failed = batch
+            if retrying:
+                self._retry_delay = min(self._retry_delay * 2, self.MAX_RETRY_DELAY)
+            return
+        self.failed = []
+        self._retry_delay = self.RETRY_DELAY
+        self.written += len(batch)
+        self.batches += 1
+
+    def stop(self):
+        self.queue.put(None)
+        self._thread.join()
+
+
+class PersistencePipeline:
+    """Reparte cada registro canónico a todos los destinos"""
+
+    def __init__(self, sinks: Iterable[Sink]):
+        self._workers = [_SinkWorker(sink) for sink in sinks]
+        self._closed = False
+
+    def publish(self, record: Dict[str, Any]):
+        """Entrega un registro a todos los destinos (espera si alguna cola está llena)"""
+        if self._closed:
+            raise RuntimeError("El canal de persistencia está cerrado")
+        for worker in self._workers:
+            worker.put(record)
+
+    def publish_evaluation(self, evaluation, patient=None, analysis=None) -> Dict[str, Any]:
+        """Serializa una evaluación una sola vez y la reparte; devuelve el registro"""
+        record = canonical_record(evaluation, patient, analysis)
+        self.publish(record)
+        return record
+
+    def flush(self):
+        """Espera a que todos los destinos hayan escrito lo publicado"""
+        for worker in self._workers:
+            worker.queue.join()
+
+    def close(self):
+        """Escribe lo pendiente, detiene los hilos y cierra los destinos"""
+        if self._closed:
+            return
+        self._closed = True
+        for worker in self._workers:
+            worker.stop()
+            worker.sink.close()
+
+    def sink(self, name: str) -> Optional[Sink]:
+        for worker in self._workers:
+            if worker.sink.name == name:
+                return worker.sink
+        return None
+
+    def stats(self) -> pd.DataFrame:
+        """Estado de cada destino: registros escritos, lotes, cola y errores"""
+        return pd.DataFrame([{
+            'Destino': worker.sink.name,
+            'Registros': worker.written,
+            'Lotes': worker.batches,
+            'En cola': worker.queue.qsize(),
+            'Espera (s)': round(worker.blocked_seconds, 2),
+            'Errores': worker.errors,
+            'Por reintentar': len(worker.failed),
+            'Descartados': worker.dropped,
+            'Último error': worker.last_error or ''
+        } for worker in self._workers])
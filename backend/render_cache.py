@@ -0,0 +1,69 @@
+"""
+Caché de lo que se dibuja en cada recarga (tablas y datos de gráficos).
+
+Streamlit vuelve a ejecutar la página entera con cada interacción, aunque
+los datos no hayan cambiado. Las entradas se guardan por vista, versión
+de datos del almacén compartido y parámetros de la vista; cuando aparece
+una versión más reciente se descartan todas las de versiones anteriores.
+Se comparte entre sesiones (``st.cache_resource``): los valores devueltos
+no deben modificarse.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Hashable, Tuple
+
+
+class RenderCache:
+    """Resultados de vistas por (vista, versión, parámetros), con contadores de aciertos"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = 0
+        self._entries: 'OrderedDict[Tuple[str, Tuple[Hashable, ...]], Any]' = OrderedDict()
+        self._hits: Dict[str, int] = {}
+        self._misses: Dict[str, int] = {}
+        self.evictions = 0
+
+    def get(self, view: str, version: int, params: Tuple[Hashable, ...], build: Callable[[], Any]) -> Any:
+        """Resultado de ``build`` para la vista; sólo se calcula si no está en caché"""
+        key = (view, params)
+        with self._lock:
+            if version > self._version:
+                # Datos nuevos: nada de lo guardado vale ya
+                self.evictions += len(self._entries)
+                self._entries.clear()
+                self._version = version
+            if version == self._version and key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits[view] = self._hits.get(view, 0) + 1
+                return self._entries[key]
+            self._misses[view] = self._misses.get(view, 0) + 1
+        # Se calcula fuera del cerrojo para no bloquear a las demás sesiones
+        value = build()
+        with self._lock:
+            # Una sesión con una instantánea anterior no guarda nada
+            if version == self._version:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Aciertos y fallos por vista y en total"""
+        with self._lock:
+            views = {
+                view: {'hits': self._hits.get(view, 0), 'misses': self._misses.get(view, 0)}
+                for view in sorted(set(self._hits) | set(self._misses))
+            }
+            hits, misses = sum(self._hits.values()), sum(self._misses.values())
+            return {
+                'version': self._version, 'entries': len(self._entries), 'evictions': self.evictions,
+                'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'views': views
+            }
@@ -0,0 +1,228 @@
+"""
+Historial de evaluaciones a partir de los reportes diarios en CSV.
+
+Los ficheros ``evaluaciones_diarias_AAAA-MM-DD.csv`` se indexan por su
+nombre, sin abrirlos, así que el coste de arrancar no depende de cuántos
+días haya; los días ya movidos a los archivos mensuales
+(``backend.report_retention``) se indexan por sus manifiestos y se leen
+descomprimiendo sólo su miembro. Cada día se lee sólo cuando se pide: por bloques, con tipos
+fijos (enteros pequeños, categorías) y sólo con las columnas necesarias.
+Los días leídos se guardan en una caché acotada que se invalida si el
+fichero cambia (el reporte de hoy sigue creciendo).
+"""
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+import pandas as pd
+
+from backend.patient_import import CONDITION_FIELDS
+from backend.persistence import CSV_FIELDS
+from backend.report_retention import MONTHLY_DIR, archived_days, read_archived_day
+
+_DAILY_CSV = re.compile(r"^evaluaciones_diarias_(\d{4}-\d{2}-\d{2})\.csv$")
+
+# Tipos de lectura: enteros con nulos, decimales, categorías y texto
+REPORT_DTYPES = {
+    'id_paciente': 'Int64', 'edad': 'Int16', 'presion_sistolica': 'Int16', 'presion_diastolica': 'Int16',
+    'frecuencia_cardiaca': 'Int16', 'saturacion_oxigeno': 'Int16', 'nivel_dolor': 'Int16',
+    'puntuacion_severidad': 'Int16', 'alertas_criticas': 'Int16', 'alertas_advertencia': 'Int16',
+    'numero_recomendaciones': 'Int16', 'temperatura': 'float64',
+    'nombre_paciente': 'category', 'habitacion': 'category', 'estado_movilidad': 'category',
+    'apetito': 'category', 'calidad_sueno': 'category', 'estado_animo': 'category',
+    'estado_cognitivo': 'category', 'continencia': 'category', 'evaluador': 'category',
+    'nivel_severidad': 'category', 'requiere_atencion_medica': 'category',
+    'fecha_evaluacion': 'string', 'hora_evaluacion': 'string', 'sintomas_observados': 'string',
+    'observaciones_adicionales': 'string'
+}
+
+# Columnas necesarias para reconstruir las evaluaciones de la aplicación
+EVALUATION_COLUMNS = (
+    'fecha_evaluacion', 'hora_evaluacion', 'id_paciente', 'nombre_paciente', 'edad', 'habitacion',
+    'presion_sistolica', 'presion_diastolica', 'frecuencia_cardiaca', 'temperatura', 'saturacion_oxigeno',
+    'nivel_dolor', 'estado_movilidad', 'apetito', 'calidad_sueno', 'estado_animo', 'estado_cognitivo',
+    'continencia', 'sintomas_observados', 'observaciones_adicionales', 'evaluador'
+)
+
+_VITAL_COLUMNS = (
+    ('systolic_bp', 'presion_sistolica'), ('diastolic_bp', 'presion_diastolica'),
+    ('heart_rate', 'frecuencia_cardiaca'), ('temperature', 'temperatura'),
+    ('oxygen_saturation', 'saturacion_oxigeno'), ('pain_level', 'nivel_dolor')
+)
+_STATUS_COLUMNS = (
+    ('mobility', 'estado_movilidad'), ('appetite', 'apetito'), ('sleep_quality', 'calidad_sueno'),
+    ('mood', 'estado_animo'), ('cognitive_status', 'estado_cognitivo'), ('continence', 'continencia')
+)
+
+
+def _value(value):
+    """Valor nativo de Python (None para los nulos de pandas)"""
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ReportHistory:
+    """Índice y lectura perezosa de los reportes diarios"""
+
+    def __init__(self, reports_dir: str = "data/reports", chunk_size: int = 5000, cache_days: int = 31):
+        self.reports_dir = reports_dir
+        self.chunk_size = chunk_size
+        self.cache_days = cache_days
+        self._lock = threading.Lock()
+        # Origen de cada día: (ruta del CSV, None) o (ruta del archivo mensual, entrada del manifiesto)
+        self._index: Optional[Dict[date, Tuple[str, Optional[Dict[str, Any]]]]] = None
+        self._cache: 'OrderedDict[Tuple[date, Tuple[str, ...]], Tuple[Any, pd.DataFrame]]' = OrderedDict()
+
+    # Índice
+
+    def index(self, refresh: bool = False) -> Dict[date, Tuple[str, Optional[Dict[str, Any]]]]:
+        """Origen del reporte de cada día, a partir de los nombres de fichero y los manifiestos mensuales"""
+        with self._lock:
+            if self._index is None or refresh:
+                index = {day: (path, member) for day, (path, member)
+                         in archived_days(os.path.join(self.reports_dir, MONTHLY_DIR), "evaluaciones_diarias").items()}
+                try:
+                    entries = list(os.scandir(self.reports_dir))
+                except FileNotFoundError:
+                    entries = []
+                for entry in entries:
+                    match = _DAILY_CSV.match(entry.name)
+                    if match:
+                        # Un CSV suelto prevalece: puede tener filas aún no archivadas
+                        index[date.fromisoformat(match.group(1))] = (entry.path, None)
+                self._index = dict(sorted(index.items()))
+            return self._index
+
+    def days(self, start: Optional[date] = None, end: Optional[date] = None) -> List[date]:
+        return [day for day in self.index() if (start is None or day >= start) and (end is None or day <= end)]
+
+    def recent_days(self, count: int) -> List[date]:
+        """Los ``count`` días más recientes con reporte"""
+        return list(self.index())[-count:] if count > 0 else []
+
+    def days_before(self, day: date, count: int) -> List[date]:
+        """Hasta ``count`` días con reporte anteriores a ``day`` (la página siguiente hacia atrás)"""
+        earlier = [other for other in self.index() if other < day]
+        return earlier[-count:] if count > 0 else []
+
+    # Lectura
+
+    def read_day(self, day: date, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Reporte de un día con tipos fijos y sólo las columnas pedidas"""
+        columns = tuple(columns) if columns else tuple(CSV_FIELDS)
+        key = (day, columns)
+        path, member = self.index().get(day, (None, None))
+        try:
+            modified = os.path.getmtime(path) if path else None
+        except FileNotFoundError:
+            modified = None
+        if modified is None:
+            return self._empty(columns)
+        if member is not None:
+            # El archivo mensual crece con otros días; la versión del día es su miembro
+            modified = (member['offset'], member['sha256'])
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == modified:
+                self._cache.move_to_end(key)
+                return cached[1]
+        source = io.BytesIO(read_archived_day(path, member)) if member is not None else path
+        frame = self._read_csv(source, columns)
+        with self._lock:
+            self._cache[key] = (modified, frame)
+            while len(self._cache) > self.cache_days:
+                self._cache.popitem(last=False)
+        return frame
+
+    @staticmethod
+    def _empty(columns: Tuple[str, ...]) -> pd.DataFrame:
+        return pd.DataFrame({column: pd.Series(dtype=REPORT_DTYPES.get(column, 'string')) for column in columns})
+
+    def _read_csv(self, source, columns: Tuple[str, ...]) -> pd.DataFrame:
+        wanted = set(columns)
+        chunks = pd.read_csv(
+            source, usecols=lambda column: column in wanted,
+            dtype={column: dtype for column, dtype in REPORT_DTYPES.items() if column in wanted},
+            keep_default_na=False, na_values=[''], chunksize=self.chunk_size, encoding='utf-8'
+        )
+        frame = pd.concat(list(chunks), ignore_index=True)
+        # Reportes antiguos sin alguna columna: se añade vacía para que todos los días coincidan
+        for column in columns:
+            if column not in frame:
+                frame[column] = pd.Series([pd.NA] * len(frame), dtype=REPORT_DTYPES.get(column, 'string'))
+        for column, dtype in REPORT_DTYPES.items():
+            # concat une categorías distintas como object; se vuelven a codificar
+            if column in frame and dtype == 'category' and frame[column].dtype != 'category':
+                frame[column] = frame[column].astype('category')
+        return frame[list(columns)]
+
+    def read_days(self, days: Iterable[date], columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        columns = tuple(columns) if columns else tuple(CSV_FIELDS)
+        frames = [self.read_day(day, columns) for day in days]
+        if not frames:
+            return self._empty(columns)
+        frame = pd.concat(frames, ignore_index=True)
+        for column in columns:
+            if REPORT_DTYPES.get(column) == 'category' and frame[column].dtype != 'category':
+                frame[column] = frame[column].astype('category')
+        return frame
+
+    # Reconstrucción de registros de la aplicación
+
+    @staticmethod
+    def to_evaluations(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Evaluaciones con el formato de la aplicación (sin ID ni análisis)"""
+        evaluations = []
+        for row in frame.to_dict('records'):
+            day, moment = _value(row['fecha_evaluacion']), _value(row['hora_evaluacion']) or "00:00:00"
+            vitals = {key: _value(row[column]) for key, column in _VITAL_COLUMNS}
+            if vitals['systolic_bp'] is not None and vitals['diastolic_bp'] is not None:
+                vitals['blood_pressure'] = f"{vitals['systolic_bp']}/{vitals['diastolic_bp']}"
+            symptoms = _value(row['sintomas_observados']) or 'Ninguno'
+            evaluations.append({
+                'patient_id': _value(row['id_paciente']),
+                'patient_name': _value(row['nombre_paciente']) or '',
+                'date': day,
+                'time': moment,
+                'vital_signs': vitals,
+                'general_status': {key: _value(row[column]) or '' for key, column in _STATUS_COLUMNS},
+                'symptoms': [] if symptoms == 'Ninguno' else symptoms.split(', '),
+                'observations': _value(row['observaciones_adicionales']) or '',
+                'evaluator': _value(row['evaluador']) or '',
+                'timestamp': f"{day}T{moment}"
+            })
+        return evaluations
+
+    @staticmethod
+    def to_patients(frame: pd.DataFrame) -> Dict[int, Dict[str, Any]]:
+        """
+        Pacientes mínimos (ID, nombre, edad y habitación de su último reporte);
+        el resto de campos toma los valores por defecto de la importación
+        """
+        patients = {}
+        for row in frame.dropna(subset=['id_paciente']).to_dict('records'):
+            patient_id = int(row['id_paciente'])
+            first_seen = patients.get(patient_id, {}).get('registered_date', _value(row['fecha_evaluacion']))
+            patients[patient_id] = {
+                'id': patient_id,
+                'name': _value(row['nombre_paciente']) or f"Residente {patient_id}",
+                'age': _value(row['edad']) or 0,
+                'gender': '',
+                'room': _value(row['habitacion']) or '',
+                'admission_date': first_seen,
+                'emergency_contact': '',
+                'risk_level': "Medio",
+                'cognitive_level': "Normal",
+                'allergies': '',
+                'medical_history': '',
+                'conditions': {condition: False for condition in CONDITION_FIELDS},
+                'medications': '',
+                'registered_date': first_seen,
+                'registered_time': "00:00:00"
+            }
+        return patients
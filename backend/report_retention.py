@@ -0,0 +1,253 @@
+"""
+Retención y compactación de los reportes diarios.
+
+Cada escritor deja un CSV por día en ``data/reports`` y el directorio no
+para de crecer. Un proceso en segundo plano agrupa los días cerrados
+anteriores a ``keep_daily_days`` en un archivo mensual por prefijo
+(``mensual/evaluaciones_diarias_AAAA-MM.csv.gz``) y borra los CSV
+originales sólo después de comprobar el archivo.
+
+El archivo mensual es una concatenación de miembros gzip, uno por día, y
+su manifiesto JSON guarda para cada día la posición y longitud del
+miembro, el número de filas y el sha256 del CSV original. Así se puede
+leer un único día sin descomprimir el mes (``read_archived_day``) y, como
+cualquier herramienta de gzip acepta miembros concatenados, descomprimir
+el fichero entero da los CSV del mes uno detrás de otro.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+_DAILY_FILE = re.compile(r"^(?P<prefix>[A-Za-z0-9_]+?)_(?P<day>\d{4}-\d{2}-\d{2})\.csv$")
+_MONTHLY_MANIFEST = re.compile(r"^(?P<prefix>[A-Za-z0-9_]+?)_(?P<month>\d{4}-\d{2})\.json$")
+
+MONTHLY_DIR = "mensual"
+
+
+def _count_rows(data: bytes) -> int:
+    """Filas de datos de un CSV (sin la cabecera), respetando saltos de línea entre comillas"""
+    return max(sum(1 for _ in csv.reader(io.StringIO(data.decode('utf-8-sig')))) - 1, 0)
+
+
+def monthly_paths(monthly_dir: str, prefix: str, month: str) -> Tuple[str, str]:
+    """Rutas del archivo mensual y de su manifiesto"""
+    base = os.path.join(monthly_dir, f"{prefix}_{month}")
+    return base + ".csv.gz", base + ".json"
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, encoding='utf-8') as manifest:
+            return json.load(manifest)
+    except FileNotFoundError:
+        return {'size': 0, 'days': {}}
+
+
+def archived_days(monthly_dir: str, prefix: str) -> Dict[date, Tuple[str, Dict[str, Any]]]:
+    """Días archivados de un prefijo como {día: (ruta del archivo, entrada del manifiesto)}"""
+    days = {}
+    try:
+        entries = list(os.scandir(monthly_dir))
+    except FileNotFoundError:
+        return days
+    for entry in entries:
+        match = _MONTHLY_MANIFEST.match(entry.name)
+        if not match or match.group('prefix') != prefix:
+            continue
+        archive_path, _ = monthly_paths(monthly_dir, prefix, match.group('month'))
+        for day, member in load_manifest(entry.path)['days'].items():
+            days[date.fromisoformat(day)] = (archive_path, member)
+    return days
+
+
+def read_archived_day(archive_path: str, member: Dict[str, Any]) -> bytes:
+    """CSV original de un día leyendo sólo su miembro del archivo mensual"""
+    with open(archive_path, 'rb') as archive:
+        archive.seek(member['offset'])
+        return gzip.decompress(archive.read(member['length']))
+
+
+class ReportRetention:
+    """
+    Política de retención de ``data/reports``.
+
+    - ``keep_daily_days``: días (contando hoy) que se conservan como CSV
+      sueltos; los anteriores se archivan por meses.
+    - ``keep_months``: meses de archivo que se conservan; los anteriores se
+      borran (``None`` conserva todo).
+    - ``prepare``: se llama antes de cada pasada (p. ej. para que el archivo
+      Parquet termine de compactar los días que se van a mover).
+    """
+
+    def __init__(self, reports_dir: str = "data/reports", keep_daily_days: int = 31,
+                 keep_months: Optional[int] = None, prepare: Optional[Callable[[], Any]] = None,
+                 today: Callable[[], date] = date.today):
+        self.reports_dir = reports_dir
+        self.monthly_dir = os.path.join(reports_dir, MONTHLY_DIR)
+        self.keep_daily_days = keep_daily_days
+        self.keep_months = keep_months
+        self.prepare = prepare
+        self._today = today
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    # Selección
+
+    def expired_daily_files(self) -> Dict[Tuple[str, str], List[Tuple[date, str]]]:
+        """CSV diarios fuera del periodo de retención, por (prefijo, mes)"""
+        cutoff = self._today() - timedelta(days=max(self.keep_daily_days, 1) - 1)
+        groups: Dict[Tuple[str, str], List[Tuple[date, str]]] = {}
+        for entry in os.scandir(self.reports_dir):
+            match = _DAILY_FILE.match(entry.name)
+            if not match or not entry.is_file():
+                continue
+            day = date.fromisoformat(match.group('day'))
+            if day < cutoff:
+                groups.setdefault((match.group('prefix'), day.strftime('%Y-%m')), []).append((day, entry.path))
+        return {key: sorted(files) for key, files in sorted(groups.items())}
+
+    def expired_months(self) -> List[Tuple[str, str]]:
+        """Archivos mensuales (archivo, manifiesto) más antiguos que ``keep_months``"""
+        if self.keep_months is None or not os.path.isdir(self.monthly_dir):
+            return []
+        today = self._today()
+        index = today.year * 12 + today.month - 1 - self.keep_months
+        oldest = f"{index // 12:04d}-{index % 12 + 1:02d}"
+        expired = []
+        for entry in os.scandir(self.monthly_dir):
+            match = _MONTHLY_MANIFEST.match(entry.name)
+            if match and match.group('month') < oldest:
+                expired.append(monthly_paths(self.monthly_dir, match.group('prefix'), match.group('month')))
+        return sorted(expired)
+
+    # Compactación
+
+    def archive_month(self, prefix: str, month: str, files: List[Tuple[date, str]]) -> Tuple[int, int]:
+        """
+        Añade los días al archivo mensual y borra los CSV comprobados.
+        Devuelve (días archivados, bytes liberados).
+        """
+        archive_path, manifest_path = monthly_paths(self.monthly_dir, prefix, month)
+        manifest = load_manifest(manifest_path)
+        removed_bytes = added_bytes = 0
+        archived, new_days = [], []
+        with open(archive_path, 'ab') as archive:
+            # Miembros escritos por una pasada interrumpida y no registrados en el manifiesto
+            archive.truncate(manifest['size'])
+            archive.seek(manifest['size'])
+            for day, path in files:
+                with open(path, 'rb') as daily:
+                    data = daily.read()
+                size = len(data)
+                previous = manifest['days'].get(day.isoformat())
+                if previous and previous['sha256'] == hashlib.sha256(data).hexdigest():
+                    # Ya archivado en una pasada anterior que no llegó a borrar el CSV
+                    archived.append((path, size))
+                    continue
+                if previous:
+                    # Filas tardías de un día ya archivado: se añaden a las archivadas (sin repetir cabecera)
+                    data = read_archived_day(archive_path, previous) + data.split(b'\n', 1)[-1]
+                digest = hashlib.sha256(data).hexdigest()
+                rows = _count_rows(data)
+                member = gzip.compress(data, compresslevel=9, mtime=0)
+                if gzip.decompress(member) != data:
+                    raise ValueError(f"Verificación fallida al comprimir {path}")
+                offset = archive.tell()
+                archive.write(member)
+                manifest['days'][day.isoformat()] = {
+                    'offset': offset, 'length': len(member), 'rows': rows, 'sha256': digest, 'bytes': len(data)
+                }
+                added_bytes += len(member)
+                archived.append((path, size))
+                new_days.append(day.isoformat())
+            archive.flush()
+            os.fsync(archive.fileno())
+            manifest['size'] = archive.tell()
+
+        # Se relee del disco cada miembro nuevo (suma y filas) antes de borrar nada
+        for day_key in new_days:
+            member = manifest['days'][day_key]
+            data = read_archived_day(archive_path, member)
+            if hashlib.sha256(data).hexdigest() != member['sha256'] or _count_rows(data) != member['rows']:
+                raise ValueError(f"El archivo {archive_path} no coincide con el día {day_key}")
+
+        temporary = manifest_path + ".tmp"
+        with open(temporary, 'w', encoding='utf-8') as output:
+            json.dump(manifest, output, indent=1, sort_keys=True)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temporary, manifest_path)
+
+        for path, size in archived:
+            os.remove(path)
+            removed_bytes += size
+        return len(archived), removed_bytes - added_bytes
+
+    def run(self) -> Dict[str, Any]:
+        """Una pasada completa de la política de retención"""
+        with self._lock:
+            start = time.perf_counter()
+            if self.prepare is not None:
+                try:
+                    self.prepare()
+                except Exception as e:
+                    print(f"❌ Error preparando la retención de reportes: {e}")
+            os.makedirs(self.monthly_dir, exist_ok=True)
+            lock_file = open(os.path.join(self.monthly_dir, ".lock"), 'w')
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            days = months = reclaimed = 0
+            errors = []
+            try:
+                for (prefix, month), files in self.expired_daily_files().items():
+                    try:
+                        archived, freed = self.archive_month(prefix, month, files)
+                    except (OSError, ValueError) as e:
+                        errors.append(str(e))
+                        continue
+                    days += archived
+                    reclaimed += freed
+                for archive_path, manifest_path in self.expired_months():
+                    for path in (archive_path, manifest_path):
+                        if os.path.exists(path):
+                            reclaimed += os.path.getsize(path)
+                            os.remove(path)
+                    months += 1
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                lock_file.close()
+            self.last_run = {'days_archived': days, 'months_removed': months, 'bytes_reclaimed': reclaimed,
+                             'seconds': time.perf_counter() - start, 'at': time.time(), 'errors': errors}
+            return self.last_run
+
+    def start(self, interval: float = 86400.0):
+        """Arranca la retención periódica en segundo plano"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,),
+                                            name="report-retention", daemon=True)
+            self._thread.start()
+
+    def _run(self, interval: float):
+        while True:
+            self.run()
+            if self._stop.wait(interval):
+                return
+
+    def stop(self):
+        self._stop.set()
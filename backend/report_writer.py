@@ -0,0 +1,145 @@
+import csv
+import io
+import os
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Any, Iterable
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+class ReportWriter:
+    """
+    Escritor del CSV diario de larga duración.
+
+    Mantiene abierto el fichero del día y acumula las filas en memoria; se
+    vuelcan cuando hay ``flush_rows`` pendientes o, como mucho,
+    ``flush_interval`` segundos después de la primera fila pendiente. Cada
+    volcado es una única escritura bajo un bloqueo consultivo (``flock``),
+    así que varios procesos pueden escribir en el mismo fichero sin
+    intercalar filas ni duplicar la cabecera. A medianoche se cierra el
+    fichero y las filas siguientes van al del nuevo día.
+    """
+
+    def __init__(self, directory: str = "data/reports", prefix: str = "evaluaciones_diarias",
+                 fieldnames: Optional[List[str]] = None, flush_rows: int = 50,
+                 flush_interval: float = 2.0, today: Callable[[], date] = date.today):
+        self.directory = directory
+        self.prefix = prefix
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._today = today
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._first_pending_at = None
+        self._day = None
+        self._file = None
+        self._closed = threading.Event()
+        self._flusher = None
+        self.rows_written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, day: date) -> str:
+        return os.path.join(self.directory, f"{self.prefix}_{day.strftime('%Y-%m-%d')}.csv")
+
+    @property
+    def path(self) -> str:
+        """Fichero del día en curso"""
+        return self.path_for(self._day or self._today())
+
+    # Escritura
+
+    def write(self, row: Dict[str, Any]) -> str:
+        """Añade una fila y devuelve la ruta del fichero del día al que pertenece"""
+        return self.write_many([row])
+
+    def write_many(self, rows: Iterable[Dict[str, Any]]) -> str:
+        """Añade varias filas al fichero del día"""
+        with self._lock:
+            today = self._today()
+            if today != self._day:
+                self._rollover_locked(today)
+            for row in rows:
+                if self.fieldnames is None:
+                    self.fieldnames = list(row.keys())
+                self._pending.append(row)
+            if self._first_pending_at is None and self._pending:
+                self._first_pending_at = time.monotonic()
+            if len(self._pending) >= self.flush_rows:
+                self._flush_locked()
+            else:
+                self._ensure_flusher()
+            return self.path_for(self._day)
+
+    def _rollover_locked(self, day: date):
+        """Vuelca lo pendiente en el fichero anterior y abre el del nuevo día"""
+        self._flush_locked()
+        if self._file is not None:
+            self._file.close()
+        self._day = day
+        self._file = open(self.path_for(day), 'a', newline='', encoding='utf-8')
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.fieldnames, extrasaction='ignore')
+        writer.writerows(self._pending)
+        fd = self._file.fileno()
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            # La cabecera se decide bajo el bloqueo: otro proceso puede haber creado ya el fichero
+            if os.fstat(fd).st_size == 0:
+                header = io.StringIO()
+                csv.DictWriter(header, fieldnames=self.fieldnames).writeheader()
+                self._file.write(header.getvalue())
+            self._file.write(buffer.getvalue())
+            self._file.flush()
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        self.rows_written += len(self._pending)
+        self._pending = []
+        self._first_pending_at = None
+
+    def flush(self):
+        """Vuelca inmediatamente las filas pendientes"""
+        with self._lock:
+            self._flush_locked()
+
+    def _ensure_flusher(self):
+        """Arranca el hilo que vuelca las filas que llevan demasiado tiempo pendientes"""
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="report-writer-flush",
+                                             daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval / 4):
+            with self._lock:
+                if (self._first_pending_at is not None and
+                        time.monotonic() - self._first_pending_at >= self.flush_interval):
+                    self._flush_locked()
+                # Cambio de día sin escrituras nuevas: se libera el fichero del día anterior
+                elif self._day is not None and self._today() != self._day and not self._pending:
+                    self._file.close()
+                    self._file, self._day = None, None
+
+    def close(self):
+        """Vuelca las filas pendientes y cierra el fichero (al salir de la aplicación)"""
+        self._closed.set()
+        with self._lock:
+            if self._file is not None:
+                self._flush_locked()
+                self._file.close()
+                self._file, self._day = None, None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
@@ -0,0 +1,401 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    room TEXT,
+    risk_level TEXT,
+    revision INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patients_revision ON patients (revision);
+
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    date TEXT NOT NULL,
+    severity TEXT,
+    data TEXT NOT NULL,
+    analysis TEXT,
+    revision INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_evaluations_patient_time ON evaluations (patient_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_evaluations_date ON evaluations (date);
+CREATE INDEX IF NOT EXISTS idx_evaluations_severity ON evaluations (severity);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0), ('generation', 0);
+"""
+
+# Cambios sobre bases de datos creadas con un esquema anterior
+_MIGRATIONS = (
+    ('evaluations', 'revision', "ALTER TABLE evaluations ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"),
+)
+_INDEXES = "CREATE INDEX IF NOT EXISTS idx_evaluations_revision ON evaluations (revision);"
+# Copia de los registros canónicos que guardaba el canal de persistencia: duplicaba ``evaluations``
+_DROPPED_TABLES = "DROP TABLE IF EXISTS evaluation_records;"
+
+# Sentencias constantes: sqlite3 las prepara una vez y las reutiliza desde su caché por conexión
+_INSERT_PATIENT = ("INSERT INTO patients (name, room, risk_level, revision, data) "
+                   "VALUES (?, ?, ?, ?, ?)")
+_UPDATE_PATIENT = "UPDATE patients SET name = ?, room = ?, risk_level = ?, revision = ?, data = ? WHERE id = ?"
+_NEXT_REVISION = "UPDATE meta SET value = value + 1 WHERE key = 'revision' RETURNING value"
+_SELECT_PATIENTS_SINCE = "SELECT id, revision, data FROM patients WHERE revision > ? ORDER BY revision"
+_SELECT_GENERATION = "SELECT value FROM meta WHERE key = 'generation'"
+_SELECT_REVISION = "SELECT value FROM meta WHERE key = 'revision'"
+_SELECT_PATIENT = "SELECT data FROM patients WHERE id = ?"
+_INSERT_EVALUATION = ("INSERT INTO evaluations (patient_id, timestamp, date, severity, data, analysis, revision) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?)")
+_RESTORE_PATIENT = ("INSERT INTO patients (id, name, room, risk_level, revision, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)")
+_RESTORE_EVALUATION = ("INSERT INTO evaluations (id, patient_id, timestamp, date, severity, data, analysis, "
+                       "revision) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+_UPDATE_EVALUATION = ("UPDATE evaluations SET patient_id = ?, timestamp = ?, date = ?, data = ?, revision = ? "
+                      "WHERE id = ?")
+_ATTACH_ANALYSIS = "UPDATE evaluations SET severity = ?, analysis = ?, revision = ? WHERE id = ?"
+_SELECT_EVALUATIONS_CHANGED = ("SELECT id, revision, data, analysis FROM evaluations "
+                               "WHERE revision > ? AND revision <= ? AND (revision > ? OR (revision = ? AND id > ?)) "
+                               "ORDER BY revision, id LIMIT ?")
+_SELECT_SEVERITIES_SINCE = ("SELECT id, revision, severity FROM evaluations "
+                            "WHERE revision > ? AND severity IS NOT NULL ORDER BY revision")
+_SELECT_EVALUATIONS_SINCE = "SELECT id, data FROM evaluations WHERE id > ? ORDER BY id LIMIT ?"
+
+
+def _dumps(record: Dict[str, Any]) -> str:
+    """JSON compacto del registro sin su ID (el ID vive en la columna de la tabla)"""
+    return json.dumps({key: value for key, value in record.items() if key != 'id'},
+                      ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def _loads(record_id: int, data: str) -> Dict[str, Any]:
+    return {'id': record_id, **json.loads(data)}
+
+
+def _with_id(record: Dict[str, Any], record_id: int) -> Dict[str, Any]:
+    """Copia del registro con el ID asignado como primer campo"""
+    return {'id': record_id, **{key: value for key, value in record.items() if key != 'id'}}
+
+
+class Repository:
+    """
+    Almacenamiento persistente de pacientes y evaluaciones en SQLite.
+
+    Usa el modo WAL para que varias sesiones de Streamlit lean mientras otra
+    escribe; cada hilo tiene su propia conexión y las escrituras se
+    serializan con ``BEGIN IMMEDIATE``. Los IDs son AUTOINCREMENT, por lo
+    que nunca se reutilizan aunque se borren datos.
+    """
+
+    def __init__(self, path: str = "data/geriatria.db"):
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        connection = self._connection()
+        connection.executescript(_SCHEMA)
+        for table, column, statement in _MIGRATIONS:
+            columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                connection.execute(statement)
+        connection.executescript(_INDEXES)
+        connection.executescript(_DROPPED_TABLES)
+
+    # Conexiones
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (se crea en el primer uso)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                         cached_statements=256)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=10000")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """Transacción de escritura; se confirma al salir o se deshace si hay error"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def close(self):
+        """Cierra la conexión del hilo actual"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    # Pacientes
+
+    @staticmethod
+    def _patient_row(patient: Dict[str, Any]) -> Tuple:
+        return patient.get('name', ''), patient.get('room', ''), patient.get('risk_level')
+
+    def add_patients(self, patients: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Da de alta varios pacientes en una única transacción.
+
+        Asigna el ID a cada paciente y devuelve los pacientes guardados.
+        """
+        saved = []
+        with self._transaction() as connection:
+            revision = connection.execute(_NEXT_REVISION).fetchone()[0]
+            for patient in patients:
+                cursor = connection.execute(_INSERT_PATIENT,
+                                            self._patient_row(patient) + (revision, _dumps(patient)))
+                saved.append(_with_id(patient, cursor.lastrowid))
+        return saved
+
+    def add_patient(self, patient: Dict[str, Any]) -> Dict[str, Any]:
+        """Da de alta un paciente y lo devuelve con su ID"""
+        return self.add_patients([patient])[0]
+
+    def update_patients(self, patients: Iterable[Dict[str, Any]]):
+        """Guarda los cambios de varios pacientes existentes en una transacción"""
+        with self._transaction() as connection:
+            revision = connection.execute(_NEXT_REVISION).fetchone()[0]
+            connection.executemany(_UPDATE_PATIENT, [
+                self._patient_row(patient) + (revision, _dumps(patient), patient['id'])
+                for patient in patients
+            ])
+
+    def update_patient(self, patient: Dict[str, Any]):
+        """Guarda los cambios de un paciente existente"""
+        self.update_patients([patient])
+
+    def get_patient(self, patient_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(_SELECT_PATIENT, (patient_id,)).fetchone()
+        return _loads(patient_id, row[0]) if row else None
+
+    def patients_since(self, revision: int = 0) -> Tuple[Dict[int, Dict[str, Any]], int]:
+        """
+        Pacientes creados o modificados después de una revisión.
+
+        Devuelve los pacientes por ID y la última revisión leída, de modo que
+        una sesión puede sincronizarse leyendo sólo los cambios.
+        """
+        rows = self._connection().execute(_SELECT_PATIENTS_SINCE, (revision,)).fetchall()
+        patients = {patient_id: _loads(patient_id, data) for patient_id, _, data in rows}
+        return patients, (rows[-1][1] if rows else revision)
+
+    def patients(self) -> Dict[int, Dict[str, Any]]:
+        return self.patients_since(0)[0]
+
+    # Evaluaciones
+
+    @staticmethod
+    def _evaluation_timestamp(evaluation: Dict[str, Any]) -> str:
+        return evaluation.get('timestamp') or f"{evaluation.get('date', '')}T{evaluation.get('time', '')}"
+
+    def add_evaluations(self, evaluations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Guarda varias evaluaciones en una transacción y las devuelve con su ID.
+
+        Si una evaluación trae su análisis en la clave ``analysis``, se guarda
+        como si se hubiera asociado con ``attach_analysis``.
+        """
+        saved = []
+        with self._transaction() as connection:
+            revision = connection.execute(_NEXT_REVISION).fetchone()[0]
+            for evaluation in evaluations:
+                analysis = evaluation.get('analysis')
+                record = {key: value for key, value in evaluation.items() if key != 'analysis'}
+                timestamp = self._evaluation_timestamp(record)
+                cursor = connection.execute(_INSERT_EVALUATION, (
+                    record['patient_id'], timestamp, record.get('date', timestamp[:10]),
+                    analysis.get('severity_level') if analysis else None,
+                    _dumps(record), _dumps(analysis) if analysis else None, revision
+                ))
+                saved.append(_with_id(record, cursor.lastrowid))
+        return saved
+
+    def add_evaluation(self, evaluation: Dict[str, Any]) -> Dict[str, Any]:
+        """Guarda una evaluación y la devuelve con el ID asignado"""
+        return self.add_evaluations([evaluation])[0]
+
+    def update_evaluations(self, evaluations: Iterable[Dict[str, Any]]):
+        """
+        Sustituye los datos de evaluaciones existentes (conserva su análisis).
+
+        Las sesiones sólo incorporan evaluaciones nuevas, así que también
+        aumenta la generación para que recarguen las modificadas.
+        """
+        rows = [
+            (evaluation['patient_id'], self._evaluation_timestamp(evaluation),
+             evaluation.get('date', self._evaluation_timestamp(evaluation)[:10]),
+             _dumps(evaluation), evaluation['id'])
+            for evaluation in evaluations
+        ]
+        if not rows:
+            return
+        with self._transaction() as connection:
+            revision = connection.execute(_NEXT_REVISION).fetchone()[0]
+            connection.executemany(_UPDATE_EVALUATION, [row[:4] + (revision, row[4]) for row in rows])
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+    def iter_evaluations(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Recorre todas las evaluaciones por lotes, sin cargarlas todas a la vez"""
+        last_id = 0
+        while True:
+            batch = self.evaluations_since(last_id, batch_size)
+            if not batch:
+                return
+            yield from batch
+            last_id = batch[-1]['id']
+
+    def attach_analysis(self, evaluation_id: int, analysis: Dict[str, Any]):
+        """Asocia el análisis (y su nivel de severidad) a una evaluación"""
+        self.attach_analyses([(evaluation_id, analysis)])
+
+    def attach_analyses(self, analyses: Iterable[Tuple[int, Dict[str, Any]]]):
+        """Asocia varios análisis, como pares (ID de evaluación, análisis), en una transacción"""
+        with self._transaction() as connection:
+            revision = connection.execute(_NEXT_REVISION).fetchone()[0]
+            connection.executemany(_ATTACH_ANALYSIS, [
+                (analysis.get('severity_level'), _dumps(analysis), revision, evaluation_id)
+                for evaluation_id, analysis in analyses
+            ])
+
+    def iter_changed_evaluations(self, since: int = 0, until: Optional[int] = None,
+                                 batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """
+        Evaluaciones creadas o modificadas entre dos revisiones (la primera
+        excluida), con su análisis en la clave ``analysis``, leídas por lotes
+        """
+        until = self.revision() if until is None else until
+        # Cursor de paginación: (revisión, ID) de la última fila leída
+        revision, last_id = since, 0
+        while True:
+            rows = self._connection().execute(_SELECT_EVALUATIONS_CHANGED,
+                                              (since, until, revision, revision, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for evaluation_id, _, data, analysis in rows:
+                evaluation = _loads(evaluation_id, data)
+                evaluation['analysis'] = json.loads(analysis) if analysis else None
+                yield evaluation
+            last_id, revision = rows[-1][0], rows[-1][1]
+
+    def severities_since(self, revision: int = -1) -> Tuple[Dict[int, str], int]:
+        """
+        Nivel de severidad de las evaluaciones analizadas o modificadas
+        después de una revisión, por ID, y la última revisión leída. Con el
+        valor por defecto incluye también las filas anteriores a la columna
+        ``revision`` (revisión 0).
+        """
+        rows = self._connection().execute(_SELECT_SEVERITIES_SINCE, (revision,)).fetchall()
+        return ({evaluation_id: severity for evaluation_id, _, severity in rows},
+                rows[-1][1] if rows else max(revision, 0))
+
+    def evaluations_since(self, evaluation_id: int = 0, limit: int = -1) -> List[Dict[str, Any]]:
+        """Evaluaciones con ID posterior al indicado, en orden de alta"""
+        rows = self._connection().execute(_SELECT_EVALUATIONS_SINCE, (evaluation_id, limit)).fetchall()
+        return [_loads(evaluation_id, data) for evaluation_id, data in rows]
+
+    def evaluations(self, patient_id: int = None, start: str = None, end: str = None,
+                    severity: str = None, limit: int = None,
+                    with_analysis: bool = False) -> List[Dict[str, Any]]:
+        """
+        Consulta de evaluaciones por paciente, intervalo de fechas (AAAA-MM-DD,
+        ambos inclusive) y severidad, apoyada en los índices de la tabla
+        """
+        conditions, parameters = [], []
+        if patient_id is not None:
+            conditions.append("patient_id = ?")
+            parameters.append(patient_id)
+        if start is not None:
+            conditions.append("date >= ?")
+            parameters.append(str(start))
+        if end is not None:
+            conditions.append("date <= ?")
+            parameters.append(str(end))
+        if severity is not None:
+            conditions.append("severity = ?")
+            parameters.append(severity)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "ORDER BY timestamp" if patient_id is not None else "ORDER BY id"
+        query = f"SELECT id, data, analysis FROM evaluations {where} {order} LIMIT ?"
+        parameters.append(limit if limit is not None else -1)
+        results = []
+        for evaluation_id, data, analysis in self._connection().execute(query, parameters):
+            evaluation = _loads(evaluation_id, data)
+            if with_analysis:
+                evaluation['analysis'] = json.loads(analysis) if analysis else None
+            results.append(evaluation)
+        return results
+
+    def is_empty(self) -> bool:
+        connection = self._connection()
+        return (connection.execute("SELECT 1 FROM patients LIMIT 1").fetchone() is None and
+                connection.execute("SELECT 1 FROM evaluations LIMIT 1").fetchone() is None)
+
+    def count_evaluations(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+
+    # Mantenimiento
+
+    def clear(self):
+        """
+        Borra todos los datos.
+
+        Los contadores AUTOINCREMENT se conservan, así que los nuevos IDs no
+        coinciden con los de datos borrados; la generación aumenta para que
+        las sesiones abiertas descarten lo que tenían cargado.
+        """
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM evaluations")
+            connection.execute("DELETE FROM patients")
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+    def restore(self, patients: Iterable[Dict[str, Any]], evaluations: Iterable[Dict[str, Any]]):
+        """
+        Sustituye todos los datos por los indicados conservando sus IDs.
+
+        Las evaluaciones pueden incluir su análisis en la clave ``analysis``.
+        Como ``clear``, aumenta la generación para que las sesiones recarguen.
+        """
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM evaluations")
+            connection.execute("DELETE FROM patients")
+            revision = connection.execute(_NEXT_REVISION).fetchone()[0]
+            connection.executemany(_RESTORE_PATIENT, [
+                (patient['id'],) + self._patient_row(patient) + (revision, _dumps(patient))
+                for patient in patients
+            ])
+            rows = []
+            for evaluation in evaluations:
+                analysis = evaluation.get('analysis')
+                record = {key: value for key, value in evaluation.items() if key != 'analysis'}
+                timestamp = self._evaluation_timestamp(record)
+                rows.append((record['id'], record['patient_id'], timestamp,
+                             record.get('date', timestamp[:10]),
+                             analysis.get('severity_level') if analysis else None,
+                             _dumps(record), _dumps(analysis) if analysis else None, revision))
+            connection.executemany(_RESTORE_EVALUATION, rows)
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+
+    def generation(self) -> int:
+        """Número de borrados completos y reescrituras de evaluaciones realizados"""
+        return self._connection().execute(_SELECT_GENERATION).fetchone()[0]
+
+    def revision(self) -> int:
+        """Última revisión asignada a un cambio de pacientes o evaluaciones"""
+        return self._connection().execute(_SELECT_REVISION).fetchone()[0]
@@ -0,0 +1,232 @@
+import math
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Iterable
+
+from backend.vitals import VITAL_FIELDS, extract_vitals, evaluation_timestamp
+
+# Ventanas por defecto para las tendencias de signos vitales
+DEFAULT_WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30)
+}
+
+_SECONDS_PER_DAY = 86400.0
+
+
+class RollingWindow:
+    """
+    Estadísticas de una ventana temporal deslizante con actualización O(1).
+
+    Mantiene media y varianza (Welford con inserción y retirada), mínimo y
+    máximo mediante colas monótonas y la pendiente de mínimos cuadrados a
+    partir de sumas acumuladas. Las observaciones deben llegar en orden
+    cronológico.
+    """
+
+    __slots__ = ('span', '_values', '_min', '_max', 'count', 'mean', '_m2',
+                 '_sum_t', '_sum_tt', '_sum_tx')
+
+    def __init__(self, span: timedelta):
+        self.span = span.total_seconds() / _SECONDS_PER_DAY
+        self._values = deque()
+        self._min = deque()
+        self._max = deque()
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._sum_t = 0.0
+        self._sum_tt = 0.0
+        self._sum_tx = 0.0
+
+    def push(self, t: float, value: float):
+        """Añade una observación (t en días) y retira las que salen de la ventana"""
+        self._values.append((t, value))
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self._sum_t += t
+        self._sum_tt += t * t
+        self._sum_tx += t * value
+
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((t, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((t, value))
+
+        self.evict(t)
+
+    def evict(self, now: float):
+        """Retira las observaciones anteriores al inicio de la ventana"""
+        cutoff = now - self.span
+        values = self._values
+        while values and values[0][0] < cutoff:
+            t, value = values.popleft()
+            self.count -= 1
+            if self.count == 0:
+                self.mean = 0.0
+                self._m2 = 0.0
+                self._sum_t = self._sum_tt = self._sum_tx = 0.0
+            else:
+                old_mean = self.mean
+                self.mean -= (value - old_mean) / self.count
+                self._m2 = max(0.0, self._m2 - (value - old_mean) * (value - self.mean))
+                self._sum_t -= t
+                self._sum_tt -= t * t
+                self._sum_tx -= t * value
+        while self._min and self._min[0][0] < cutoff:
+            self._min.popleft()
+        while self._max and self._max[0][0] < cutoff:
+            self._max.popleft()
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Varianza muestral de la ventana"""
+        if self.count < 2:
+            return None
+        return self._m2 / (self.count - 1)
+
+    @property
+    def minimum(self) -> Optional[float]:
+        return self._min[0][1] if self._min else None
+
+    @property
+    def maximum(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    @property
+    def slope(self) -> Optional[float]:
+        """Pendiente de la recta de regresión, en unidades por día"""
+        if self.count < 2:
+            return None
+        denominator = self.count * self._sum_tt - self._sum_t * self._sum_t
+        if abs(denominator) < 1e-12:
+            return None
+        sum_x = self.mean * self.count
+        return (self.count * self._sum_tx - self._sum_t * sum_x) / denominator
+
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Resumen de la ventana"""
+        variance = self.variance
+        return {
+            'count': self.count,
+            'mean': self.mean if self.count else None,
+            'variance': variance,
+            'std': math.sqrt(variance) if variance is not None else None,
+            'min': self.minimum,
+            'max': self.maximum,
+            'slope': self.slope
+        }
+
+
+class PatientRollingStats:
+    """Ventanas deslizantes de cada signo vital para un paciente"""
+
+    def __init__(self, origin: datetime, windows: Dict[str, timedelta]):
+        self.origin = origin
+        self.last_timestamp: Optional[datetime] = None
+        self.windows = {
+            vital: {name: RollingWindow(span) for name, span in windows.items()}
+            for vital in VITAL_FIELDS
+        }
+
+    def _days(self, timestamp: datetime) -> float:
+        return (timestamp - self.origin).total_seconds() / _SECONDS_PER_DAY
+
+    def add(self, timestamp: datetime, vitals: Dict[str, Optional[float]]) -> bool:
+        """Añade una observación; ignora las que llegan fuera de orden"""
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return False
+        t = self._days(timestamp)
+        for vital, value in vitals.items():
+            if value is None or vital not in self.windows:
+                continue
+            for window in self.windows[vital].values():
+                window.push(t, float(value))
+        self.last_timestamp = timestamp
+        return True
+
+    def advance(self, now: datetime):
+        """Retira de todas las ventanas las observaciones caducadas a fecha ``now``"""
+        t = self._days(now)
+        for windows in self.windows.values():
+            for window in windows.values():
+                window.evict(t)
+
+
+class RollingStatsRegistry:
+    """
+    Registro de estadísticas deslizantes por paciente.
+
+    Se actualiza incrementalmente con cada evaluación para que paneles y
+    prompts lean tendencias en tiempo constante, sin recorrer el historial.
+    """
+
+    def __init__(self, windows: Dict[str, timedelta] = None):
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self._patients: Dict[Any, PatientRollingStats] = {}
+
+    def add(self, evaluation: Dict[str, Any]) -> bool:
+        """Incorpora una evaluación a las ventanas de su paciente"""
+        patient_id = evaluation.get('patient_id')
+        timestamp = evaluation_timestamp(evaluation)
+        stats = self._patients.get(patient_id)
+        if stats is None:
+            stats = PatientRollingStats(timestamp, self.windows)
+            self._patients[patient_id] = stats
+        return stats.add(timestamp, extract_vitals(evaluation))
+
+    def bulk_add(self, evaluations: Iterable[Dict[str, Any]]) -> int:
+        """Carga un historial completo en orden cronológico"""
+        ordered = sorted(evaluations, key=evaluation_timestamp)
+        return sum(1 for evaluation in ordered if self.add(evaluation))
+
+    def get(self, patient_id, vital: str, window: str = '7d',
+            now: datetime = None) -> Optional[Dict[str, Optional[float]]]:
+        """Devuelve el resumen de un signo vital en una ventana"""
+        stats = self._patients.get(patient_id)
+        if stats is None:
+            return None
+        if now is not None:
+            stats.advance(now)
+        return stats.windows[vital][window].summary()
+
+    def patient_summary(self, patient_id, window: str = '7d',
+                        now: datetime = None) -> Dict[str, Dict[str, Optional[float]]]:
+        """Resumen de todos los signos vitales de un paciente en una ventana"""
+        stats = self._patients.get(patient_id)
+        if stats is None:
+            return {}
+        if now is not None:
+            stats.advance(now)
+        return {vital: windows[window].summary() for vital, windows in stats.windows.items()}
+
+    def trend_summary(self, patient_id, window: str = '7d') -> List[str]:
+        """Líneas de texto con la tendencia de cada signo vital, para prompts e informes"""
+        labels = {
+            'systolic_bp': ('Presión sistólica', 'mmHg'),
+            'diastolic_bp': ('Presión diastólica', 'mmHg'),
+            'heart_rate': ('Frecuencia cardíaca', 'lpm'),
+            'temperature': ('Temperatura', '°C'),
+            'oxygen_saturation': ('Saturación O₂', '%'),
+            'pain_level': ('Dolor', '/10')
+        }
+        lines = []
+        for vital, summary in self.patient_summary(patient_id, window).items():
+            if not summary['count']:
+                continue
+            label, unit = labels[vital]
+            line = (f"{label} ({window}, n={summary['count']}): media {summary['mean']:.1f}{unit}, "
+                    f"rango {summary['min']:g}-{summary['max']:g}")
+            if summary['slope'] is not None:
+                line += f", pendiente {summary['slope']:+.2f}/día"
+            lines.append(line)
+        return lines
+
+    def reset(self):
+        """Elimina todas las estadísticas"""
+        self._patients.clear()
@@ -0,0 +1,332 @@
+"""
+Almacén de pacientes y evaluaciones compartido por todas las sesiones.
+
+``st.session_state`` es propio de cada navegador, así que dos tabletas
+veían censos distintos. Este almacén vive una vez por proceso
+(``st.cache_resource``) y se alimenta del repositorio:
+
+- Las escrituras se serializan con un cerrojo y pasan primero por el
+  repositorio.
+- Los lectores reciben instantáneas inmutables sin bloquearse: el
+  diccionario de pacientes se copia en cada escritura (copy-on-write) y la
+  lista de evaluaciones sólo crece, de modo que una instantánea es la lista
+  compartida más la longitud que tenía al publicarse.
+- Cada cambio publicado incrementa ``version``, que las vistas pueden usar
+  como clave de caché.
+- Un índice por residente (posiciones de sus evaluaciones y la de la más
+  reciente) se mantiene al insertar, para no recorrer todas las
+  evaluaciones cada vez que se busca el historial de uno.
+- Los recuentos por día, severidad y evaluador
+  (``models.evaluation_counters``) también se actualizan al insertar y al
+  asociar análisis.
+"""
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Optional, Any, Iterable, Iterator, Mapping, Sequence
+
+from models.evaluation_counters import EvaluationCounters, evaluation_day
+
+
+def _moment(evaluation: Dict[str, Any]) -> str:
+    """Fecha y hora ISO de una evaluación, comparable como texto"""
+    return evaluation.get('timestamp') or f"{evaluation.get('date', '')}T{evaluation.get('time', '')}"
+
+
+class EvaluationView(Sequence):
+    """Vista de sólo lectura de los primeros ``length`` elementos de una lista que sólo crece"""
+
+    __slots__ = ('_items', '_length')
+
+    def __init__(self, items: List[Dict[str, Any]], length: int):
+        self._items = items
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._items[position] for position in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("índice de evaluación fuera de la instantánea")
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        items = self._items
+        for position in range(self._length):
+            yield items[position]
+
+    def __repr__(self) -> str:
+        return f"EvaluationView({self._length} evaluaciones)"
+
+
+@dataclass(frozen=True)
+class StoreSnapshot:
+    """
+    Estado publicado del almacén. Los registros se comparten entre
+    instantáneas y no deben modificarse: para cambiar un paciente se copia
+    y se guarda con ``SharedStore.update_patients``.
+    """
+    version: int
+    generation: int
+    patients: Mapping[int, Dict[str, Any]]
+    evaluations: EvaluationView
+    # Índice por residente: posiciones (crecientes) en la lista de evaluaciones
+    # y posición de la más reciente por fecha y hora
+    positions: Mapping[int, List[int]]
+    latest: Mapping[int, int]
+    counters: EvaluationCounters
+
+    def patient_evaluations(self, patient_id: int) -> List[Dict[str, Any]]:
+        """Evaluaciones de un residente en orden de registro"""
+        positions = self.positions.get(patient_id, ())
+        # Las listas de posiciones siguen creciendo después de publicar la instantánea
+        end = bisect_left(positions, len(self.evaluations))
+        return [self.evaluations[position] for position in positions[:end]]
+
+    def last_evaluation(self, patient_id: int) -> Optional[Dict[str, Any]]:
+        """Evaluación más reciente de un residente (None si no tiene)"""
+        position = self.latest.get(patient_id)
+        return None if position is None else self.evaluations[position]
+
+
+class SharedStore:
+    """Pacientes y evaluaciones del proceso, respaldados por el repositorio si lo hay"""
+
+    def __init__(self, repository=None):
+        self.repository = repository
+        self._lock = threading.Lock()
+        self._version = 0
+        self._generation = 0
+        self._patients: Dict[int, Dict[str, Any]] = {}
+        self._evaluations: List[Dict[str, Any]] = []
+        self._patients_revision = 0
+        self._positions: Dict[int, List[int]] = {}
+        self._latest: Dict[int, int] = {}
+        # Severidad de cada evaluación analizada (por ID) y revisión leída del repositorio
+        self._severities: Dict[int, str] = {}
+        self._severities_revision = 0
+        self._counters = EvaluationCounters()
+        self._snapshot: Optional[StoreSnapshot] = None
+        with self._lock:
+            if repository is not None:
+                self._reload_locked()
+            self._publish()
+
+    # Lectura
+
+    def snapshot(self) -> StoreSnapshot:
+        """Última instantánea publicada (no bloquea aunque haya una escritura en curso)"""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def _publish(self):
+        self._version += 1
+        self._snapshot = StoreSnapshot(
+            version=self._version,
+            generation=self._generation,
+            patients=MappingProxyType(self._patients),
+            evaluations=EvaluationView(self._evaluations, len(self._evaluations)),
+            positions=MappingProxyType(self._positions),
+            latest=MappingProxyType(self._latest),
+            counters=self._counters
+        )
+
+    # Índice por residente y contadores
+
+    def _reindex(self):
+        """Reconstruye el índice y los contadores tras sustituir la lista de evaluaciones"""
+        self._positions, self._latest = {}, {}
+        self._counters = EvaluationCounters()
+        self._index_from(0)
+
+    def _index_from(self, start: int):
+        """Añade al índice y a los contadores las evaluaciones desde la posición ``start``"""
+        evaluations = self._evaluations
+        latest = {}
+        for position in range(start, len(evaluations)):
+            analysis = evaluations[position].get('analysis')
+            if analysis and evaluations[position].get('id') is not None:
+                # Evaluaciones cargadas con su análisis (registro de eventos)
+                self._severities[evaluations[position]['id']] = analysis.get('severity_level')
+            patient_id = evaluations[position].get('patient_id')
+            if patient_id is None:
+                continue
+            # Las listas sólo crecen: las instantáneas publicadas las acotan por longitud
+            self._positions.setdefault(patient_id, []).append(position)
+            current = latest.get(patient_id, self._latest.get(patient_id))
+            if current is None or _moment(evaluations[position]) >= _moment(evaluations[current]):
+                latest[patient_id] = position
+        if latest:
+            # El puntero a la última se copia al escribir, como los pacientes
+            self._latest = {**self._latest, **latest}
+        if start < len(evaluations):
+            self._counters = self._counters.add(
+                evaluations[start:], lambda evaluation: self._severities.get(evaluation.get('id')))
+
+    def _find(self, evaluation_id: int) -> Optional[Dict[str, Any]]:
+        """Evaluación por ID (la lista está en orden de ID)"""
+        position = bisect_left(self._evaluations, evaluation_id, key=lambda evaluation: evaluation['id'])
+        if position < len(self._evaluations) and self._evaluations[position]['id'] == evaluation_id:
+            return self._evaluations[position]
+        return None
+
+    def _set_severities(self, severities: Mapping[int, Optional[str]]):
+        """Registra la severidad de evaluaciones y mueve sus recuentos"""
+        changes = []
+        for evaluation_id, severity in severities.items():
+            previous = self._severities.get(evaluation_id)
+            self._severities[evaluation_id] = severity
+            evaluation = self._find(evaluation_id)
+            # Si la evaluación aún no se ha cargado, se contará con su severidad al llegar
+            if evaluation is not None:
+                changes.append((evaluation_day(evaluation), previous, severity))
+        self._counters = self._counters.reclassify(changes)
+
+    # Sincronización con el repositorio
+
+    def _reload_locked(self):
+        self._generation = self.repository.generation()
+        self._patients, self._patients_revision = self.repository.patients_since(0)
+        self._evaluations = list(self.repository.iter_evaluations())
+        self._severities, self._severities_revision = self.repository.severities_since()
+        self._reindex()
+
+    def reload(self):
+        """Vuelve a cargar todo desde el repositorio (tras restauraciones que modifican registros)"""
+        if self.repository is None:
+            return
+        with self._lock:
+            self._reload_locked()
+            self._publish()
+
+    def refresh(self) -> bool:
+        """
+        Incorpora lo que otros procesos hayan guardado en el repositorio:
+        pacientes por revisión y evaluaciones por ID. Devuelve si hubo cambios.
+        """
+        if self.repository is None:
+            return False
+        with self._lock:
+            if self.repository.generation() != self._generation:
+                self._reload_locked()
+                self._publish()
+                return True
+            revision, count = self._patients_revision, len(self._evaluations)
+            severities_revision = self._severities_revision
+            self._catch_up_patients()
+            self._catch_up_evaluations()
+            self._catch_up_severities()
+            if (revision == self._patients_revision and count == len(self._evaluations)
+                    and severities_revision == self._severities_revision):
+                return False
+            self._publish()
+            return True
+
+    def load(self, patients: Iterable[Dict[str, Any]], evaluations: Iterable[Dict[str, Any]]):
+        """Sustituye el contenido en memoria (sin repositorio, p. ej. desde el registro de eventos)"""
+        with self._lock:
+            self._generation += 1
+            self._patients = {patient['id']: patient for patient in patients}
+            self._evaluations = list(evaluations)
+            self._severities = {}
+            self._reindex()
+            self._publish()
+
+    # Escritura
+
+    def add_patients(self, patients: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Da de alta pacientes, les asigna ID y los devuelve"""
+        with self._lock:
+            if self.repository is not None:
+                saved = self.repository.add_patients(patients)
+                self._catch_up_patients()
+            else:
+                next_id = max(self._patients, default=0) + 1
+                saved = [{'id': next_id + offset, **{k: v for k, v in patient.items() if k != 'id'}}
+                         for offset, patient in enumerate(patients)]
+                self._patients = {**self._patients, **{patient['id']: patient for patient in saved}}
+            self._publish()
+        return saved
+
+    def update_patients(self, patients: Iterable[Dict[str, Any]]):
+        """Guarda los cambios de pacientes registrados (copias, nunca los de una instantánea)"""
+        patients = list(patients)
+        with self._lock:
+            if self.repository is not None:
+                self.repository.update_patients(patients)
+                self._catch_up_patients()
+            else:
+                self._patients = {**self._patients, **{patient['id']: patient for patient in patients}}
+            self._publish()
+
+    def add_evaluations(self, evaluations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Guarda evaluaciones, les asigna ID y las devuelve"""
+        with self._lock:
+            if self.repository is not None:
+                saved = self.repository.add_evaluations(evaluations)
+                self._catch_up_evaluations()
+            else:
+                next_id = (self._evaluations[-1]['id'] + 1) if self._evaluations else 1
+                saved = [{'id': next_id + offset, **evaluation} for offset, evaluation in enumerate(evaluations)]
+                start = len(self._evaluations)
+                self._evaluations.extend(saved)
+                self._index_from(start)
+            self._publish()
+        return saved
+
+    # Tras escribir se relee lo guardado desde el último cursor: incluye lo propio y lo que
+    # otros procesos hayan escrito entretanto, en el orden del repositorio
+
+    def _catch_up_patients(self):
+        patients, self._patients_revision = self.repository.patients_since(self._patients_revision)
+        if patients:
+            self._patients = {**self._patients, **patients}
+
+    def _catch_up_evaluations(self):
+        last_id = self._evaluations[-1]['id'] if self._evaluations else 0
+        start = len(self._evaluations)
+        self._evaluations.extend(self.repository.evaluations_since(last_id))
+        self._index_from(start)
+
+    def _catch_up_severities(self):
+        severities, self._severities_revision = self.repository.severities_since(self._severities_revision)
+        if severities:
+            self._set_severities(severities)
+
+    def attach_analysis(self, evaluation_id: int, analysis: Dict[str, Any]):
+        """Asocia un análisis a una evaluación guardada"""
+        with self._lock:
+            if self.repository is not None:
+                self.repository.attach_analysis(evaluation_id, analysis)
+                self._catch_up_severities()
+            else:
+                self._set_severities({evaluation_id: analysis.get('severity_level')})
+            self._publish()
+
+    def clear(self):
+        """Borra todos los datos; las instantáneas anteriores conservan los suyos"""
+        with self._lock:
+            if self.repository is not None:
+                self.repository.clear()
+                self._generation = self.repository.generation()
+                self._patients_revision = self._severities_revision = self.repository.revision()
+            else:
+                self._generation += 1
+            self._patients = {}
+            self._evaluations = []
+            self._severities = {}
+            self._reindex()
+            self._publish()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {'version': snapshot.version, 'generation': snapshot.generation,
+                'patients': len(snapshot.patients), 'evaluations': len(snapshot.evaluations)}
@@ -0,0 +1,234 @@
+"""
+Series temporales de signos vitales por residente en ficheros binarios.
+
+Cada residente tiene un fichero de registros de ancho fijo (instante más
+los seis signos vitales, 32 bytes) que se lee con ``numpy.memmap``: añadir
+es escribir 32 bytes al final, y consultar un intervalo es una búsqueda
+binaria sobre los instantes seguida de un corte sin copia, de modo que un
+historial de años se grafica sin cargarlo entero en memoria.
+
+Varios procesos pueden escribir a la vez: cada escritura se hace bajo un
+bloqueo consultivo (``flock``) sobre el fichero ``.lock`` del directorio y
+el fichero del residente se abre una vez tomado, de modo que nadie añade
+a un fichero que otro acaba de sustituir al reordenarlo. Quien lee sigue
+con su mapeo hasta que el fichero crece y se vuelve a mapear.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time
+from typing import Dict, List, Optional, Any, Iterable, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+from backend.vitals import VITAL_FIELDS, extract_vitals, evaluation_timestamp
+
+VITAL_RECORD = np.dtype([('timestamp', 'M8[us]')] + [(name, '<f4') for name in VITAL_FIELDS])
+
+# Columnas del registro canónico (backend.persistence) con cada signo vital
+_RECORD_VITALS = {
+    'systolic_bp': 'presion_sistolica',
+    'diastolic_bp': 'presion_diastolica',
+    'heart_rate': 'frecuencia_cardiaca',
+    'temperature': 'temperatura',
+    'oxygen_saturation': 'saturacion_oxigeno',
+    'pain_level': 'nivel_dolor'
+}
+
+TimeBound = Union[date, datetime, str, None]
+
+
+def _bound(value: TimeBound, end: bool = False) -> Optional[np.datetime64]:
+    """Límite de un intervalo; una fecha sin hora incluye el día completo si es el final"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value) if 'T' in value or ' ' in value else date.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, dt_time.max if end else dt_time.min)
+    return np.datetime64(value, 'us')
+
+
+def _first_per_instant(records: np.ndarray) -> np.ndarray:
+    """Primera lectura de cada instante de unos registros ordenados"""
+    timestamps = records['timestamp']
+    if len(timestamps) < 2:
+        return records
+    keep = np.ones(len(records), dtype=bool)
+    keep[1:] = timestamps[1:] != timestamps[:-1]
+    return records if keep.all() else records[keep]
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class VitalStore:
+    """Almacén de series de signos vitales, un fichero ``.vit`` por residente"""
+
+    def __init__(self, directory: str = "data/vitals"):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._maps: Dict[Any, np.memmap] = {}
+        self._lock_file = None
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _file_lock(self):
+        """Bloqueo de escritura entre procesos (requiere ``self._lock``)"""
+        if not fcntl:
+            yield
+            return
+        if self._lock_file is None:
+            self._lock_file = open(os.path.join(self.directory, ".lock"), 'a')
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def path(self, patient_id) -> str:
+        return os.path.join(self.directory, f"paciente_{patient_id}.vit")
+
+    def patient_ids(self) -> List[int]:
+        ids = []
+        for name in os.listdir(self.directory):
+            if name.startswith("paciente_") and name.endswith(".vit"):
+                try:
+                    ids.append(int(name[len("paciente_"):-len(".vit")]))
+                except ValueError:
+                    continue
+        return sorted(ids)
+
+    # Escritura
+
+    @staticmethod
+    def record_from_evaluation(evaluation: Dict[str, Any]) -> np.ndarray:
+        record = np.zeros(1, dtype=VITAL_RECORD)
+        # Resolución de segundos, como la hora del registro canónico
+        record['timestamp'] = np.datetime64(evaluation_timestamp(evaluation).replace(microsecond=0), 'us')
+        for name, value in extract_vitals(evaluation).items():
+            record[name] = np.nan if value is None else value
+        return record
+
+    @staticmethod
+    def record_from_canonical(record: Dict[str, Any]) -> np.ndarray:
+        """Registro binario a partir del registro canónico del canal de persistencia"""
+        row = np.zeros(1, dtype=VITAL_RECORD)
+        row['timestamp'] = np.datetime64(
+            datetime.fromisoformat(f"{record['fecha_evaluacion']}T{record['hora_evaluacion']}"), 'us')
+        for name, column in _RECORD_VITALS.items():
+            row[name] = _number(record.get(column))
+        return row
+
+    def append(self, patient_id, evaluation: Dict[str, Any]):
+        """Añade la lectura de una evaluación al historial del residente"""
+        self.append_records(patient_id, self.record_from_evaluation(evaluation))
+
+    def append_records(self, patient_id, records: np.ndarray):
+        """
+        Añade registros al final del fichero del residente.
+
+        Si llegan en orden cronológico es una única escritura de 32 bytes
+        por registro; una lectura atrasada obliga a reordenar el fichero.
+        Hay una lectura por instante: la que ya estaba guardada se conserva
+        (la reconstrucción y el canal de persistencia pueden escribir la misma).
+        """
+        records = _first_per_instant(np.sort(np.asarray(records, dtype=VITAL_RECORD),
+                                             order='timestamp', kind='stable'))
+        if not len(records):
+            return
+        path = self.path(patient_id)
+        with self._lock, self._file_lock():
+            with open(path, 'ab') as vital_file:
+                size = os.fstat(vital_file.fileno()).st_size
+                count = size // VITAL_RECORD.itemsize
+                if size != count * VITAL_RECORD.itemsize:
+                    # Registro final incompleto de una escritura interrumpida
+                    vital_file.truncate(count * VITAL_RECORD.itemsize)
+                last = self._last_record(path, count)
+                if last is None or records['timestamp'][0] > last['timestamp']:
+                    vital_file.write(records.tobytes())
+                    vital_file.flush()
+                else:
+                    self._rewrite_sorted(path, count, records)
+            self._maps.pop(patient_id, None)
+
+    @staticmethod
+    def _last_record(path: str, count: int) -> Optional[np.void]:
+        if not count:
+            return None
+        return np.fromfile(path, dtype=VITAL_RECORD, count=1, offset=(count - 1) * VITAL_RECORD.itemsize)[0]
+
+    @staticmethod
+    def _rewrite_sorted(path: str, count: int, records: np.ndarray):
+        """Funde lecturas atrasadas con las guardadas (con el bloqueo de escritura tomado)"""
+        existing = np.fromfile(path, dtype=VITAL_RECORD, count=count)
+        merged = np.concatenate([existing, records])
+        # Orden estable: ante el mismo instante queda primero la lectura ya guardada
+        merged = _first_per_instant(merged[np.argsort(merged['timestamp'], kind='stable')])
+        if merged.tobytes() == existing.tobytes():
+            return
+        temporary = path + ".tmp"
+        merged.tofile(temporary)
+        os.replace(temporary, path)
+
+    def append_evaluations(self, evaluations: Iterable[Dict[str, Any]]):
+        """Añade varias evaluaciones agrupándolas por residente"""
+        by_patient: Dict[Any, List[np.ndarray]] = {}
+        for evaluation in evaluations:
+            by_patient.setdefault(evaluation['patient_id'], []).append(self.record_from_evaluation(evaluation))
+        for patient_id, records in by_patient.items():
+            self.append_records(patient_id, np.concatenate(records))
+
+    def rebuild(self, evaluations: Iterable[Dict[str, Any]]):
+        """Reconstruye todos los historiales a partir de las evaluaciones"""
+        with self._lock, self._file_lock():
+            for patient_id in self.patient_ids():
+                os.remove(self.path(patient_id))
+            self._maps.clear()
+        self.append_evaluations(evaluations)
+
+    # Lectura
+
+    def series(self, patient_id) -> np.ndarray:
+        """
+        Historial completo del residente como vista de sólo lectura sobre el
+        fichero (``memmap``); se vuelve a mapear si otro proceso lo ha ampliado
+        """
+        path = self.path(patient_id)
+        try:
+            count = os.path.getsize(path) // VITAL_RECORD.itemsize
+        except OSError:
+            return np.zeros(0, dtype=VITAL_RECORD)
+        if not count:
+            return np.zeros(0, dtype=VITAL_RECORD)
+        mapped = self._maps.get(patient_id)
+        if mapped is None or len(mapped) != count:
+            mapped = np.memmap(path, dtype=VITAL_RECORD, mode='r', shape=(count,))
+            self._maps[patient_id] = mapped
+        return mapped
+
+    def range(self, patient_id, start: TimeBound = None, end: TimeBound = None) -> np.ndarray:
+        """Lecturas entre dos instantes (ambos inclusive), como corte sin copia"""
+        series = self.series(patient_id)
+        timestamps = series['timestamp']
+        first = 0 if start is None else int(np.searchsorted(timestamps, _bound(start), side='left'))
+        last = len(series) if end is None else int(np.searchsorted(timestamps, _bound(end, end=True),
+                                                                   side='right'))
+        return series[first:last]
+
+    def count(self, patient_id) -> int:
+        return len(self.series(patient_id))
+
+    def last(self, patient_id) -> Optional[np.void]:
+        series = self.series(patient_id)
+        return series[-1] if len(series) else None
@@ -0,0 +1,90 @@
+from datetime import datetime, date, time
+from typing import Dict, Optional, Any
+
+# Signos vitales numéricos que se registran en cada evaluación
+VITAL_FIELDS = (
+    'systolic_bp', 'diastolic_bp', 'heart_rate',
+    'temperature', 'oxygen_saturation', 'pain_level'
+)
+
+
+def _to_number(value) -> Optional[float]:
+    """Convierte un valor a número o devuelve None si no es interpretable"""
+    if value is None or value == '' or value == 'N/A':
+        return None
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_vitals(evaluation: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """
+    Extrae los signos vitales numéricos de una evaluación.
+
+    Admite tanto el formato de la aplicación (``vital_signs`` con
+    ``systolic_bp``/``diastolic_bp`` y dolor en signos vitales) como el del
+    modelo ``Assessment`` (``blood_pressure`` "120/80" y dolor en
+    ``general_status``).
+    """
+    data = evaluation
+    if 'vital_signs' not in evaluation and isinstance(evaluation.get('data'), dict):
+        data = evaluation['data']
+    vitals = data.get('vital_signs', {}) or {}
+    general = data.get('general_status', {}) or {}
+
+    systolic = _to_number(vitals.get('systolic_bp'))
+    diastolic = _to_number(vitals.get('diastolic_bp'))
+    if systolic is None or diastolic is None:
+        bp = vitals.get('blood_pressure', '')
+        if isinstance(bp, str) and '/' in bp:
+            sys_part, dia_part = bp.split('/', 1)
+            if systolic is None:
+                systolic = _to_number(sys_part)
+            if diastolic is None:
+                diastolic = _to_number(dia_part)
+
+    pain = _to_number(vitals.get('pain_level'))
+    if pain is None:
+        pain = _to_number(general.get('pain_level'))
+
+    return {
+        'systolic_bp': systolic,
+        'diastolic_bp': diastolic,
+        'heart_rate': _to_number(vitals.get('heart_rate')),
+        'temperature': _to_number(vitals.get('temperature')),
+        'oxygen_saturation': _to_number(vitals.get('oxygen_saturation')),
+        'pain_level': pain
+    }
+
+
+def evaluation_timestamp(evaluation: Dict[str, Any]) -> datetime:
+    """
+    Devuelve el instante de una evaluación.
+
+    Usa ``timestamp`` (ISO) si existe y, en su defecto, combina ``date`` y
+    ``time``. Si no hay fecha válida se asume el momento actual.
+    """
+    timestamp = evaluation.get('timestamp')
+    if isinstance(timestamp, datetime):
+        return timestamp
+    if timestamp:
+        try:
+            return datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            pass
+
+    eval_date = evaluation.get('date')
+    eval_time = evaluation.get('time') or '00:00:00'
+    try:
+        if not isinstance(eval_date, date):
+            eval_date = date.fromisoformat(eval_date)
+        if not isinstance(eval_time, time):
+            eval_time = time.fromisoformat(eval_time)
+        return datetime.combine(eval_date, eval_time)
+    except (TypeError, ValueError):
+        return datetime.now()
@@ -0,0 +1,3 @@
+"""
+Pruebas de rendimiento del sistema geriátrico
+"""
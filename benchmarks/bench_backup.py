@@ -0,0 +1,72 @@
+"""
+Coste de la copia de seguridad: exportación anterior (documento JSON
+completo en memoria) frente a la copia comprimida en streaming de
+``BackupManager``, completa e incremental tras un día de evaluaciones.
+
+Uso: python -m benchmarks.bench_backup [pacientes] [evaluaciones por paciente]
+"""
+import json
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+from backend.backup_export import BackupManager
+from backend.repository import Repository
+from benchmarks.sample_data import make_patients, make_evaluations
+
+
+def _measure(function):
+    """Resultado, tiempo y pico de memoria (medido en una segunda ejecución: tracemalloc ralentiza)"""
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(patient_count: int = 200, per_patient: int = 300):
+    directory = tempfile.mkdtemp(prefix="bench_backup_")
+    try:
+        repository = Repository(f"{directory}/geriatria.db")
+        patients = repository.add_patients(
+            {key: value for key, value in patient.items() if key != 'id'}
+            for patient in make_patients(patient_count).values())
+        by_id = {patient['id']: patient for patient in patients}
+        evaluations = [{key: value for key, value in evaluation.items() if key != 'id'}
+                       for evaluation in make_evaluations(by_id, per_patient)]
+        repository.add_evaluations(evaluations)
+        manager = BackupManager(repository, f"{directory}/backups")
+        print(f"Pacientes: {patient_count:,} | evaluaciones: {len(evaluations):,} | "
+              f"compresión: {manager.compression}")
+        print(f"{'Método':<28}{'segundos':>10}{'MB':>10}{'pico MB':>10}")
+
+        def export_previous():
+            return json.dumps({'patients': repository.patients(), 'evaluations': repository.evaluations(),
+                               'export_date': str(date.today())}, ensure_ascii=False, indent=2)
+
+        document, elapsed, peak = _measure(export_previous)
+        print(f"{'exportación anterior':<28}{elapsed:>10.2f}{len(document.encode()) / 1e6:>10.1f}{peak / 1e6:>10.1f}")
+        del document
+
+        backup, elapsed, peak = _measure(manager.create)
+        print(f"{'copia completa':<28}{elapsed:>10.2f}{backup['bytes'] / 1e6:>10.1f}{peak / 1e6:>10.1f}")
+
+        # Un día más de evaluaciones y sus análisis
+        new = repository.add_evaluations(evaluations[-patient_count * 3:])
+        repository.attach_analyses((evaluation['id'], {'severity_level': 'Bajo'}) for evaluation in new)
+        start = time.perf_counter()
+        backup = manager.create(incremental=True)
+        elapsed = time.perf_counter() - start
+        print(f"{'copia incremental (1 día)':<28}{elapsed:>10.2f}{backup['bytes'] / 1e6:>10.2f}{'-':>10}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
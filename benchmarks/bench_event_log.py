@@ -0,0 +1,75 @@
+"""
+Arranque desde el registro de eventos: tiempo de reconstruir un año de
+historial a partir de la instantánea y de la cola de eventos, frente a
+reproducir el registro completo.
+
+Uso: python -m benchmarks.bench_event_log [pacientes] [días]
+"""
+import shutil
+import sys
+import tempfile
+import time
+
+from backend import event_log as events
+from backend.event_log import EventLog
+from benchmarks.sample_data import make_patients, make_evaluations
+
+
+def _analysis(evaluation):
+    return {'severity_level': 'BAJO', 'alerts': [], 'recommendations': ['Continuar cuidados habituales'],
+            'requires_immediate_attention': False}
+
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main(patient_count: int = 100, days: int = 365):
+    patients = make_patients(patient_count)
+    evaluations = make_evaluations(patients, days)
+    directory = tempfile.mkdtemp(prefix="bench_event_log_")
+    try:
+        event_log = EventLog(directory, snapshot_every=10**9)
+        for patient in patients.values():
+            event_log.append(events.PATIENT_REGISTERED, patient)
+        _, write_time = _timed(lambda: [
+            event_log.append_many([(events.EVALUATION_CREATED, evaluation),
+                                   (events.ANALYSIS_ATTACHED, {'evaluation_id': evaluation['id'],
+                                                               'analysis': _analysis(evaluation)})])
+            for evaluation in evaluations
+        ])
+        event_log.sync()
+        total = event_log.last_seq
+        print(f"Eventos: {total:,} ({len(evaluations):,} evaluaciones) | "
+              f"escritura: {total / write_time:,.0f} eventos/s")
+
+        state, replay_time = _timed(event_log.state)
+        print(f"Reproducción completa del registro: {replay_time:.2f} s")
+
+        _, snapshot_time = _timed(event_log.snapshot)
+        print(f"Creación de la instantánea: {snapshot_time:.2f} s")
+        for evaluation in evaluations[-200:]:
+            event_log.append(events.ANALYSIS_ATTACHED, {'evaluation_id': evaluation['id'],
+                                                        'analysis': _analysis(evaluation)})
+        event_log.close()
+
+        def restart():
+            restarted = EventLog(directory)
+            try:
+                return restarted.state()
+            finally:
+                restarted.close()
+
+        restored, restart_time = _timed(restart)
+        print(f"Arranque (instantánea + {200} eventos de cola): {restart_time:.2f} s")
+        ok = (len(restored.patients) == len(state.patients) and
+              len(restored.evaluations) == len(state.evaluations))
+        print(f"Estado restaurado idéntico: {'sí' if ok else 'NO'}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
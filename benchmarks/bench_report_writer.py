@@ -0,0 +1,92 @@
+"""
+Rendimiento del CSV diario con varios procesos escribiendo a la vez:
+apertura del fichero por fila (método anterior) frente a ``ReportWriter``.
+
+Uso: python -m benchmarks.bench_report_writer [procesos] [filas por proceso]
+"""
+import csv
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+
+from backend.report_writer import ReportWriter
+from benchmarks.sample_data import make_patients, make_evaluations
+
+_DAY = date(2025, 1, 1)
+
+
+def _rows(count: int, seed: int):
+    patients = make_patients(50, seed=seed)
+    evaluations = make_evaluations(patients, -(-count // len(patients)), start=_DAY, seed=seed)[:count]
+    return [{
+        'fecha_evaluacion': e['date'], 'hora_evaluacion': e['time'], 'id_paciente': e['patient_id'],
+        'nombre_paciente': e['patient_name'], 'frecuencia_cardiaca': e['vital_signs']['heart_rate'],
+        'temperatura': e['vital_signs']['temperature'], 'estado_movilidad': e['general_status']['mobility'],
+        'sintomas_observados': ', '.join(e['symptoms']) or 'Ninguno', 'observaciones_adicionales': e['observations'],
+        'evaluador': e['evaluator']
+    } for e in evaluations]
+
+
+def _write_per_row(directory: str, rows):
+    """Método anterior: abrir, comprobar, escribir y cerrar por cada fila"""
+    path = os.path.join(directory, f"evaluaciones_diarias_{_DAY}.csv")
+    for row in rows:
+        file_exists = os.path.exists(path)
+        with open(path, 'a', newline='', encoding='utf-8') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=list(row.keys()))
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow(row)
+
+
+def _write_buffered(directory: str, rows):
+    writer = ReportWriter(directory=directory, today=lambda: _DAY)
+    for row in rows:
+        writer.write(row)
+    writer.close()
+
+
+def _worker(method, directory, count, seed, barrier):
+    rows = _rows(count, seed)
+    barrier.wait()
+    method(directory, rows)
+
+
+def _run(method, processes: int, count: int):
+    directory = tempfile.mkdtemp(prefix="bench_report_writer_")
+    try:
+        barrier = multiprocessing.Barrier(processes + 1)
+        workers = [multiprocessing.Process(target=_worker, args=(method, directory, count, seed, barrier))
+                   for seed in range(processes)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        with open(os.path.join(directory, f"evaluaciones_diarias_{_DAY}.csv"), newline='',
+                  encoding='utf-8') as csvfile:
+            records = list(csv.reader(csvfile))
+        headers = sum(1 for record in records if record and record[0] == 'fecha_evaluacion')
+        malformed = sum(1 for record in records if len(record) != len(records[0]))
+        return processes * count / elapsed, len(records) - headers, headers, malformed
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main(processes: int = 4, count: int = 5000):
+    print(f"Procesos: {processes} | filas por proceso: {count:,}")
+    print(f"{'Método':<26}{'filas/s':>12}{'filas':>10}{'cabeceras':>11}{'corruptas':>11}")
+    for name, method in (("apertura por fila", _write_per_row), ("ReportWriter", _write_buffered)):
+        rate, rows, headers, malformed = _run(method, processes, count)
+        print(f"{name:<26}{rate:>12,.0f}{rows:>10,}{headers:>11}{malformed:>11}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,69 @@
+"""
+Consulta de historiales largos de signos vitales: lectura del intervalo
+desde el fichero mapeado en memoria frente a filtrar las evaluaciones en
+JSON, y memoria necesaria en cada caso.
+
+Uso: python -m benchmarks.bench_vital_store [años] [lecturas por día]
+"""
+import json
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+import numpy as np
+
+from backend.vital_store import VitalStore
+from benchmarks.sample_data import make_patients, make_evaluations
+
+
+def _timed(function, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main(years: int = 5, per_day: int = 4):
+    patients = make_patients(per_day)
+    evaluations = make_evaluations(patients, 365 * years, start=date(2020, 1, 1))
+    for evaluation in evaluations:
+        # Todas las lecturas pasan a ser de un mismo residente, a lo largo del día
+        evaluation['patient_id'] = 1
+    directory = tempfile.mkdtemp(prefix="bench_vital_store_")
+    try:
+        store = VitalStore(directory)
+        _, write_time = _timed(lambda: store.append_evaluations(evaluations))
+        print(f"Lecturas: {len(evaluations):,} ({years} años) | escritura: {write_time:.2f} s | "
+              f"fichero: {store.count(1) * 32 / 1e6:.1f} MB")
+
+        start, end = date(2020 + years - 1, 1, 1), date(2020 + years - 1, 3, 31)
+        payload = json.dumps(evaluations)
+
+        def from_json():
+            loaded = json.loads(payload)
+            return [e['vital_signs'] for e in loaded if str(start) <= e['date'] <= str(end)]
+
+        tracemalloc.start()
+        selected, json_time = _timed(from_json)
+        json_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        reopened = VitalStore(directory)
+        tracemalloc.start()
+        window, store_time = _timed(lambda: reopened.range(1, start, end), repeat=100)
+        store_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{'Método':<28}{'tiempo (ms)':>14}{'memoria (MB)':>15}{'lecturas':>10}")
+        print(f"{'JSON + filtro':<28}{json_time * 1e3:>14.1f}{json_peak / 1e6:>15.1f}{len(selected):>10,}")
+        print(f"{'memmap + searchsorted':<28}{store_time * 1e3:>14.3f}{store_peak / 1e6:>15.3f}{len(window):>10,}")
+        print(f"Corte sin copia: {'sí' if isinstance(window, np.memmap) else 'no'}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
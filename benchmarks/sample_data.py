@@ -0,0 +1,79 @@
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any
+
+SYMPTOMS = [
+    "Confusión", "Agitación", "Caídas recientes", "Pérdida de apetito",
+    "Dificultad respiratoria", "Dolor torácico", "Náuseas", "Vómitos",
+    "Mareos", "Estreñimiento", "Diarrea", "Edemas", "Tos", "Fiebre"
+]
+
+
+def make_patients(count: int, seed: int = 7) -> Dict[int, Dict[str, Any]]:
+    """Genera un censo sintético con el formato de paciente de la aplicación"""
+    rng = random.Random(seed)
+    patients = {}
+    for pid in range(1, count + 1):
+        patients[pid] = {
+            'id': pid,
+            'name': f"Residente {pid}",
+            'age': rng.randint(65, 102),
+            'gender': rng.choice(["Femenino", "Masculino"]),
+            'room': f"{100 + pid // 2}-{'AB'[pid % 2]}",
+            'admission_date': str(date(2024, 1, 1) + timedelta(days=rng.randint(0, 600))),
+            'emergency_contact': "",
+            'risk_level': rng.choice(["Bajo", "Medio", "Alto"]),
+            'cognitive_level': rng.choice(["Normal", "Deterioro Leve", "Deterioro Moderado"]),
+            'allergies': "",
+            'medical_history': "",
+            'conditions': {c: rng.random() < 0.3 for c in
+                           ('diabetes', 'hypertension', 'heart_disease', 'dementia',
+                            'depression', 'mobility_issues')},
+            'medications': "",
+            'registered_date': "2024-01-01",
+            'registered_time': "10:00:00"
+        }
+    return patients
+
+
+def make_evaluations(patients: Dict[int, Dict[str, Any]], days: int,
+                     start: date = date(2025, 1, 1), seed: int = 11) -> List[Dict[str, Any]]:
+    """Genera una evaluación diaria por residente con el formato de la aplicación"""
+    rng = random.Random(seed)
+    evaluations = []
+    for day in range(days):
+        current = start + timedelta(days=day)
+        for pid, patient in patients.items():
+            moment = datetime.combine(current, datetime.min.time()) + timedelta(
+                seconds=rng.randint(7 * 3600, 21 * 3600), microseconds=rng.randint(0, 999999))
+            systolic = rng.randint(100, 170)
+            diastolic = rng.randint(60, 100)
+            evaluations.append({
+                'id': len(evaluations) + 1,
+                'patient_id': pid,
+                'patient_name': patient['name'],
+                'date': str(current),
+                'time': moment.strftime("%H:%M:%S"),
+                'vital_signs': {
+                    'systolic_bp': systolic,
+                    'diastolic_bp': diastolic,
+                    'blood_pressure': f"{systolic}/{diastolic}",
+                    'heart_rate': rng.randint(55, 110),
+                    'temperature': round(rng.uniform(35.8, 38.6), 1),
+                    'oxygen_saturation': rng.randint(88, 100),
+                    'pain_level': rng.randint(0, 6)
+                },
+                'general_status': {
+                    'mobility': rng.choice(["Independiente", "Asistencia Mínima", "Asistencia Total"]),
+                    'appetite': rng.choice(["Bueno", "Regular", "Malo"]),
+                    'sleep_quality': rng.choice(["Buena", "Regular", "Mala"]),
+                    'mood': rng.choice(["Alegre", "Normal", "Triste", "Apático"]),
+                    'cognitive_status': rng.choice(["Alerta", "Confuso"]),
+                    'continence': rng.choice(["Continente", "Incontinencia Ocasional"])
+                },
+                'symptoms': rng.sample(SYMPTOMS, rng.choice([0, 0, 0, 1, 2])),
+                'observations': "",
+                'evaluator': rng.choice(["Lucía", "Andrés", "Marta"]),
+                'timestamp': moment.isoformat()
+            })
+    return evaluations
@@ -1,9 +1,15 @@
 import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
+import numpy as np
 from datetime import datetime, date
 from typing import Dict, List, Any, Optional
 
+from models.fall_risk import (
+    MorseInputs, AmbulatoryAid, Gait, MentalStatus, DowntonInputs, FallRiskScore, DOWNTON_MEDICATIONS,
+    DOWNTON_SENSORY_DEFICITS
+)
+
 def create_metric_card(title: str, value: str, status: str = "info", help_text: str = None):
     """
     Crea una tarjeta de métrica personalizada
@@ -92,19 +98,28 @@ def create_patient_card(patient, show_actions: bool = True):
     </div>
     """, unsafe_allow_html=True)
 
-def create_vital_signs_chart(vital_signs_history: List[Dict]):
+def create_vital_signs_chart(vital_signs_history):
     """
     Crea gráficos de signos vitales
+    
+    Admite una lista de diccionarios o un array estructurado de
+    ``VitalStore.range`` (columnas pasadas a Plotly sin convertirlas a listas)
     """
-    if not vital_signs_history:
+    if vital_signs_history is None or len(vital_signs_history) == 0:
         st.info("📊 No hay historial de signos vitales disponible")
         return
     
     # Preparar datos
-    dates = [entry['date'] for entry in vital_signs_history]
-    temps = [entry.get('temperature', 36.5) for entry in vital_signs_history]
-    hrs = [entry.get('heart_rate', 70) for entry in vital_signs_history]
-    spo2s = [entry.get('oxygen_saturation', 98) for entry in vital_signs_history]
+    if isinstance(vital_signs_history, np.ndarray):
+        dates = vital_signs_history['timestamp']
+        temps = vital_signs_history['temperature']
+        hrs = vital_signs_history['heart_rate']
+        spo2s = vital_signs_history['oxygen_saturation']
+    else:
+        dates = [entry['date'] for entry in vital_signs_history]
+        temps = [entry.get('temperature', 36.5) for entry in vital_signs_history]
+        hrs = [entry.get('heart_rate', 70) for entry in vital_signs_history]
+        spo2s = [entry.get('oxygen_saturation', 98) for entry in vital_signs_history]
     
     col1, col2 = st.columns(2)
     
@@ -476,11 +491,11 @@ def create_emergency_protocols_panel():
                 for action in data['actions']:
                     st.markdown(f"**{action}**")
 
-def create_fall_risk_calculator():
+def create_fall_risk_calculator(patient_id: Optional[int] = None, scorer=None):
     """
     Calculadora interactiva de riesgo de caídas
     """
-    st.markdown("### ⚠️ Calculadora de Riesgo de Caídas (Escala Morse)")
+    st.markdown("### ⚠️ Calculadora de Riesgo de Caídas (Escalas Morse y Downton)")
     
     with st.form("fall_risk_calculator"):
         col1, col2 = st.columns(2)
@@ -500,7 +515,8 @@ def create_fall_risk_calculator():
             
             ambulatory_aid = st.selectbox(
                 "Ayuda para caminar:",
-                ["Ninguna/Cama/Silla/Enfermera", "Muletas/Bastón/Andador", "Mobiliario"],
+                list(AmbulatoryAid),
+                format_func=lambda option: option.label,
                 help="¿Qué ayuda necesita para movilizarse?"
             )
         
@@ -513,52 +529,57 @@ def create_fall_risk_calculator():
             
             gait = st.selectbox(
                 "Marcha:",
-                ["Normal/Cama/Inmóvil", "Débil", "Alterada"],
+                list(Gait),
+                format_func=lambda option: option.label,
                 help="¿Cómo es su patrón de marcha?"
             )
             
             mental_status = st.selectbox(
                 "Estado mental:",
-                ["Orientado", "Desorientado"],
+                list(MentalStatus),
+                format_func=lambda option: option.label,
                 help="¿Está orientado en tiempo, espacio y persona?"
             )
         
+        # Downton: caídas, confusión y marcha se toman de los ítems de Morse
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            medications = st.multiselect(
+                "Medicamentos (Downton):",
+                DOWNTON_MEDICATIONS,
+                help="Un punto por cada grupo; otros fármacos no puntúan"
+            )
+        
+        with col2:
+            sensory_deficits = st.multiselect(
+                "Déficits sensoriales (Downton):",
+                DOWNTON_SENSORY_DEFICITS
+            )
+        
         submitted = st.form_submit_button("🔍 Calcular Riesgo", use_container_width=True)
         
         if submitted:
             # Cálculo según escala Morse
-            score = 0
-            
-            # Historial de caídas
-            if history_falls == "Sí":
-                score += 25
-            
-            # Diagnóstico secundario
-            if secondary_diagnosis == "Sí":
-                score += 15
-            
-            # Ayuda ambulatoria
-            if ambulatory_aid == "Muletas/Bastón/Andador":
-                score += 15
-            elif ambulatory_aid == "Mobiliario":
-                score += 30
-            
-            # Terapia IV
-            if iv_therapy == "Sí":
-                score += 20
-            
-            # Marcha
-            if gait == "Débil":
-                score += 10
-            elif gait == "Alterada":
-                score += 20
-            
-            # Estado mental
-            if mental_status == "Desorientado":
-                score += 15
+            morse_inputs = MorseInputs(
+                history_of_falls=history_falls == "Sí",
+                secondary_diagnosis=secondary_diagnosis == "Sí",
+                ambulatory_aid=ambulatory_aid,
+                iv_therapy=iv_therapy == "Sí",
+                gait=gait,
+                mental_status=mental_status
+            )
+            downton_inputs = DowntonInputs.from_morse(morse_inputs, medications, sensory_deficits)
+            if scorer is not None and patient_id is not None:
+                result = scorer.score(patient_id, morse_inputs, downton_inputs)
+            else:
+                result = FallRiskScore(patient_id=patient_id, morse_score=sum(morse_inputs.item_points),
+                                       morse_inputs=morse_inputs, downton_score=downton_inputs.score,
+                                       downton_inputs=downton_inputs)
+            score = result.morse_score
             
             # Interpretación
-            if score >= 51:
+            if result.morse_level == "ALTO":
                 risk_level = "ALTO"
                 risk_color = "#dc3545"
                 recommendations = [
@@ -567,7 +588,7 @@ def create_fall_risk_calculator():
                     "Barandillas elevadas",
                     "Evaluación médica urgente"
                 ]
-            elif score >= 25:
+            elif result.morse_level == "MODERADO":
                 risk_level = "MODERADO"
                 risk_color = "#ffc107"
                 recommendations = [
@@ -602,10 +623,13 @@ def create_fall_risk_calculator():
                 ">
                     <h2 style="margin: 0; color: {risk_color};">RIESGO {risk_level}</h2>
                     <h3 style="margin: 0.5rem 0 0 0; color: {risk_color};">Puntuación: {score}</h3>
+                    <p style="margin: 0.5rem 0 0 0; color: #666;">Downton: {result.downton_score}</p>
                 </div>
                 """, unsafe_allow_html=True)
             
             with col2:
+                if result.downton_score >= 3 and result.morse_level != "ALTO":
+                    st.warning("⚠️ Downton ≥ 3: riesgo de caídas alto aunque Morse sea menor")
                 st.markdown("**🎯 Recomendaciones:**")
                 for rec in recommendations:
                     st.markdown(f"• {rec}")
@@ -3,6 +3,8 @@ from datetime import date, time, datetime
 from typing import Dict, List, Optional, Any
 import json
 
+from models.symptoms import encode_symptoms, symptom_bit, OTHER_SYMPTOM_BIT
+
 @dataclass
 class Assessment:
     """
@@ -16,6 +18,7 @@ class Assessment:
     evaluator_id: Optional[str] = None
     evaluator_name: str = "Sistema IA Geriátrico"
     assessment_type: str = "routine"  # routine, emergency, discharge, admission
+    _symptom_cache: tuple = field(default=((), 0), init=False, repr=False, compare=False)
     
     @property
     def severity_score(self) -> int:
@@ -172,12 +175,30 @@ class Assessment:
         """
         return self.data.get('symptoms', [])
     
+    @property
+    def symptom_mask(self) -> int:
+        """
+        Máscara de bits de los síntomas (se recalcula sólo si cambia la lista)
+        """
+        symptoms = self.get_symptoms_list()
+        cached_symptoms, mask = self._symptom_cache
+        if cached_symptoms != symptoms:
+            mask = encode_symptoms(symptoms)
+            self._symptom_cache = (list(symptoms), mask)
+        return mask
+    
     def has_symptom(self, symptom: str) -> bool:
         """
         Verifica si el paciente presenta un síntoma específico
         """
-        symptoms = self.get_symptoms_list()
-        return symptom.lower() in [s.lower() for s in symptoms]
+        bit = symptom_bit(symptom)
+        mask = self.symptom_mask
+        if bit:
+            return bool(mask & bit)
+        if not mask & OTHER_SYMPTOM_BIT:
+            return False
+        symptom = symptom.lower()
+        return any(s.lower() == symptom for s in self.get_symptoms_list())
     
     def add_note(self, note: str, note_type: str = "general"):
         """
@@ -0,0 +1,329 @@
+"""
+Almacenamiento columnar de evaluaciones para informes y tendencias.
+
+Cada campo se guarda en su propio array de NumPy (signos vitales como
+float64 con NaN para los ausentes, instantes como datetime64, categorías
+como códigos enteros y síntomas como máscara de bits). Los arrays crecen
+por duplicación, de modo que añadir una evaluación es O(1) amortizado, y
+``to_frame`` entrega vistas sin copia a pandas.
+"""
+from datetime import date, datetime
+from typing import Dict, Any, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from models.symptoms import (
+    OTHER_SYMPTOM_BIT, encode_symptoms, symptom_bit, matches_any, matches_all
+)
+
+VITAL_COLUMNS = ('systolic_bp', 'diastolic_bp', 'heart_rate', 'temperature',
+                 'oxygen_saturation', 'pain_level')
+
+# Valores conocidos de cada campo del estado general (se admiten otros al añadir)
+GENERAL_STATUS_LABELS = (
+    ('mobility', ("Independiente", "Asistencia Mínima", "Asistencia Total", "Inmóvil")),
+    ('appetite', ("Bueno", "Regular", "Malo")),
+    ('sleep_quality', ("Buena", "Regular", "Mala")),
+    ('mood', ("Alegre", "Normal", "Triste", "Agitado", "Apático")),
+    ('cognitive_status', ("Alerta", "Confuso", "Somnoliento", "Agitado")),
+    ('continence', ("Continente", "Incontinencia Ocasional", "Incontinencia Total"))
+)
+
+CATEGORY_COLUMNS = tuple(name for name, _ in GENERAL_STATUS_LABELS)
+
+TEXT_COLUMNS = ('patient_name', 'evaluator', 'observations', 'symptoms')
+
+# Columnas del reporte completo: (columna de salida, columna del lote)
+EXPORT_COLUMNS = (
+    ('ID_Evaluacion', 'evaluation_id'),
+    ('ID_Paciente', 'patient_id'),
+    ('Nombre_Paciente', 'patient_name'),
+    ('Fecha', 'date'),
+    ('Hora', 'time'),
+    ('Evaluador', 'evaluator'),
+    ('PA_Sistolica', 'systolic_bp'),
+    ('PA_Diastolica', 'diastolic_bp'),
+    ('Frecuencia_Cardiaca', 'heart_rate'),
+    ('Temperatura', 'temperature'),
+    ('Saturacion_O2', 'oxygen_saturation'),
+    ('Nivel_Dolor', 'pain_level'),
+    ('Movilidad', 'mobility'),
+    ('Apetito', 'appetite'),
+    ('Calidad_Sueno', 'sleep_quality'),
+    ('Estado_Animo', 'mood'),
+    ('Estado_Cognitivo', 'cognitive_status'),
+    ('Continencia', 'continence'),
+    ('Sintomas', 'symptoms'),
+    ('Observaciones', 'observations')
+)
+
+_NO_ID = -1
+_NAT = np.datetime64('NaT', 'us')
+
+
+def _number(value) -> float:
+    if isinstance(value, bool):
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _identifier(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return _NO_ID
+
+
+def _timestamp(evaluation: Dict[str, Any]) -> np.datetime64:
+    """Instante de una evaluación: 'timestamp' o, en su defecto, fecha y hora"""
+    value = evaluation.get('timestamp')
+    if not value and evaluation.get('date'):
+        value = f"{evaluation['date']}T{evaluation.get('time') or '00:00:00'}"
+    if not value:
+        return _NAT
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return _NAT
+    return np.datetime64(parsed.replace(tzinfo=None), 'us')
+
+
+class _CategoryColumn:
+    """Códigos de una columna categórica con vocabulario ampliable (-1 = sin valor)"""
+
+    __slots__ = ('labels', '_codes')
+
+    def __init__(self, labels: Sequence[str]):
+        self.labels = list(labels)
+        self._codes = {label: code for code, label in enumerate(self.labels)}
+
+    def encode(self, label) -> int:
+        if label is None or label == '':
+            return -1
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+class AssessmentBatch:
+    """
+    Contenedor columnar (estructura de arrays) de evaluaciones
+    """
+
+    def __init__(self, capacity: int = 256):
+        self._size = 0
+        self._capacity = max(int(capacity), 1)
+        self._columns: Dict[str, np.ndarray] = {}
+        self._categories = {name: _CategoryColumn(labels) for name, labels in GENERAL_STATUS_LABELS}
+        self._allocate(self._capacity)
+
+    @classmethod
+    def from_evaluations(cls, evaluations: Iterable[Dict[str, Any]]) -> 'AssessmentBatch':
+        """Construye el lote a partir de evaluaciones con el formato de la aplicación"""
+        evaluations = list(evaluations)
+        batch = cls(capacity=max(len(evaluations), 256))
+        batch.extend(evaluations)
+        return batch
+
+    def _allocate(self, capacity: int):
+        size = self._size
+        layout = {
+            'evaluation_id': np.int64,
+            'patient_id': np.int64,
+            'timestamp': 'datetime64[us]',
+            'symptom_mask': np.uint64,
+            **{name: np.float64 for name in VITAL_COLUMNS},
+            **{name: np.int16 for name in CATEGORY_COLUMNS},
+            **{name: object for name in TEXT_COLUMNS}
+        }
+        columns = {}
+        for name, dtype in layout.items():
+            column = np.empty(capacity, dtype=dtype)
+            if name in self._columns:
+                column[:size] = self._columns[name][:size]
+            columns[name] = column
+        self._columns = columns
+        self._capacity = capacity
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        if needed > self._capacity:
+            self._allocate(max(needed, self._capacity * 2))
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, evaluation: Dict[str, Any]):
+        """Añade una evaluación (O(1) amortizado)"""
+        self._reserve(1)
+        self._write(self._size, evaluation)
+        self._size += 1
+
+    def extend(self, evaluations: Iterable[Dict[str, Any]]):
+        """Añade varias evaluaciones reservando espacio una sola vez"""
+        evaluations = list(evaluations)
+        self._reserve(len(evaluations))
+        for offset, evaluation in enumerate(evaluations):
+            self._write(self._size + offset, evaluation)
+        self._size += len(evaluations)
+
+    def _write(self, row: int, evaluation: Dict[str, Any]):
+        columns = self._columns
+        vitals = evaluation.get('vital_signs') or {}
+        status = evaluation.get('general_status') or {}
+        symptoms = tuple(evaluation.get('symptoms') or ())
+
+        columns['evaluation_id'][row] = _identifier(evaluation.get('id'))
+        columns['patient_id'][row] = _identifier(evaluation.get('patient_id'))
+        columns['timestamp'][row] = _timestamp(evaluation)
+        columns['symptom_mask'][row] = encode_symptoms(symptoms)
+        for name in VITAL_COLUMNS:
+            value = vitals.get(name)
+            if value is None and name == 'pain_level':
+                value = status.get(name)
+            columns[name][row] = _number(value)
+        for name in CATEGORY_COLUMNS:
+            columns[name][row] = self._categories[name].encode(status.get(name))
+        columns['patient_name'][row] = evaluation.get('patient_name', '')
+        columns['evaluator'][row] = evaluation.get('evaluator', '')
+        columns['observations'][row] = evaluation.get('observations', '')
+        columns['symptoms'][row] = symptoms
+
+    def column(self, name: str) -> np.ndarray:
+        """Vista (sin copia) de una columna con las evaluaciones almacenadas"""
+        return self._columns[name][:self._size]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.column('timestamp')
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Fecha de cada evaluación como datetime64[D]"""
+        return self.timestamps.astype('datetime64[D]')
+
+    def categorical(self, name: str) -> pd.Categorical:
+        """Columna categórica de pandas sobre los códigos almacenados"""
+        return pd.Categorical.from_codes(self.column(name), categories=self._categories[name].labels,
+                                         validate=False)
+
+    def to_frame(self, columns: Sequence[str] = None, rows: slice = None) -> pd.DataFrame:
+        """
+        DataFrame con las columnas indicadas (todas por defecto).
+
+        Las columnas numéricas, de fechas y de texto son vistas de los arrays
+        del lote; sólo las categóricas se construyen a partir de sus códigos.
+        """
+        rows = rows or slice(None)
+        names = columns or (('evaluation_id', 'patient_id', 'timestamp') + VITAL_COLUMNS +
+                            CATEGORY_COLUMNS + ('symptom_mask',) + TEXT_COLUMNS)
+        data = {}
+        for name in names:
+            if name in self._categories:
+                data[name] = self.categorical(name)[rows]
+            else:
+                data[name] = self.column(name)[rows]
+        return pd.DataFrame(data, copy=False)
+
+    def symptom_filter(self, symptoms: Iterable[str], match: str = 'any',
+                       start: date = None, end: date = None) -> np.ndarray:
+        """
+        Máscara booleana de las evaluaciones con los síntomas indicados.
+
+        ``match`` es 'any' (alguno) o 'all' (todos); ``start`` y ``end``
+        limitan el intervalo de fechas (ambos inclusive). Los síntomas fuera
+        del vocabulario se comprueban sobre el texto sólo en las filas que
+        tienen marcado el bit de otros síntomas.
+        """
+        symptoms = list(symptoms)
+        known = [s for s in symptoms if symptom_bit(s)]
+        unknown = [s.lower() for s in symptoms if not symptom_bit(s)]
+        masks = self.column('symptom_mask')
+        if match == 'all':
+            selected = matches_all(masks, known)
+        else:
+            selected = matches_any(masks, known) if known else np.zeros(len(masks), dtype=bool)
+
+        if unknown:
+            texts = self.column('symptoms')
+            candidates = np.flatnonzero((masks & np.uint64(OTHER_SYMPTOM_BIT)) != 0)
+            present = np.zeros(len(masks), dtype=bool)
+            for row in candidates:
+                row_symptoms = {s.lower() for s in texts[row]}
+                if match == 'all':
+                    present[row] = all(s in row_symptoms for s in unknown)
+                else:
+                    present[row] = any(s in row_symptoms for s in unknown)
+            selected = selected & present if match == 'all' else selected | present
+
+        if start is not None or end is not None:
+            dates = self.dates
+            if start is not None:
+                selected &= dates >= np.datetime64(start, 'D')
+            if end is not None:
+                selected &= dates <= np.datetime64(end, 'D')
+        return selected
+
+    def patients_with_symptoms(self, symptoms: Iterable[str], match: str = 'any',
+                               start: date = None, end: date = None) -> pd.DataFrame:
+        """Residentes con los síntomas indicados en el intervalo y número de evaluaciones"""
+        rows = self.symptom_filter(symptoms, match, start, end)
+        frame = self.to_frame(('patient_id', 'patient_name', 'timestamp'))[rows]
+        return (frame.groupby('patient_id', sort=False)
+                .agg(patient_name=('patient_name', 'last'), evaluations=('timestamp', 'size'),
+                     last_seen=('timestamp', 'max'))
+                .sort_values('evaluations', ascending=False)
+                .reset_index())
+
+    def recent_frame(self, count: int = 20) -> pd.DataFrame:
+        """Últimas evaluaciones (más reciente primero) con el formato de la tabla de reportes"""
+        start = max(self._size - count, 0)
+        frame = self.to_frame(('timestamp', 'patient_name', 'systolic_bp', 'diastolic_bp',
+                               'heart_rate', 'temperature', 'pain_level', 'mobility', 'mood'),
+                              rows=slice(start, None)).iloc[::-1]
+
+        def with_unit(values: pd.Series, unit: str) -> pd.Series:
+            return values.map(lambda v: 'N/A' if pd.isna(v) else f"{v:g}{unit}")
+
+        pressure = (frame['systolic_bp'].map(lambda v: '' if pd.isna(v) else f"{v:g}") + '/' +
+                    frame['diastolic_bp'].map(lambda v: '' if pd.isna(v) else f"{v:g}"))
+        return pd.DataFrame({
+            'Fecha': frame['timestamp'].dt.strftime('%Y-%m-%d'),
+            'Hora': frame['timestamp'].dt.strftime('%H:%M:%S'),
+            'Paciente': frame['patient_name'],
+            'PA': pressure.replace('/', 'N/A'),
+            'FC': with_unit(frame['heart_rate'], ' lpm'),
+            'Temp': with_unit(frame['temperature'], '°C'),
+            'Dolor': with_unit(frame['pain_level'], '/10'),
+            'Movilidad': frame['mobility'].astype(object).fillna('N/A'),
+            'Ánimo': frame['mood'].astype(object).fillna('N/A')
+        }).reset_index(drop=True)
+
+    def export_frame(self) -> pd.DataFrame:
+        """DataFrame del reporte completo de evaluaciones"""
+        frame = self.to_frame()
+        data = {}
+        for output, name in EXPORT_COLUMNS:
+            if name == 'date':
+                values = frame['timestamp'].dt.strftime('%Y-%m-%d')
+            elif name == 'time':
+                values = frame['timestamp'].dt.strftime('%H:%M:%S')
+            elif name == 'symptoms':
+                values = frame['symptoms'].map(', '.join)
+            elif name in ('evaluation_id', 'patient_id'):
+                values = frame[name].where(frame[name] != _NO_ID).astype('Int64')
+            elif name in VITAL_COLUMNS:
+                values = frame[name]
+                finite = values.dropna()
+                if (finite == finite.round()).all():
+                    values = values.astype('Int64')
+            else:
+                values = frame[name]
+            data[output] = values
+        return pd.DataFrame(data)
@@ -0,0 +1,188 @@
+"""
+Contadores agregados de evaluaciones por día.
+
+La barra lateral, el dashboard, los reportes y la configuración sólo
+necesitan recuentos (evaluaciones de hoy, de los últimos 7 días, días con
+actividad, residentes evaluados...). En lugar de recorrer todas las
+evaluaciones en cada recarga, el almacén compartido mantiene estos
+contadores al insertar y cada lectura es una consulta a un diccionario.
+
+``EvaluationCounters`` es inmutable: ``add`` y ``reclassify`` devuelven
+unos contadores nuevos que comparten con los anteriores los días que no
+cambian, de modo que cada instantánea del almacén conserva los suyos. Los
+días son la fecha de la evaluación, así que a medianoche "hoy" pasa a ser
+un día sin evaluaciones sin tener que reiniciar nada.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional, Any, FrozenSet, Iterable, Mapping, Tuple
+
+import pandas as pd
+
+_EMPTY: Mapping[str, int] = MappingProxyType({})
+
+
+def evaluation_day(evaluation: Dict[str, Any]) -> Optional[date]:
+    """Día de una evaluación (None si no tiene una fecha válida)"""
+    value = evaluation.get('date') or (evaluation.get('timestamp') or '')[:10]
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class DayCounts:
+    """Recuentos de un día"""
+    evaluations: int = 0
+    patients: FrozenSet[int] = frozenset()
+    severities: Mapping[str, int] = field(default_factory=lambda: _EMPTY)
+    evaluators: Mapping[str, int] = field(default_factory=lambda: _EMPTY)
+
+    @property
+    def unique_patients(self) -> int:
+        return len(self.patients)
+
+
+_NO_COUNTS = DayCounts()
+
+
+def _merged(counts: Mapping[str, int], changes: Counter) -> Mapping[str, int]:
+    """Copia de unos recuentos con los cambios aplicados (sin claves a cero)"""
+    merged = Counter(counts)
+    merged.update(changes)
+    return MappingProxyType({key: value for key, value in merged.items() if value > 0})
+
+
+class EvaluationCounters:
+    """Recuentos por día, por residente, por severidad y por evaluador"""
+
+    __slots__ = ('_days', '_patients', '_severities', '_evaluators', '_total')
+
+    def __init__(self):
+        self._days: Dict[date, DayCounts] = {}
+        self._patients: Mapping[int, int] = _EMPTY
+        self._severities: Mapping[str, int] = _EMPTY
+        self._evaluators: Mapping[str, int] = _EMPTY
+        self._total = 0
+
+    def _copy(self) -> 'EvaluationCounters':
+        counters = EvaluationCounters()
+        counters._days = self._days
+        counters._patients = self._patients
+        counters._severities = self._severities
+        counters._evaluators = self._evaluators
+        counters._total = self._total
+        return counters
+
+    # Actualización
+
+    def add(self, evaluations: Iterable[Dict[str, Any]],
+            severity_of: Callable[[Dict[str, Any]], Optional[str]] = lambda evaluation: None
+            ) -> 'EvaluationCounters':
+        """
+        Contadores con las evaluaciones añadidas. ``severity_of`` da el
+        nivel de severidad de cada una (None si todavía no tiene análisis).
+        """
+        # Se agrupan los cambios por día para copiar cada día tocado una sola vez
+        grouped: Dict[date, List[Tuple[Any, Optional[str], str]]] = {}
+        for evaluation in evaluations:
+            day = evaluation_day(evaluation)
+            if day is not None:
+                grouped.setdefault(day, []).append(
+                    (evaluation.get('patient_id'), severity_of(evaluation), evaluation.get('evaluator') or '')
+                )
+        if not grouped:
+            return self
+
+        counters = self._copy()
+        counters._days = dict(self._days)
+        patients, severities, evaluators = Counter(), Counter(), Counter()
+        for day, rows in grouped.items():
+            current = self._days.get(day, _NO_COUNTS)
+            day_patients = {patient_id for patient_id, _, _ in rows if patient_id is not None}
+            day_severities = Counter(severity for _, severity, _ in rows if severity)
+            day_evaluators = Counter(evaluator for _, _, evaluator in rows if evaluator)
+            counters._days[day] = DayCounts(
+                evaluations=current.evaluations + len(rows),
+                patients=current.patients | day_patients if day_patients else current.patients,
+                severities=_merged(current.severities, day_severities) if day_severities else current.severities,
+                evaluators=_merged(current.evaluators, day_evaluators) if day_evaluators else current.evaluators
+            )
+            patients.update(patient_id for patient_id, _, _ in rows if patient_id is not None)
+            severities.update(day_severities)
+            evaluators.update(day_evaluators)
+            counters._total += len(rows)
+        counters._patients = _merged(self._patients, patients) if patients else self._patients
+        counters._severities = _merged(self._severities, severities) if severities else self._severities
+        counters._evaluators = _merged(self._evaluators, evaluators) if evaluators else self._evaluators
+        return counters
+
+    def reclassify(self, changes: Iterable[Tuple[date, Optional[str], Optional[str]]]) -> 'EvaluationCounters':
+        """Contadores tras cambiar la severidad de evaluaciones ya contadas: (día, anterior, nueva)"""
+        grouped: Dict[date, Counter] = {}
+        for day, previous, severity in changes:
+            if previous == severity or day not in self._days:
+                continue
+            delta = grouped.setdefault(day, Counter())
+            if previous:
+                delta[previous] -= 1
+            if severity:
+                delta[severity] += 1
+        if not grouped:
+            return self
+        counters = self._copy()
+        counters._days = dict(self._days)
+        total = Counter()
+        for day, delta in grouped.items():
+            current = self._days[day]
+            counters._days[day] = DayCounts(current.evaluations, current.patients,
+                                            _merged(current.severities, delta), current.evaluators)
+            total.update(delta)
+        counters._severities = _merged(self._severities, total)
+        return counters
+
+    # Lectura
+
+    def __len__(self) -> int:
+        return self._total
+
+    def day(self, day: date) -> DayCounts:
+        return self._days.get(day, _NO_COUNTS)
+
+    def count_on(self, day: date) -> int:
+        """Evaluaciones realizadas en una fecha"""
+        return self.day(day).evaluations
+
+    def active_days(self) -> int:
+        """Número de días con al menos una evaluación"""
+        return len(self._days)
+
+    def unique_patients(self) -> int:
+        """Número de residentes distintos evaluados"""
+        return len(self._patients)
+
+    def severity_counts(self) -> Mapping[str, int]:
+        """Evaluaciones por nivel de severidad (sólo las analizadas)"""
+        return self._severities
+
+    def evaluator_counts(self) -> Mapping[str, int]:
+        """Evaluaciones por evaluador"""
+        return self._evaluators
+
+    def daily_counts(self, start: date = None, end: date = None) -> pd.Series:
+        """
+        Evaluaciones por día: con ``start`` y ``end`` todos los días del
+        intervalo (incluidos los que no tienen evaluaciones), sin ellos sólo
+        los días con actividad.
+        """
+        if start is not None and end is not None:
+            days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+        else:
+            days = sorted(self._days)
+        counts = [self.count_on(day) for day in days]
+        return pd.Series(counts, index=pd.DatetimeIndex(days), name='Evaluaciones', dtype='int64')
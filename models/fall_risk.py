@@ -0,0 +1,213 @@
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional, Any
+
+
+class AmbulatoryAid(Enum):
+    """Ayuda para la deambulación (escala Morse)"""
+    NONE = ("Ninguna/Reposo/Enfermera", 0)
+    CRUTCHES = ("Muletas/Bastón/Andador", 15)
+    FURNITURE = ("Mobiliario", 30)
+
+    def __init__(self, label: str, points: int):
+        self.label = label
+        self.points = points
+
+
+class Gait(Enum):
+    """Patrón de marcha (escala Morse)"""
+    NORMAL = ("Normal/Reposo/Inmóvil", 0)
+    WEAK = ("Débil", 10)
+    IMPAIRED = ("Alterada", 20)
+
+    def __init__(self, label: str, points: int):
+        self.label = label
+        self.points = points
+
+
+class MentalStatus(Enum):
+    """Estado mental (escala Morse)"""
+    ORIENTED = ("Orientado", 0)
+    FORGETS_LIMITATIONS = ("Desorientado", 15)
+
+    def __init__(self, label: str, points: int):
+        self.label = label
+        self.points = points
+
+
+@dataclass
+class MorseInputs:
+    """
+    Ítems de la escala de caídas de Morse
+    """
+    history_of_falls: bool = False
+    secondary_diagnosis: bool = False
+    ambulatory_aid: AmbulatoryAid = AmbulatoryAid.NONE
+    iv_therapy: bool = False
+    gait: Gait = Gait.NORMAL
+    mental_status: MentalStatus = MentalStatus.ORIENTED
+
+    @property
+    def item_points(self) -> List[int]:
+        """Puntos de cada ítem en el orden de la escala"""
+        return [
+            25 if self.history_of_falls else 0,
+            15 if self.secondary_diagnosis else 0,
+            self.ambulatory_aid.points,
+            20 if self.iv_therapy else 0,
+            self.gait.points,
+            self.mental_status.points
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convierte los ítems a diccionario para serialización
+        """
+        return {
+            'history_of_falls': self.history_of_falls,
+            'secondary_diagnosis': self.secondary_diagnosis,
+            'ambulatory_aid': self.ambulatory_aid.name,
+            'iv_therapy': self.iv_therapy,
+            'gait': self.gait.name,
+            'mental_status': self.mental_status.name
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MorseInputs':
+        """
+        Crea los ítems desde un diccionario
+        """
+        return cls(
+            history_of_falls=bool(data.get('history_of_falls', False)),
+            secondary_diagnosis=bool(data.get('secondary_diagnosis', False)),
+            ambulatory_aid=AmbulatoryAid[data.get('ambulatory_aid', 'NONE')],
+            iv_therapy=bool(data.get('iv_therapy', False)),
+            gait=Gait[data.get('gait', 'NORMAL')],
+            mental_status=MentalStatus[data.get('mental_status', 'ORIENTED')]
+        )
+
+
+# Factores de Downton que suman un punto cada uno (otros fármacos no puntúan)
+DOWNTON_MEDICATIONS = [
+    "Tranquilizantes/sedantes", "Diuréticos", "Hipotensores (no diuréticos)",
+    "Antiparkinsonianos", "Antidepresivos"
+]
+
+DOWNTON_SENSORY_DEFICITS = ["Visual", "Auditivo", "Extremidades"]
+
+
+@dataclass
+class DowntonInputs:
+    """
+    Ítems de la escala de riesgo de caídas de Downton
+    """
+    previous_falls: bool = False
+    medications: List[str] = field(default_factory=list)  # tranquilizantes, diuréticos, hipotensores...
+    sensory_deficits: List[str] = field(default_factory=list)  # visual, auditivo, extremidades
+    confused: bool = False
+    unsafe_gait: bool = False
+
+    @property
+    def score(self) -> int:
+        """Puntuación de Downton (un punto por cada factor presente)"""
+        return (int(self.previous_falls) + len(set(self.medications)) +
+                len(set(self.sensory_deficits)) + int(self.confused) + int(self.unsafe_gait))
+
+    @classmethod
+    def from_morse(cls, morse: MorseInputs, medications: List[str] = None,
+                   sensory_deficits: List[str] = None) -> 'DowntonInputs':
+        """
+        Crea los ítems compartiendo con Morse las caídas previas, la confusión
+        y la marcha insegura
+        """
+        return cls(
+            previous_falls=morse.history_of_falls,
+            medications=list(medications or []),
+            sensory_deficits=list(sensory_deficits or []),
+            confused=morse.mental_status == MentalStatus.FORGETS_LIMITATIONS,
+            unsafe_gait=morse.gait != Gait.NORMAL
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convierte los ítems a diccionario para serialización
+        """
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DowntonInputs':
+        """
+        Crea los ítems desde un diccionario
+        """
+        return cls(
+            previous_falls=bool(data.get('previous_falls', False)),
+            medications=list(data.get('medications', [])),
+            sensory_deficits=list(data.get('sensory_deficits', [])),
+            confused=bool(data.get('confused', False)),
+            unsafe_gait=bool(data.get('unsafe_gait', False))
+        )
+
+
+@dataclass
+class FallRiskScore:
+    """
+    Resultado de una valoración de riesgo de caídas
+    """
+    patient_id: Any
+    morse_score: int
+    morse_inputs: MorseInputs
+    downton_score: Optional[int] = None
+    downton_inputs: Optional[DowntonInputs] = None
+    scored_at: datetime = field(default_factory=datetime.now)
+    source: str = "manual"  # manual, batch
+
+    @property
+    def morse_level(self) -> str:
+        """Clasificación de la escala Morse"""
+        if self.morse_score >= 51:
+            return "ALTO"
+        elif self.morse_score >= 25:
+            return "MODERADO"
+        else:
+            return "BAJO"
+
+    @property
+    def fall_risk(self) -> str:
+        """Nivel para ``Patient.fall_risk`` (Bajo, Medio, Alto)"""
+        level = {"ALTO": "Alto", "MODERADO": "Medio", "BAJO": "Bajo"}[self.morse_level]
+        if self.downton_score is not None and self.downton_score >= 3:
+            level = "Alto"
+        return level
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convierte la valoración a diccionario para serialización
+        """
+        return {
+            'patient_id': self.patient_id,
+            'morse_score': self.morse_score,
+            'morse_level': self.morse_level,
+            'morse_inputs': self.morse_inputs.to_dict(),
+            'downton_score': self.downton_score,
+            'downton_inputs': self.downton_inputs.to_dict() if self.downton_inputs else None,
+            'fall_risk': self.fall_risk,
+            'scored_at': self.scored_at.isoformat(),
+            'source': self.source
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FallRiskScore':
+        """
+        Crea una valoración desde un diccionario
+        """
+        downton = data.get('downton_inputs')
+        return cls(
+            patient_id=data['patient_id'],
+            morse_score=data['morse_score'],
+            morse_inputs=MorseInputs.from_dict(data.get('morse_inputs', {})),
+            downton_score=data.get('downton_score'),
+            downton_inputs=DowntonInputs.from_dict(downton) if downton else None,
+            scored_at=datetime.fromisoformat(data['scored_at']),
+            source=data.get('source', 'manual')
+        )
@@ -0,0 +1,49 @@
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+# Vocabulario fijo de síntomas: la posición de cada síntoma es su bit en la máscara.
+# Los síntomas nuevos se añaden siempre al final para no alterar las máscaras guardadas.
+SYMPTOMS: Tuple[str, ...] = (
+    "Confusión", "Agitación", "Caídas recientes", "Pérdida de apetito",
+    "Dificultad respiratoria", "Dolor torácico", "Náuseas", "Vómitos",
+    "Mareos", "Estreñimiento", "Diarrea", "Edemas", "Tos", "Fiebre",
+    "Dolor"
+)
+
+# Bit reservado para síntomas fuera del vocabulario (texto libre, datos antiguos)
+OTHER_SYMPTOM_BIT = 1 << 63
+
+SYMPTOM_BITS = {symptom: 1 << position for position, symptom in enumerate(SYMPTOMS)}
+_SYMPTOM_BITS_LOWER = {symptom.lower(): bit for symptom, bit in SYMPTOM_BITS.items()}
+
+
+def symptom_bit(symptom: str) -> int:
+    """Bit de un síntoma (sin distinguir mayúsculas); 0 si no está en el vocabulario"""
+    return _SYMPTOM_BITS_LOWER.get(symptom.lower(), 0)
+
+
+def encode_symptoms(symptoms: Iterable[str]) -> int:
+    """Codifica una lista de síntomas como máscara de bits"""
+    mask = 0
+    for symptom in symptoms or ():
+        mask |= SYMPTOM_BITS.get(symptom) or symptom_bit(symptom) or OTHER_SYMPTOM_BIT
+    return mask
+
+
+def decode_symptoms(mask: int) -> List[str]:
+    """Síntomas del vocabulario presentes en una máscara, en el orden del vocabulario"""
+    return [symptom for symptom, bit in SYMPTOM_BITS.items() if mask & bit]
+
+
+def matches_any(masks: np.ndarray, symptoms: Iterable[str]) -> np.ndarray:
+    """Filas cuya máscara contiene al menos uno de los síntomas indicados"""
+    query = np.uint64(encode_symptoms(symptoms))
+    return (masks & query) != 0
+
+
+def matches_all(masks: np.ndarray, symptoms: Iterable[str]) -> np.ndarray:
+    """Filas cuya máscara contiene todos los síntomas indicados"""
+    query = np.uint64(encode_symptoms(symptoms))
+    return (masks & query) == query
+
@@ -0,0 +1,96 @@
+"""
+Restaurar una copia sobre datos ya analizados no debe perder los análisis
+en el registro de eventos, y las evaluaciones sólo se asignan a un
+residente local que sea el mismo.
+
+Uso: python -m pytest tests
+"""
+import json
+import os
+
+from backend import event_log as events
+from backend.backup_export import BackupManager
+from backend.backup_restore import BackupRestorer
+from backend.event_log import EventLog
+from backend.repository import Repository
+
+ANALYSIS = {'severity_level': 'Alto', 'summary': "Taquicardia"}
+
+
+def _backup(patients, evaluations) -> bytes:
+    return json.dumps({'patients': {str(patient['id']): patient for patient in patients},
+                       'evaluations': evaluations}).encode('utf-8')
+
+
+def _setup(tmp_path):
+    repository = Repository(os.path.join(tmp_path, "geriatria.db"))
+    event_log = EventLog(os.path.join(tmp_path, "events"))
+    restorer = BackupRestorer(repository, on_change=lambda event_type, records: event_log.append_many(
+        (event_type, record) for record in records))
+    return repository, event_log, restorer
+
+
+def _add_patient(repository, event_log, name):
+    patient = repository.add_patients([{'name': name, 'admission_date': "2024-01-10", 'room': "101"}])[0]
+    event_log.append(events.PATIENT_REGISTERED, patient)
+    return patient
+
+
+def test_restore_keeps_analysis_in_event_log(tmp_path):
+    repository, event_log, restorer = _setup(tmp_path)
+    patient = _add_patient(repository, event_log, "María García")
+    evaluation = repository.add_evaluations([{
+        'patient_id': patient['id'], 'patient_name': patient['name'],
+        'timestamp': "2026-01-05T10:00:00", 'vital_signs': {'heart_rate': 118}
+    }])[0]
+    repository.attach_analysis(evaluation['id'], ANALYSIS)
+    event_log.append_many([(events.EVALUATION_CREATED, evaluation),
+                           (events.ANALYSIS_ATTACHED, {'evaluation_id': evaluation['id'], 'analysis': ANALYSIS})])
+
+    # La copia trae la misma evaluación corregida y sin análisis
+    corrected = {**evaluation, 'vital_signs': {'heart_rate': 112}}
+    report = restorer.restore(_backup([patient], [corrected]))
+    assert report.updated['evaluation'] == 1
+
+    event_log.close()
+    state = EventLog(os.path.join(tmp_path, "events")).state()
+    replayed = state.evaluations[evaluation['id']]
+    assert replayed['vital_signs'] == {'heart_rate': 112}
+    assert replayed['analysis'] == ANALYSIS
+
+
+def test_evaluation_without_patient_needs_matching_name(tmp_path):
+    repository, event_log, restorer = _setup(tmp_path)
+    first = _add_patient(repository, event_log, "María García")
+    _add_patient(repository, event_log, "José Pérez")
+
+    # Incremental de otra instalación: el residente 1 de origen no está en la copia
+    evaluations = [
+        {'id': 50, 'patient_id': first['id'], 'patient_name': "Ana López", 'timestamp': "2026-01-06T09:00:00"},
+        {'id': 51, 'patient_id': 99, 'patient_name': "José Pérez", 'timestamp': "2026-01-06T09:30:00"}
+    ]
+    report = restorer.restore(_backup([], evaluations))
+
+    assert report.added['evaluation'] == 1 and report.skipped['evaluation'] == 1
+    saved = repository.evaluations_since(0)
+    assert [(e['patient_id'], e['patient_name']) for e in saved] == [(first['id'] + 1, "José Pérez")]
+
+
+def test_chain_keeps_patient_mapping(tmp_path):
+    source = Repository(os.path.join(tmp_path, "origen.db"))
+    manager = BackupManager(source, directory=os.path.join(tmp_path, "backups"))
+    patient = source.add_patients([{'name': "Luis Gómez", 'admission_date': "2024-02-01"}])[0]
+    manager.create()
+    source.add_evaluations([{'patient_id': patient['id'], 'patient_name': "Otro nombre",
+                             'timestamp': "2026-01-07T08:00:00"}])
+    assert manager.create(incremental=True)['type'] == 'incremental'
+
+    # En el destino el ID 1 ya pertenece a otra persona
+    repository, event_log, restorer = _setup(tmp_path)
+    other = _add_patient(repository, event_log, "Carmen Ruiz")
+    reports = manager.restore(restorer)
+
+    assert reports[-1].added['evaluation'] == 1
+    [evaluation] = repository.evaluations_since(0)
+    assert evaluation['patient_id'] != other['id']
+    assert repository.patients()[evaluation['patient_id']]['name'] == "Luis Gómez"
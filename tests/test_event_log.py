@@ -0,0 +1,42 @@
+"""
+Varios procesos que escriben en el mismo registro de eventos no deben
+repetir secuencias ni perder eventos, tampoco al rotar y compactar.
+
+Uso: python -m pytest tests
+"""
+import json
+import multiprocessing
+
+from backend import event_log as events
+from backend.event_log import EventLog
+
+WRITERS = 4
+EVENTS_PER_WRITER = 200
+
+
+def _write(directory, writer):
+    event_log = EventLog(directory, snapshot_every=50)
+    for index in range(EVENTS_PER_WRITER):
+        event_log.append(events.PATIENT_REGISTERED, {'id': writer * 10000 + index, 'name': f"Residente {index}"})
+    event_log.close()
+
+
+def test_concurrent_writers_share_sequence(tmp_path):
+    directory = str(tmp_path / "events")
+    EventLog(directory).close()
+    processes = [multiprocessing.Process(target=_write, args=(directory, writer)) for writer in range(WRITERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    event_log = EventLog(directory)
+    sequences = [json.loads(line)['seq'] for path in sorted(tmp_path.glob("events/events-*.jsonl"))
+                 for line in path.open(encoding='utf-8')]
+    assert len(sequences) == len(set(sequences))
+    state = event_log.state()
+    assert len(state.patients) == WRITERS * EVENTS_PER_WRITER
+
+    event_log.snapshot()
+    assert len(EventLog(directory).state().patients) == WRITERS * EVENTS_PER_WRITER
@@ -0,0 +1,38 @@
+"""
+La re-evaluación del censo puntúa Morse y Downton, y conserva de la
+valoración manual los ítems de Downton que no recogen las evaluaciones.
+
+Uso: python -m pytest tests
+"""
+import os
+
+from backend.fall_risk import FallRiskHistory, FallRiskScorer
+from models.fall_risk import DowntonInputs, Gait, MentalStatus, MorseInputs
+
+PATIENT = {'id': 1, 'name': "María García", 'conditions': {}, 'cognitive_level': 'Normal'}
+
+
+def test_rescore_census_scores_downton(tmp_path):
+    scorer = FallRiskScorer(FallRiskHistory(os.path.join(tmp_path, "historial.jsonl")))
+    morse = MorseInputs(gait=Gait.WEAK)
+    scorer.score(1, morse, DowntonInputs.from_morse(morse, ["Diuréticos", "Antidepresivos"], ["Visual"]))
+
+    evaluations = [{'patient_id': 1, 'date': "2026-01-05", 'time': "10:00",
+                    'general_status': {'mobility': 'Asistencia Mínima', 'cognitive_status': 'Confuso'}}]
+    patients = {1: dict(PATIENT)}
+    result = scorer.rescore_census(patients, evaluations)[1]
+
+    downton = result.downton_inputs
+    assert downton.medications == ["Diuréticos", "Antidepresivos"] and downton.sensory_deficits == ["Visual"]
+    assert downton.confused and downton.unsafe_gait and not downton.previous_falls
+    assert result.downton_score == 5
+    # Morse moderado, pero Downton ≥ 3 eleva el riesgo del paciente
+    assert result.morse_level == "MODERADO" and patients[1]['fall_risk'] == "Alto"
+    assert scorer.history.latest(1).downton_score == 5
+
+
+def test_downton_shares_items_with_morse():
+    morse = MorseInputs(history_of_falls=True, mental_status=MentalStatus.FORGETS_LIMITATIONS)
+    downton = DowntonInputs.from_morse(morse)
+    assert (downton.previous_falls, downton.confused, downton.unsafe_gait) == (True, True, False)
+    assert downton.score == 2
@@ -0,0 +1,49 @@
+"""
+Cada evaluación guardada desde el formulario debe llegar una sola vez a la
+alerta temprana y a las estadísticas deslizantes de la sesión.
+
+Uso: python -m pytest tests
+"""
+import gc
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from backend.persistence import PersistencePipeline
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def _submit(at):
+    [button for button in at.button if 'Completar' in str(button.label)][0].click()
+    at.run()
+    assert not at.exception, at.exception
+
+
+def _flush_pipelines():
+    """Espera a que el canal de persistencia de la aplicación escriba lo publicado"""
+    for candidate in gc.get_objects():
+        if isinstance(candidate, PersistencePipeline):
+            candidate.flush()
+
+
+def test_one_submit_adds_one_observation(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    at.session_state.current_page = "👤 Nuevo Paciente"
+    at.run()
+    at.text_input[0].input("María García")
+    at.text_input[1].input("101-A")
+    [button for button in at.button if 'Registrar' in str(button.label)][0].click()
+    at.run()
+    assert not at.exception, at.exception
+
+    at.session_state.current_page = "📋 Evaluación"
+    at.run()
+    for submitted in range(1, 4):
+        _submit(at)
+        patient_id = at.session_state.data_snapshot.evaluations[-1]['patient_id']
+        assert at.session_state.early_warning._states[patient_id].observations == submitted
+        assert at.session_state.rolling_stats.get(patient_id, 'heart_rate')['count'] == submitted
+    _flush_pipelines()
@@ -0,0 +1,54 @@
+"""
+Varios procesos que añaden lecturas (también atrasadas, que reordenan el
+fichero) no deben perder ni duplicar lecturas de un residente.
+
+Uso: python -m pytest tests
+"""
+import multiprocessing
+
+import numpy as np
+
+from backend.vital_store import VitalStore, VITAL_RECORD
+
+WRITERS = 4
+READINGS_PER_WRITER = 100
+
+
+def _reading(instant: str, heart_rate: float) -> np.ndarray:
+    record = np.zeros(1, dtype=VITAL_RECORD)
+    record['timestamp'] = np.datetime64(instant, 'us')
+    record['heart_rate'] = heart_rate
+    return record
+
+
+def _write(directory, writer):
+    store = VitalStore(directory)
+    for index in range(READINGS_PER_WRITER):
+        # Una de cada tres lecturas llega atrasada
+        second = index if index % 3 else READINGS_PER_WRITER - 1 - index
+        store.append_records(1, _reading(f"2026-01-01T{writer:02d}:{second // 60:02d}:{second % 60:02d}",
+                                         writer * 1000 + index))
+
+
+def test_concurrent_late_readings(tmp_path):
+    directory = str(tmp_path / "vitals")
+    processes = [multiprocessing.Process(target=_write, args=(directory, writer)) for writer in range(WRITERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    timestamps = VitalStore(directory).series(1)['timestamp']
+    assert len(timestamps) == len(np.unique(timestamps)) == WRITERS * READINGS_PER_WRITER
+    assert (timestamps[1:] > timestamps[:-1]).all()
+
+
+def test_same_late_reading_is_stored_once(tmp_path):
+    store = VitalStore(str(tmp_path / "vitals"))
+    store.append_records(1, np.concatenate([_reading("2026-01-01T08:00:00", 70),
+                                            _reading("2026-01-01T09:00:00", 72)]))
+    late = _reading("2026-01-01T08:30:00", 90)
+    store.append_records(1, late)
+    store.append_records(1, late)
+    assert list(store.series(1)['heart_rate']) == [70, 90, 72]